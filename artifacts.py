@@ -0,0 +1,109 @@
+import os
+import json
+import zipfile
+import hashlib
+import numpy as np
+import profiler
+
+from scan_cache import ScanCache, CACHE_DIR, CACHE_MAX_BYTES
+
+
+ARTIFACT_DIR = os.path.join(CACHE_DIR, 'artifacts')  # 默认中间结果持久化目录
+
+
+# 单样品中间结果图：各节点按 rules（{节点名: 计算函数}，函数以本图为参数，经 graph[上游节点名] 取得上游结果）惰性计算，
+# 每个节点至多计算一次，只有输出（汇总表、拟合结果记录表、拟合图等）实际请求的节点及其上游才会计算
+# 初始节点（原始数据、处理选项、样品名等）以关键字参数给出；store 非空时 keys（{节点名: 键}）中的节点计算后持久化，
+# 之后以同一键建立的图直接加载，不再计算；值为 None 的节点（如拟合失败）不持久化
+class ArtifactGraph:
+    def __init__(self, rules, store=None, keys=None, **values):
+        self.rules = rules
+        self.store = store
+        self.keys = (keys or {}) if store is not None else {}
+        self.values = values
+
+    def __contains__(self, name):
+        return name in self.values or name in self.rules
+
+    def __getitem__(self, name):
+        if not self.ready(name):
+            self.put(name, self.rules[name](self))
+        return self.values[name]
+
+    # 节点是否已有结果（已计算、已给出或可从持久化存储加载），不触发计算
+    def ready(self, name):
+        if name not in self.values and name in self.keys:
+            value = self.store.load(name, self.keys[name])
+            if value is not None:
+                profiler.count('artifact_hit')
+                self.values[name] = value
+        return name in self.values
+
+    # 设置节点结果（如批量拟合得到的拟合参数），可持久化的节点同时保存
+    def put(self, name, value):
+        self.values[name] = value
+        if value is not None and name in self.keys:
+            self.store.save(name, self.keys[name], value)
+
+
+# 节点值打包：数组依次存入 arrays，返回描述嵌套结构（元组、列表、字典）的 JSON 对象，None、字符串与数值直接记录
+def _pack(value, arrays):
+    if isinstance(value, np.ndarray):
+        arrays.append(value)
+        return {'array': len(arrays) - 1}
+    if isinstance(value, (tuple, list)):
+        return {type(value).__name__: [_pack(v, arrays) for v in value]}
+    if isinstance(value, dict):
+        return {'dict': {k: _pack(v, arrays) for k, v in value.items()}}
+    return value
+
+def _unpack(meta, arrays):
+    if not isinstance(meta, dict):
+        return meta
+    kind, content = next(iter(meta.items()))
+    if kind == 'array':
+        return arrays[f'arr_{content}']
+    if kind == 'dict':
+        return {k: _unpack(v, arrays) for k, v in content.items()}
+    values = [_unpack(v, arrays) for v in content]
+    return tuple(values) if kind == 'tuple' else values
+
+
+# 中间结果持久化存储：每个节点结果单独存为 .npz（文件名以节点名为前缀，其后为键的哈希），
+# 条目管理（原子替换写入、LRU 淘汰、按前缀清除）与解析结果缓存相同，可被进程池中的多个进程同时读写
+class ArtifactStore(ScanCache):
+    def __init__(self, cache_dir=ARTIFACT_DIR, max_bytes=CACHE_MAX_BYTES):
+        super().__init__(cache_dir, max_bytes)
+
+    def node_path(self, name, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}-{digest}.npz")
+
+    # 加载节点结果，未保存或无法读取时返回 None
+    def load(self, name, key):
+        path = self.node_path(name, key)
+        try:
+            with np.load(path) as data:
+                if str(data['__key__']) != key:
+                    return None
+                value = _unpack(json.loads(str(data['__meta__'])), {k: data[k] for k in data.files})
+            os.utime(path)  # 刷新最近使用时间
+            return value
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):  # 条目缺失或损坏时视为未保存
+            return None
+
+    # 保存节点结果（先写临时文件再原子替换），键一并保存以排除哈希冲突
+    def save(self, name, key, value):
+        path = self.node_path(name, key)
+        arrays = []
+        meta = json.dumps(_pack(value, arrays))
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, *arrays, __meta__=np.array(meta), __key__=np.array(key))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"中间结果写入失败: {e}")
+            return
+        self.evict()
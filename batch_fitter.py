@@ -0,0 +1,136 @@
+import numpy as np
+import profiler
+import data_processor as dp
+
+
+MIN_BATCH = 4  # 同一网格样品数达到该数量时才批量拟合，否则逐个拟合
+BATCH_ELEMENTS = 1 << 19  # 每批雅可比矩阵元素数上限（K × 网格点数 × 参数数，约 4 MB），超出时拆分为多批，保持缓存命中
+
+
+# 批量 Levenberg–Marquardt：K 个共用同一 2θ 网格的样品同时迭代
+# 各样品参数互不耦合，法方程为块对角结构：每个样品的 (P, P) 法方程矩阵由批量矩阵乘法 (K, P, n) @ (K, n, P) 一次算出，np.linalg.solve 批量求解；
+# 每次迭代只对尚未收敛的样品求值，阻尼系数逐样品调整（Marquardt 对角缩放）
+# 收敛判据与 MINPACK 相同：实际与预测的残差平方和相对下降均不超过 ftol，或相对步长不超过 xtol
+# sigma 为各网格点不确定度（各样品相同），残差与雅可比矩阵按 1/sigma 加权，与 curve_fit 的 sigma 一致
+# 返回 (popt (K, P), status, nfev)，status 为各样品收敛状态：
+# 'converged' 收敛，'max_iter' 达到最大迭代次数，'stalled' 阻尼过大无法继续下降，'failed' 初始残差非有限值
+def levenberg_marquardt(model, x, Y, P0, max_iter=200, ftol=1.49012e-8, xtol=1.49012e-8, damping=1e-8, sigma=None):
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    P = np.array(np.atleast_2d(P0), dtype=float)
+    k = len(Y)
+    weight = np.ones(np.size(x)) if sigma is None else 1 / np.asarray(sigma, dtype=float)
+    with np.errstate(all='ignore'):
+        r = (Y - model.batch(x, P)) * weight
+        cost = np.einsum('kn,kn->k', r, r)
+    lam = np.full(k, damping)
+    nu = np.full(k, 2.0)
+    nfev = np.ones(k, dtype=int)
+    status = np.where(np.isfinite(cost), 'max_iter', 'failed').astype(object)
+    active = np.isfinite(cost)
+    # 法方程 JᵀJ 与梯度 Jᵀr 仅在步长被接受（参数更新）后重新计算，步长被拒绝时沿用并增大阻尼重新求解
+    JtJ = np.zeros((k, model.n_params, model.n_params))
+    g = np.zeros((k, model.n_params))
+    # 阻尼缩放取历次 JᵀJ 对角元的最大值（同 MINPACK），偏导数趋于 0 的参数（如 m → ∞）仍保持阻尼，避免步长失控
+    d = np.full((k, model.n_params), np.finfo(float).tiny)
+    stale = active.copy()
+
+    for _ in range(max_iter):
+        idx = np.flatnonzero(active)
+        if idx.size == 0:
+            break
+        with np.errstate(all='ignore'):
+            update = idx[stale[idx]]
+            if update.size:
+                J = model.batch_jac(x, P[update]) * weight[:, None]
+                Jt = J.transpose(0, 2, 1)
+                JtJ[update] = Jt @ J
+                g[update] = (Jt @ r[update, :, None])[:, :, 0]
+                d[update] = np.fmax(d[update], np.einsum('kpp->kp', JtJ[update]))
+                stale[update] = False
+            A = JtJ[idx] + (lam[idx, None] * d[idx])[:, :, None] * np.eye(model.n_params)
+            try:
+                delta = np.linalg.solve(A, g[idx, :, None])[:, :, 0]
+            except np.linalg.LinAlgError:
+                delta = (np.linalg.pinv(A) @ g[idx, :, None])[:, :, 0]
+
+            P_new = P[idx] + delta
+            r_new = (Y[idx] - model.batch(x, P_new)) * weight
+            cost_new = np.einsum('kn,kn->k', r_new, r_new)
+        nfev[idx] += 1
+
+        cost_old = cost[idx]
+        better = np.isfinite(cost_new) & (cost_new < cost_old)
+        predicted = 2 * np.einsum('kp,kp->k', delta, g[idx]) - np.einsum('kp,kpq,kq->k', delta, JtJ[idx], delta)
+        small_f = (cost_old - cost_new <= ftol * cost_old) & (np.abs(predicted) <= ftol * cost_old)
+        scale = np.sqrt(d[idx])
+        small_x = np.linalg.norm(scale * delta, axis=1) <= xtol * np.linalg.norm(scale * P[idx], axis=1)
+
+        # 阻尼更新（Nielsen）：按实际/预测下降比 rho 平滑减小阻尼，连续拒绝时阻尼成倍增大
+        rho = (cost_old - cost_new) / np.where(predicted > 0, predicted, np.inf)
+        accepted = idx[better]
+        P[accepted] = P_new[better]
+        r[accepted] = r_new[better]
+        cost[accepted] = cost_new[better]
+        stale[accepted] = True
+        lam[accepted] *= np.maximum(1 / 3, 1 - (2 * rho[better] - 1)**3)
+        nu[accepted] = 2.0
+        rejected = idx[~better]
+        lam[rejected] *= nu[rejected]
+        nu[rejected] *= 2
+
+        done = idx[better & (small_f | small_x)]
+        status[done] = 'converged'
+        active[done] = False
+        stalled = idx[~better & (lam[idx] > 1e16)]
+        status[stalled] = 'stalled'
+        active[stalled] = False
+    return P, list(status), nfev
+
+# 批量拟合：收敛的样品直接返回参数，未收敛的样品退回逐个 curve_fit 拟合（与单样品拟合结果一致；fallback 为 False 时记为 None）
+# 按 BATCH_ELEMENTS 将样品拆分为若干批分别迭代
+# 返回与 fit_model 相同的逐样品结果列表（拟合失败为 None）及各样品收敛状态
+def fit_batch(model, x, Y, P0, sigma=None, fallback=True):
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    size = max(1, BATCH_ELEMENTS // (np.size(x) * model.n_params))
+    popt, status = [], []
+    for s in range(0, len(Y), size):
+        with profiler.stage('batch_lm'):
+            p, st, nfev = levenberg_marquardt(model, x, Y[s:s + size], P0[s:s + size], sigma=sigma)
+        profiler.count('nfev', nfev.sum())
+        popt.extend(p)
+        status.extend(st)
+    results = []
+    for i, state in enumerate(status):
+        if state == 'converged':
+            results.append(popt[i])
+        elif not fallback:
+            results.append(None)
+        else:
+            results.append(dp.fit_model(model, x, Y[i], P0[i], sigma))
+    return results, status
+
+# G[002]+Si[111] 双峰模型批量拟合（直接拟合），Y 为 (K, len(x))，P0 为各样品初值（为空时按峰位附近峰高构建，下同）
+def fit_data_d002_raw_batch(x, Y, P0=None, sigma=None):
+    if P0 is None:
+        P0 = [dp.D002_RAW_MODEL.initial_guess(x, y) for y in Y]
+    return fit_batch(dp.D002_RAW_MODEL, x, Y, P0, sigma)
+
+# Si[111] 单峰模型批量拟合
+def fit_data_sifwhm_batch(x, Y, P0=None, sigma=None):
+    if P0 is None:
+        P0 = [dp.initial_guess_sifwhm(x, y) for y in Y]
+    return fit_batch(dp.SI111_MODEL, x, dp.savgol_smooth(Y, 25, 3, axis=-1), P0, sigma)
+
+# OI值 多峰曲线批量拟合（直接拟合）
+def fit_data_oi_raw_batch(x, Y, P0=None, sigma=None):
+    if P0 is None:
+        P0 = [dp.OI_RAW_MODEL.initial_guess(x, y) for y in Y]
+    return fit_batch(dp.OI_RAW_MODEL, x, Y, P0, sigma)
+
+# 按 2θ 网格分组：网格完全相同的扫描归为一组，返回 [(scan_x, [下标, ...]), ...]
+def group_by_grid(scans):
+    groups = {}
+    for i, (scan_x, _) in enumerate(scans):
+        key = (np.size(scan_x), np.asarray(scan_x, dtype=float).tobytes())
+        groups.setdefault(key, (scan_x, []))[1].append(i)
+    return list(groups.values())
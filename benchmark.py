@@ -0,0 +1,253 @@
+import os
+import sys
+import json
+import glob
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import numpy as np
+import scipy
+import data_reader as dr
+import data_processor as dp
+
+
+BASELINE_PATH = 'benchmark_baseline.json'  # 默认基线文件
+THRESHOLD = 0.25                           # 默认回归判定阈值（比基线慢 25% 以上视为回归）
+POINT_SCALES = (1, 10, 100)                # 合成扫描点数倍数（相对实测步长 0.01313°）
+FILE_SCALES = (1, 10)                      # 端到端批处理文件数倍数（相对每类 5 个样品）
+MIN_TIME = 0.2                             # 每项基准的最短累计测量时间（秒）
+MAX_REPEAT = 50                            # 每项基准的最多重复次数
+STEP = 0.01313028                          # 实测扫描步长（°）
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_case')
+
+# 合成扫描：扫描范围、峰模型及由实测样品拟合得到的典型参数（峰表 + Chebyshev 背景）
+SYNTHETIC = {
+    'D002': ((20.0, 35.0), dp.D002_RAW_MODEL,
+             [14510.8, 26.478, 0.2344, 0.1119, 1.597, 9639.9, 28.416, 0.1434, 0.0585, 1.548, -197.37, 22.559, -0.2338]),
+    'OI': ((50.0, 80.0), dp.OI_RAW_MODEL,
+           [596.8, 54.580, 0.3473, 0.1824, 1.615, 2716.0, 56.101, 0.1478, 0.0726, 1.162, 582.6, 69.104, 0.1635, 0.0975,
+            1.259, 920.5, 76.353, 0.1628, 0.0918, 1.126, 250.3, 77.465, 0.1782, 0.1438, 0.837, 153.47, -3.0607, 0.0086]),
+}
+
+
+"""合成数据"""
+# 合成扫描：kind 为 'D002' / 'OI'，scale 为点数倍数（步长 STEP / scale），泊松噪声由 seed 固定，结果可复现
+def synthetic_scan(kind, scale=1, seed=0):
+    (lo, hi), model, params = SYNTHETIC[kind]
+    n = int(round((hi - lo) / (STEP / scale))) + 1
+    x = np.linspace(lo, hi, n)
+    y = np.clip(model(x, *params), 0, None)
+    return x, np.random.default_rng(seed).poisson(y).astype(float)
+
+# 写入 .xrdml（起止位置 + 计数，与 XRDMLReader 解析的元素一致）
+def write_xrdml(path, x, y):
+    counts = ' '.join(str(int(v)) for v in y)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<xrdMeasurements xmlns="http://www.xrdml.com/XRDMeasurement/1.5">\n'
+                '<xrdMeasurement><scan><dataPoints>\n'
+                f'<positions axis="2Theta" unit="deg"><startPosition>{x[0]:.8f}</startPosition>'
+                f'<endPosition>{x[-1]:.8f}</endPosition></positions>\n'
+                f'<counts unit="counts">{counts}</counts>\n'
+                '</dataPoints></scan></xrdMeasurement>\n</xrdMeasurements>\n')
+
+# 写入 .rd（V3RD 头，步长/起止角位于偏移 214，强度以 sqrt(100·I) 的 uint16 存储于偏移 250）
+def write_rd(path, x, y):
+    step = (x[-1] - x[0]) / (x.size - 1)
+    start = x[0] - step / 2
+    end = start + (x.size + 0.5) * step  # PhilipsRDReader 以 int((end - start) / step) 取点数
+    header = bytearray(250)
+    header[0:4] = b"V3RD"
+    header[214:238] = np.array([step, start, end], dtype=np.float64).tobytes()
+    with open(path, 'wb') as f:
+        f.write(bytes(header))
+        f.write(np.round(np.sqrt(100 * np.clip(y, 0, None))).clip(0, 65535).astype(np.uint16).tobytes())
+
+# 写入理学 .raw（单个扫描范围：范围头 float32 起始角/终止角/步长，强度 float32）
+def write_raw(path, x, y):
+    step = (x[-1] - x[0]) / (x.size - 1)
+    buf = bytearray(dr.RigakuRawReader.DATA_OFFSET)
+    offset = dr.RigakuRawReader.RANGE_OFFSET
+    buf[offset:offset + 12] = np.array([x[0], x[-1], step], dtype='<f4').tobytes()
+    with open(path, 'wb') as f:
+        f.write(bytes(buf))
+        f.write(np.asarray(y, dtype='<f4').tobytes())
+
+# 写入纯文本 .xy（2θ 与强度两列，含一行表头）
+def write_xy(path, x, y):
+    np.savetxt(path, np.column_stack([x, y]), fmt='%.6f', header='2Theta Intensity')
+
+# 各读取器对应的文件类型、扩展名与写入函数
+READERS = {
+    'XRDMLReader': ('xrdml', '.xrdml', write_xrdml),
+    'PhilipsRDReader': ('rd', '.rd', write_rd),
+    'RigakuRawReader': ('raw', '.raw', write_raw),
+    'XYReader': ('xy', '.xy', write_xy),
+}
+
+
+"""计时"""
+# 重复执行 func 直至累计耗时超过 MIN_TIME（或达到 MAX_REPEAT 次），返回单次耗时的最小值、中位数与重复次数
+def measure(func, min_time=MIN_TIME, max_repeat=MAX_REPEAT):
+    times = []
+    while len(times) < max_repeat and sum(times) < min_time:
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {'min': min(times), 'median': float(np.median(times)), 'repeat': len(times)}
+
+def _real_scans(kind):
+    return [dr.XRDMLReader.read_data(path) for path in sorted(glob.glob(os.path.join(SAMPLE_DIR, kind, '*.xrdml')))]
+
+
+"""基准项目"""
+# 读取器：实测 .xrdml 样品及各格式的合成文件（点数倍数 scales）
+def bench_readers(work_dir, scales):
+    results = {}
+    real = sorted(glob.glob(os.path.join(SAMPLE_DIR, '*', '*.xrdml')))
+    if real:
+        results['reader/XRDMLReader/real'] = measure(lambda: [dr.XRDMLReader.read_data(path) for path in real])
+        results['reader/XRDMLReader/real']['samples'] = len(real)
+    for name, (file_type, ext, write) in READERS.items():
+        reader = dr.get_reader(file_type)
+        for scale in scales:
+            path = os.path.join(work_dir, f'reader_x{scale}{ext}')
+            write(path, *synthetic_scan('OI', scale))
+            results[f'reader/{name}/x{scale}'] = measure(lambda: reader.read_data(path))
+    return results
+
+# 模型求值：split_pearson_vii / double_peak_raw / oi_peak_raw（点数倍数 scales）
+def bench_models(scales):
+    results = {}
+    for scale in scales:
+        x, _ = synthetic_scan('OI', scale)
+        oi = SYNTHETIC['OI'][2]
+        results[f'model/split_pearson_vii/x{scale}'] = measure(lambda: dp.split_pearson_vii(x, *oi[0:5]))
+        results[f'model/oi_peak_raw/x{scale}'] = measure(lambda: dp.oi_peak_raw(x, *oi))
+        x, _ = synthetic_scan('D002', scale)
+        results[f'model/double_peak_raw/x{scale}'] = measure(lambda: dp.double_peak_raw(x, *SYNTHETIC['D002'][2]))
+    return results
+
+# 完整拟合：fit_data_d002_raw / fit_data_sifwhm / fit_data_oi_raw，实测样品及合成扫描（点数倍数 scales）
+def bench_fits(scales):
+    results = {}
+    cases = [('fit_data_d002_raw', 'D002', dp.fit_data_d002_raw, lambda x, y: (x, y)),
+             ('fit_data_sifwhm', 'D002', dp.fit_data_sifwhm, lambda x, y: dp.correct_ka2(x, y)),
+             ('fit_data_oi_raw', 'OI', dp.fit_data_oi_raw, lambda x, y: (x, y))]
+    for name, kind, fit, prepare in cases:
+        scans = [prepare(x, y) for x, y in _real_scans(kind)]
+        if scans:
+            results[f'fit/{name}/real'] = measure(lambda: [fit(x, y) for x, y in scans])
+            results[f'fit/{name}/real']['samples'] = len(scans)
+        for scale in scales:
+            x, y = prepare(*synthetic_scan(kind, scale))
+            results[f'fit/{name}/x{scale}'] = measure(lambda: fit(x, y), max_repeat=5 if scale > 10 else MAX_REPEAT)
+    return results
+
+# 端到端批处理：pipeline.process_batch（单进程，不输出拟合结果与拟合图，不使用缓存与热启动），
+# 每类以实测样品为模板按文件数倍数 scales 复制；batch_fit 为真时同时测量批量拟合
+def bench_batch(work_dir, scales, batch_fit=True):
+    import pipeline
+    results = {}
+    for calc_type, kind in (("1", 'D002'), ("3", 'OI')):
+        templates = sorted(glob.glob(os.path.join(SAMPLE_DIR, kind, '*.xrdml')))
+        for scale in scales:
+            batch_dir = os.path.join(work_dir, f'batch_{kind}_x{scale}')
+            os.makedirs(batch_dir, exist_ok=True)
+            files = []
+            for i in range(scale):
+                for template in templates:
+                    path = os.path.join(batch_dir, f'{i}_{os.path.basename(template)}')
+                    shutil.copyfile(template, path)
+                    files.append(path)
+            for mode in (False, True) if batch_fit else (False,):
+                options = pipeline.make_options(file_type='xrdml', calc_type=calc_type, cache_dir=None, plot_format=None,
+                                                batch_fit=mode, warm_start=False)
+                key = f"batch/{kind}/{'batch_fit' if mode else 'serial'}/files{len(files)}"
+                results[key] = measure(lambda: pipeline.process_batch(files, options, workers=1), max_repeat=3)
+                results[key]['files'] = len(files)
+    return results
+
+GROUPS = ['readers', 'models', 'fits', 'batch']
+
+
+# 运行环境信息（基线与当前结果的环境不同时比较结果仅供参考）
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'scipy': scipy.__version__,
+            'platform': platform.platform(), 'processor': platform.processor(), 'cpu_count': os.cpu_count()}
+
+# 运行基准测试，groups 为运行的项目组，返回 {'environment': ..., 'results': {名称: 计时}}
+def run(groups=GROUPS, point_scales=POINT_SCALES, file_scales=FILE_SCALES):
+    results = {}
+    work_dir = tempfile.mkdtemp(prefix='xrd_bench_')
+    try:
+        if 'readers' in groups:
+            results.update(bench_readers(work_dir, point_scales))
+        if 'models' in groups:
+            results.update(bench_models(point_scales))
+        if 'fits' in groups:
+            results.update(bench_fits(point_scales))
+        if 'batch' in groups:
+            results.update(bench_batch(work_dir, file_scales))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {'environment': environment(), 'results': results}
+
+# 与基线比较（以单次耗时最小值比较，受系统负载影响较小），返回 [(名称, 基线, 当前, 比值), ...] 与回归项目列表
+def compare(current, baseline, threshold=THRESHOLD):
+    rows, regressions = [], []
+    for name, timing in current['results'].items():
+        reference = baseline['results'].get(name)
+        if reference is None:
+            continue
+        ratio = timing['min'] / reference['min']
+        rows.append((name, reference['min'], timing['min'], ratio))
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+# 基准测试命令：python benchmark.py run [--save] | compare [--threshold 0.25]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="XRD 读取/模型/拟合/批处理基准测试")
+    parser.add_argument('command', choices=['run', 'compare'],
+                        help="run 运行并输出结果，compare 运行并与基线比较")
+    parser.add_argument('--groups', default=','.join(GROUPS), help=f"运行的项目组（逗号分隔）：{','.join(GROUPS)}")
+    parser.add_argument('--point-scales', default=','.join(map(str, POINT_SCALES)), help="合成扫描点数倍数")
+    parser.add_argument('--file-scales', default=','.join(map(str, FILE_SCALES)), help="批处理文件数倍数")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="基线文件路径")
+    parser.add_argument('--save', action='store_true', help="将本次结果保存为基线")
+    parser.add_argument('--output', default=None, help="本次结果输出路径（JSON）")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="回归判定阈值（相对基线的变慢比例）")
+    args = parser.parse_args()
+
+    if args.command == 'compare' and not os.path.exists(args.baseline):
+        sys.exit(f"基线文件 {args.baseline} 不存在，请先在同一环境中运行 python benchmark.py run --save 生成")
+    current = run([g for g in args.groups.split(',') if g],
+                  [int(s) for s in args.point_scales.split(',') if s],
+                  [int(s) for s in args.file_scales.split(',') if s])
+    for name, timing in current['results'].items():
+        print(f"{name:<48} min {timing['min'] * 1000:10.3f} ms   median {timing['median'] * 1000:10.3f} ms   × {timing['repeat']}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+
+    if args.command == 'compare':
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('environment') != current['environment']:
+            print("注意：基线与当前运行环境不同，比较结果仅供参考")
+        rows, regressions = compare(current, baseline, args.threshold)
+        print()
+        for name, reference, timing, ratio in rows:
+            flag = '  << 回归' if name in regressions else ''
+            print(f"{name:<48} 基线 {reference * 1000:10.3f} ms   当前 {timing * 1000:10.3f} ms   {ratio:6.2f}×{flag}")
+        print(f"\n{len(regressions)} 项回归（阈值 +{args.threshold:.0%}）")
+        if regressions:
+            sys.exit(1)
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2)
+        print(f"基线已保存至 {args.baseline}")
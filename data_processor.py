@@ -1,278 +1,703 @@
-import numpy as np
-
-from numpy.polynomial.chebyshev import Chebyshev
-from scipy.interpolate import interp1d
-from scipy.signal import convolve
-from scipy.signal import savgol_filter
-from scipy.optimize import curve_fit
-from scipy.optimize import fsolve
-
-"""基础处理工具定义"""
-# 迭代法Kα2校正
-def correct_ka2(two_theta, intensity, intensity_0=None, lambda_ka1=1.54056, lambda_ka2=1.54439, iterations=8):
-   
-    theta_rad = np.radians(two_theta / 2)
-    sin_theta_ka1 = np.sin(theta_rad)
-    sin_theta_ka2 = sin_theta_ka1 * (lambda_ka1 / lambda_ka2)
-    
-    valid = sin_theta_ka2 <= 1.0
-    theta_ka2_rad = np.arcsin(sin_theta_ka2, where=valid, out=np.zeros_like(sin_theta_ka2))
-    two_theta_ka2 = np.degrees(theta_ka2_rad) * 2
-    
-    if intensity_0 is not None:
-        corrected_intensity = intensity_0
-    else:
-        corrected_intensity = intensity.copy()
-        
-    for _ in range(iterations):
-        bg_fill = np.mean(corrected_intensity[:30])
-        ka1_interp = interp1d(two_theta, corrected_intensity, kind='linear', bounds_error=False, fill_value=bg_fill)
-        ka2_intensity = ka1_interp(two_theta_ka2) * 0.5
-        ka2_intensity *= valid
-        corrected_intensity = np.clip(intensity - ka2_intensity, 0, None)
-    
-    return two_theta, corrected_intensity
-
-# 回添Kα2强度
-def decorrect_ka2(two_theta, intensity, lambda_ka1=1.54056, lambda_ka2=1.54439):
-    theta_rad = np.radians(two_theta / 2)
-    sin_theta_ka1 = np.sin(theta_rad)
-    sin_theta_ka2 = sin_theta_ka1 * (lambda_ka1 / lambda_ka2)
-    
-    theta_ka2_rad = np.arcsin(sin_theta_ka2)
-    two_theta_ka2 = np.degrees(theta_ka2_rad) * 2
-    
-    ka2_intensity = np.interp(two_theta_ka2, two_theta, intensity) * 0.5
-    decorrected_intensity = intensity + ka2_intensity
-
-    return decorrected_intensity
-
-# 查找峰高数据
-def find_peak_tip(x: np.ndarray, y: np.ndarray, c: float, delt = 0.1):
-    mask = (x >= c - delt) & (x <= c + delt)
-    if not np.any(mask):
-        return float(np.max(y) - np.min(y))
-    return np.max(y[mask]) - np.min(y)
-
-"""数学模型定义"""
-# 定义 Gaussian 函数
-def gaussian(x: np.ndarray, amplitude: float, center: float, sigma: float) -> np.ndarray:
-    return amplitude * np.exp(-((x - center) / sigma)**2)
-
-# 定义 Lorentzian 函数
-def lorentzian(x: np.ndarray, amplitude: float, center: float, sigma: float) -> np.ndarray:
-    return amplitude / (1 + ((x - center) / sigma)**2)
-
-# 定义 Pseudo-Voigt 函数：高斯函数和洛伦兹函数的线性组合
-def pseudo_voigt(x: np.ndarray, amplitude: float, center: float, sigma: float, eta: float) -> np.ndarray:
-    return eta * lorentzian(x, amplitude, center, sigma) + (1 - eta) * gaussian(x, amplitude, center, sigma)
-
-# 定义 Split-Pearson VII 函数：两侧具有不同形状参数的 Pearson VII 函数
-def split_pearson_vii(x: np.ndarray, a: float, x0: float, w_L: float, w_R: float, m: float) -> np.ndarray:
-    return np.where(
-        x <= x0,
-        a / (1 + (4 * (x - x0)**2 / w_L**2) * (2**(1/m) - 1))**m,
-        a / (1 + (4 * (x - x0)**2 / w_R**2) * (2**(1/m) - 1))**m
-    )
-
-# 定义二阶切比雪夫多项式
-def chebyshev(x: np.ndarray, c0, c1, c2):
-    return Chebyshev([c0, c1, c2])(x)
-
-"""拟合函数定义"""
-# 定义单峰拟合函数（Split-Pearson VII 峰 + 二阶切比雪夫背景）
-def single_peak(x: np.ndarray, a1, x01, w_L1, w_R1, m1, c0, c1, c2):
-    return split_pearson_vii(x, a1, x01, w_L1, w_R1, m1) + chebyshev(x, c0, c1, c2)
-
-# 定义双峰拟合函数（2个Split-Pearson VII 峰 + 二阶切比雪夫背景）
-def double_peak(x, a1, x01, w_L1, w_R1, m1, a2, x02, w_L2, w_R2, m2, c0, c1, c2):
-    return (split_pearson_vii(x, a1, x01, w_L1, w_R1, m1) + split_pearson_vii(x, a2, x02, w_L2, w_R2, m2) + chebyshev(x, c0, c1, c2))
-
-# 定义双峰直接拟合函数（2个Split-Pearson VII 峰 + 二阶切比雪夫背景 + Kaplha2）
-def double_peak_raw(x, a1, x01, w_L1, w_R1, m1, a2, x02, w_L2, w_R2, m2, c0, c1, c2):
-    return decorrect_ka2(x, double_peak(x, a1, x01, w_L1, w_R1, m1, a2, x02, w_L2, w_R2, m2, c0, c1, c2))
-
-# 定义多峰拟合函数（5个Split-Pearson VII 峰 + 二阶切比雪夫背景）
-def oi_peak(x, a1, x01, w_L1, w_R1, m1, a2, x02, w_L2, w_R2, m2, a3, x03, w_L3, w_R3, m3, a4, x04, w_L4, w_R4, m4, a5, x05, w_L5, w_R5, m5, c0, c1, c2):
-    return (split_pearson_vii(x, a1, x01, w_L1, w_R1, m1) + split_pearson_vii(x, a2, x02, w_L2, w_R2, m2) + split_pearson_vii(x, a3, x03, w_L3, w_R3, m3) + split_pearson_vii(x, a4, x04, w_L4, w_R4, m4) + split_pearson_vii(x, a5, x05, w_L5, w_R5, m5) + chebyshev(x, c0, c1, c2))
-
-# 定义多峰直接拟合函数（5个Split-Pearson VII 峰 + 二阶切比雪夫背景）
-def oi_peak_raw(x, a1, x01, w_L1, w_R1, m1, a2, x02, w_L2, w_R2, m2, a3, x03, w_L3, w_R3, m3, a4, x04, w_L4, w_R4, m4, a5, x05, w_L5, w_R5, m5, c0, c1, c2):
-    return decorrect_ka2(x, oi_peak(x, a1, x01, w_L1, w_R1, m1, a2, x02, w_L2, w_R2, m2, a3, x03, w_L3, w_R3, m3, a4, x04, w_L4, w_R4, m4, a5, x05, w_L5, w_R5, m5, c0, c1, c2))
-
-"""计算函数定义"""
-# 计算 Split-Pearson VII 函数的半峰宽
-def calculate_fwhm_spv(w_L, w_R, m):
-    a = 1
-    x0 = 0
-    left_x = fsolve(lambda x: split_pearson_vii(x, a, x0, w_L, w_R, m) - (a / 2), x0 - abs(w_L))[0]
-    right_x = fsolve(lambda x: split_pearson_vii(x, a, x0, w_L, w_R, m) - (a / 2), x0 + abs(w_R))[0]
-    return right_x - left_x
-
-# 兼容 numpy 1.x (trapz) / 2.x (trapezoid) 的梯形积分
-def _trapz(y, x):
-    trapz_func = getattr(np, 'trapezoid', None) or np.trapz
-    return trapz_func(y, x)
-
-# 计算拟合峰曲线的质心（强度加权平均位置，2θ）
-# 参照 IUCr 重心法（Centroid Method）：在背景扣除后的净峰曲线上，
-# 以峰中心对称的角窗口内积分，避免全扫描范围非对称截断引入的系统性偏差。
-# 采用迭代收敛：以最大强度位置（或给定 center）为初始窗口中心计算质心，
-# 再将前次计算出的质心作为新的窗口中心重复积分，
-# 每次迭代同时重新计算窗口半宽（净峰降至峰高 1% 处两侧较大者 ×1.02），
-# 直至两次计算的角度变化 < tol（默认 0.001°）。
-def calculate_centroid(x: np.ndarray, peak_curve: np.ndarray,
-                       center: float = None, window: float = None,
-                       tol: float = 0.001, max_iter: int = 100,
-                       return_window: bool = False):
-    nan_result = (float('nan'), (float('nan'), float('nan')))
-    y = np.clip(peak_curve, 0, None)
-    if center is None:
-        center = float(x[int(np.argmax(y))])
-    peak_max = float(np.max(y)) if y.size else 0.0
-    if peak_max <= 0:
-        return nan_result if return_window else float('nan')
-
-    # 峰超过峰高 1% 的有效范围（用于每次迭代自动推导积分窗口半宽）
-    xs = x[y >= 0.01 * peak_max]
-    has_xs = xs.size > 0
-
-    # 迭代：将前次计算出的质心作为新的积分窗口中值，
-    # 且每次迭代重新计算窗口半宽（对称半宽取两侧较大者 ×1.02），直至角度变化小于 tol
-    centroid = center
-    cur_window = window
-    for _ in range(max_iter):
-        if window is None:
-            if not has_xs:
-                break
-            cur_window = max(centroid - xs.min(), xs.max() - centroid) * 1.02
-        if cur_window <= 0:
-            break
-        mask = (x >= centroid - cur_window) & (x <= centroid + cur_window)
-        yw, xw = y[mask], x[mask]
-        if yw.size < 2:
-            break
-        mass = _trapz(yw, xw)
-        if mass <= 0:
-            break
-        new_centroid = _trapz(xw * yw, xw) / mass
-        if not np.isfinite(new_centroid):
-            break
-        if abs(new_centroid - centroid) < tol:
-            centroid = new_centroid
-            break
-        centroid = new_centroid
-
-    if return_window:
-        if window is None:
-            if not has_xs:
-                return centroid, (float('nan'), float('nan'))
-            cur_window = max(centroid - xs.min(), xs.max() - centroid) * 1.02
-        if cur_window <= 0:
-            return centroid, (float('nan'), float('nan'))
-        return centroid, (centroid - cur_window, centroid + cur_window)
-    return centroid
-
-# 计算拟合峰曲线的面积
-def calculate_peak_area(x: np.ndarray, peak_curve: np.ndarray) -> float:
-    return _trapz(np.clip(peak_curve, 0, None), x)
-
-# 计算 Pseudo-Voigt 函数的半峰宽
-def calculate_fwhm_pv(sigma, eta):
-    fwhm_lorentz = 2 * sigma  # 洛伦兹成分的半峰宽
-    fwhm_gauss = 2 * sigma * np.sqrt(2 * np.log(2))  # 高斯成分的半峰宽
-    return eta * fwhm_lorentz + (1 - eta) * fwhm_gauss
-
-# 计算校正后半峰宽 参考 JIS R 7651:2007（固定参数，有错误）
-def calculate_fwhm_jis(g002_fwhm, si111_fwhm):
-    v = si111_fwhm / g002_fwhm
-    return g002_fwhm * (0.9981266 - 0.0681532 * v - 2.592769 * v**2 + 2.621163 * v**3 - 0.9584715 * v**4)
-
-# G[002]+Si[111] 双峰模型拟合数据
-def fit_data_d002(x, y):
-    p0 = [find_peak_tip(x, y, 26.5), 26.5, 0.1, 0.1, 1.5, find_peak_tip(x, y, 28.4), 28.4, 0.1, 0.1, 1.5, 0, 0, 0]
-    try:
-        popt, _ = curve_fit(double_peak, x, y, p0=p0)
-        return popt
-    except RuntimeError as e:
-        print(f"拟合失败: {e}")
-        return None
-    
-# G[002]+Si[111] 双峰模型拟合数据(直接拟合)
-def fit_data_d002_raw(x, y):
-    p0 = [find_peak_tip(x, y, 26.5), 26.5, 0.1, 0.1, 1.5, find_peak_tip(x, y, 28.4), 28.4, 0.1, 0.1, 1.5, 0, 0, 0]
-    try:
-        popt, _ = curve_fit(double_peak_raw, x, y, p0=p0)
-        return popt
-    except RuntimeError as e:
-        print(f"拟合失败: {e}")
-        return None
-
-# Si[111] 单峰模型拟合数据
-def fit_data_sifwhm(x, y):
-    p0 = [max(y)-min(y), 28.4, 0.3, 0.3, 0.6, 0, 0, 0]
-    y = savgol_filter(y, 25, 3)
-    try:
-        popt, _ = curve_fit(single_peak, x, y, p0=p0)
-        return popt
-    except RuntimeError as e:
-        print(f"拟合失败: {e}")
-        return None
-
-# OI值 多峰曲线拟合数据
-def fit_data_oi(x, y):
-    p0 = [find_peak_tip(x, y, 54.23), 54.23, 0.1, 0.1, 1.5, find_peak_tip(x, y, 56.12), 56.12, 0.1, 0.1, 1.5, find_peak_tip(x, y, 69.14), 69.14, 0.1, 0.1, 1.5, find_peak_tip(x, y, 76.38), 76.38, 0.1, 0.1, 1.5, find_peak_tip(x, y, 77.55), 77.55, 0.1, 0.1, 1.5, 0, 0, 0]
-    try:
-        popt, _ = curve_fit(oi_peak, x, y, p0=p0)
-        return popt
-    except RuntimeError as e:
-        print(f"拟合失败: {e}")
-        return None
-
-# OI值 多峰曲线拟合数据（直接拟合）
-def fit_data_oi_raw(x, y):
-    p0 = [find_peak_tip(x, y, 54.23), 54.23, 0.1, 0.1, 1.5, find_peak_tip(x, y, 56.12), 56.12, 0.1, 0.1, 1.5, find_peak_tip(x, y, 69.14), 69.14, 0.1, 0.1, 1.5, find_peak_tip(x, y, 76.38), 76.38, 0.1, 0.1, 1.5, find_peak_tip(x, y, 77.55), 77.55, 0.1, 0.1, 1.5, 0, 0, 0]
-    try:
-        popt, _ = curve_fit(oi_peak_raw, x, y, p0=p0)
-        return popt
-    except RuntimeError as e:
-        print(f"拟合失败: {e}")
-        return None
-    
-"""曲线计算函数"""
-# G[002]+Si[111] 双峰曲线计算
-def fit_peak_d002(x, popt):
-    fitted_curve = double_peak(x, *popt)
-    background = chebyshev(x, popt[10], popt[11] , popt[12])
-    graphite_peak = split_pearson_vii(x, popt[0], popt[1], popt[2], popt[3], popt[4])
-    silicon_peak = split_pearson_vii(x, popt[5], popt[6], popt[7], popt[8], popt[9])
-
-    # 反卷积计算净石墨半峰宽
-    graphite_peak_shift = split_pearson_vii(x, popt[5], popt[6], popt[2], popt[3], popt[4])
-    initial_guess = [1.0, 27.0, 0.1]
-    def convolution_model(x, amplitude, center, sigma):
-        gtaphite_net = lorentzian(x, amplitude, center, sigma)
-        return convolve(silicon_peak, gtaphite_net, mode='same')
-    params, _ = curve_fit(convolution_model, x, graphite_peak_shift, p0=initial_guess)
-    fwhm = 2 * abs(params[2])
-
-    return fitted_curve, background, graphite_peak, silicon_peak, fwhm
-
-# Si[111] 单峰曲线计算
-def fit_peak_sifwhm(x, popt):
-    fitted_curve = single_peak(x, *popt)
-    background = chebyshev(x, popt[5], popt[6] , popt[7])
-    silicon_peak = split_pearson_vii(x, popt[0], popt[1], popt[2], popt[3], popt[4])
-    return fitted_curve, background, silicon_peak
-
-# OI值 多峰曲线计算
-def fit_peak_oi(x, popt):
-    fitted_curve = oi_peak(x, *popt)
-    g004_peak = split_pearson_vii(x, popt[0], popt[1], popt[2], popt[3], popt[4])
-    si311_peak = split_pearson_vii(x, popt[5], popt[6], popt[7], popt[8], popt[9])
-    si400_peak = split_pearson_vii(x, popt[10], popt[11], popt[12], popt[13], popt[14])
-    si331_peak = split_pearson_vii(x, popt[15], popt[16], popt[17], popt[18], popt[19])
-    g110_peak = split_pearson_vii(x, popt[20], popt[21], popt[22], popt[23], popt[24])
-    background = chebyshev(x, popt[25], popt[26] , popt[27])
-
-    return fitted_curve, background, g004_peak, si311_peak, si400_peak, si331_peak, g110_peak
+import numpy as np
+import profiler
+import time_budget
+
+from numpy.polynomial.chebyshev import Chebyshev
+from scipy.fft import rfft, irfft, next_fast_len
+from scipy.optimize import curve_fit
+from scipy.sparse import csr_matrix
+from scipy.special import betainc, gammaln
+
+# 模型版本：拟合模型或指标计算逻辑变更时递增，使结果库中的已存结果失效并在增量运行时重新拟合
+MODEL_VERSION = "2"
+
+"""基础处理工具定义"""
+# Kα2 位移算子：2θ 网格与波长在整个拟合过程中固定，预先计算每个网格点对应 Kα1 位置的
+# 线性插值下标与权重，存为每行仅 2 个非零元的稀疏插值矩阵，之后每次回添/校正只需一次稀疏矩阵乘法
+class Ka2Operator:
+    def __init__(self, two_theta, lambda_ka1=1.54056, lambda_ka2=1.54439):
+        two_theta = np.asarray(two_theta, dtype=float)
+        theta_rad = np.radians(two_theta / 2)
+        sin_theta_ka1 = np.sin(theta_rad)
+        sin_theta_ka2 = sin_theta_ka1 * (lambda_ka1 / lambda_ka2)
+
+        self.valid = sin_theta_ka2 <= 1.0
+        theta_ka2_rad = np.arcsin(sin_theta_ka2, where=self.valid, out=np.zeros_like(sin_theta_ka2))
+        two_theta_ka2 = np.degrees(theta_ka2_rad) * 2
+
+        # 插值下标与权重（与 np.interp 一致：超出网格范围时取端点值）
+        n = two_theta.size
+        index = np.clip(np.searchsorted(two_theta, two_theta_ka2, side='right') - 1, 0, max(n - 2, 0))
+        upper = np.minimum(index + 1, n - 1)
+        span = two_theta[upper] - two_theta[index]
+        weight = np.divide(two_theta_ka2 - two_theta[index], span, out=np.zeros_like(span), where=span != 0)
+        weight = np.clip(weight, 0.0, 1.0)
+        rows = np.repeat(np.arange(n), 2)
+        cols = np.column_stack([index, upper]).ravel()
+        vals = np.column_stack([1 - weight, weight]).ravel()
+        self.matrix = csr_matrix((vals, (rows, cols)), shape=(n, n))
+        self.outside = ~self.valid | (two_theta_ka2 < two_theta[0]) | (two_theta_ka2 > two_theta[-1])
+        self.size = n
+
+    # 取各网格点对应 Kα1 位置的强度（沿第 0 轴作用，可同时处理雅可比矩阵的各列）
+    # fill 为 None 时超出范围取端点值（np.interp），否则取 fill（interp1d 的 fill_value）
+    def shift(self, intensity, fill=None):
+        shifted = self.matrix @ np.asarray(intensity, dtype=float)
+        if fill is not None:
+            shifted[self.outside] = fill
+        return shifted
+
+    # 回添Kα2强度
+    def decorrect(self, intensity):
+        return intensity + self.shift(intensity) * 0.5
+
+_ka2_operators = {}
+
+# 获取（或构建并缓存）指定 2θ 网格与波长组合的 Kα2 位移算子
+def get_ka2_operator(two_theta, lambda_ka1=1.54056, lambda_ka2=1.54439):
+    two_theta = np.ascontiguousarray(two_theta, dtype=float)
+    key = (two_theta.size, hash(two_theta.tobytes()), lambda_ka1, lambda_ka2)
+    operator = _ka2_operators.get(key)
+    if operator is None:
+        if len(_ka2_operators) >= 32:
+            _ka2_operators.pop(next(iter(_ka2_operators)))
+        operator = _ka2_operators[key] = Ka2Operator(two_theta, lambda_ka1, lambda_ka2)
+    return operator
+
+# 迭代法Kα2校正
+def correct_ka2(two_theta, intensity, intensity_0=None, lambda_ka1=1.54056, lambda_ka2=1.54439, iterations=8):
+    with profiler.stage('ka2_correct'):
+        return _correct_ka2(two_theta, intensity, intensity_0, lambda_ka1, lambda_ka2, iterations)
+
+def _correct_ka2(two_theta, intensity, intensity_0, lambda_ka1, lambda_ka2, iterations):
+    operator = get_ka2_operator(two_theta, lambda_ka1, lambda_ka2)
+
+    if intensity_0 is not None:
+        corrected_intensity = intensity_0
+    else:
+        corrected_intensity = intensity.copy()
+        
+    for _ in range(iterations):
+        bg_fill = np.mean(corrected_intensity[:30])
+        ka2_intensity = operator.shift(corrected_intensity, fill=bg_fill) * 0.5
+        ka2_intensity *= operator.valid
+        corrected_intensity = np.clip(intensity - ka2_intensity, 0, None)
+    
+    return two_theta, corrected_intensity
+
+# 回添Kα2强度
+def decorrect_ka2(two_theta, intensity, lambda_ka1=1.54056, lambda_ka2=1.54439):
+    return get_ka2_operator(two_theta, lambda_ka1, lambda_ka2).decorrect(intensity)
+
+# 回添Kα2强度（雅可比矩阵）：回添为线性运算，同一算子一次作用于全部偏导数列
+def decorrect_ka2_jac(two_theta, jac, lambda_ka1=1.54056, lambda_ka2=1.54439):
+    return get_ka2_operator(two_theta, lambda_ka1, lambda_ka2).decorrect(jac)
+
+# 拟合网格：截取拟合区间 roi，并在远离峰位的平坦背景处自适应合并相邻点，模型求值只覆盖信息量大的点
+# 峰位 ± window 内保留全部点；其外合并宽度不超过到最近峰位距离超出 window 部分的一半，且不超过 max_bin 点
+# 合并点取区间内 2θ 与强度的平均值，拟合权重为合并点数（sigma = 1/√点数），加权残差平方和近似等于原网格残差平方和
+class FitGrid:
+    def __init__(self, x, centers, roi=None, window=1.0, max_bin=1):
+        x = np.asarray(x, dtype=float)
+        if roi is None:
+            self.lo, self.hi = 0, x.size
+        else:
+            self.lo, self.hi = np.searchsorted(x, roi[0], side='left'), np.searchsorted(x, roi[1], side='right')
+        xs = x[self.lo:self.hi]
+        starts = np.arange(xs.size)
+        if max_bin > 1 and xs.size > 1:
+            step = np.median(np.diff(xs))
+            distance = np.min(np.abs(xs[:, None] - np.asarray(centers, dtype=float)[None, :]), axis=1)
+            allowed = np.clip(((distance - window) / (2 * step)).astype(int), 1, max_bin)
+            starts, i = [], 0
+            while i < xs.size:
+                starts.append(i)
+                i += int(allowed[i:i + allowed[i]].min())
+            starts = np.array(starts)
+        self.starts = starts
+        self.counts = np.diff(np.append(starts, xs.size))
+        self.x = self.reduce(x)
+        self.sigma = 1 / np.sqrt(self.counts) if self.counts.max(initial=1) > 1 else None
+
+    # 将原网格上的强度（..., len(x)）截取并合并到拟合网格
+    def reduce(self, y):
+        y = np.asarray(y, dtype=float)[..., self.lo:self.hi]
+        return np.add.reduceat(y, self.starts, axis=-1) / self.counts
+
+_fit_grids = {}
+
+# 获取（或构建并缓存）指定 2θ 网格与拟合网格参数的 FitGrid
+def get_fit_grid(x, centers, roi=None, window=1.0, max_bin=1):
+    x = np.ascontiguousarray(x, dtype=float)
+    key = (x.size, hash(x.tobytes()), tuple(centers), roi, window, max_bin)
+    grid = _fit_grids.get(key)
+    if grid is None:
+        if len(_fit_grids) >= 32:
+            _fit_grids.pop(next(iter(_fit_grids)))
+        grid = _fit_grids[key] = FitGrid(x, centers, roi, window, max_bin)
+    return grid
+
+# Savitzky-Golay 平滑（scipy.signal 导入耗时约 1 s，仅在需要平滑时导入）
+def savgol_smooth(y, window=25, order=3, axis=-1):
+    from scipy.signal import savgol_filter
+    return savgol_filter(y, window, order, axis=axis)
+
+# 查找峰高数据
+def find_peak_tip(x: np.ndarray, y: np.ndarray, c: float, delt = 0.1):
+    mask = (x >= c - delt) & (x <= c + delt)
+    if not np.any(mask):
+        return float(np.max(y) - np.min(y))
+    return np.max(y[mask]) - np.min(y)
+
+"""数学模型定义"""
+# 定义 Gaussian 函数
+def gaussian(x: np.ndarray, amplitude: float, center: float, sigma: float) -> np.ndarray:
+    return amplitude * np.exp(-((x - center) / sigma)**2)
+
+# 定义 Lorentzian 函数
+def lorentzian(x: np.ndarray, amplitude: float, center: float, sigma: float) -> np.ndarray:
+    return amplitude / (1 + ((x - center) / sigma)**2)
+
+# 定义 Pseudo-Voigt 函数：高斯函数和洛伦兹函数的线性组合
+def pseudo_voigt(x: np.ndarray, amplitude: float, center: float, sigma: float, eta: float) -> np.ndarray:
+    return eta * lorentzian(x, amplitude, center, sigma) + (1 - eta) * gaussian(x, amplitude, center, sigma)
+
+# 定义 Split-Pearson VII 函数：两侧具有不同形状参数的 Pearson VII 函数
+# 先按所在侧选取半宽，每个点只计算所需的一侧分支
+def split_pearson_vii(x: np.ndarray, a: float, x0: float, w_L: float, w_R: float, m: float) -> np.ndarray:
+    w = np.where(x <= x0, w_L, w_R)
+    return a / (1 + (4 * (x - x0)**2 / w**2) * (2**(1/m) - 1))**m
+
+# 峰表形式的 Split-Pearson VII 函数：table 为 (N, 5) 峰参数表（a, x0, w_L, w_R, m），
+# 一次广播计算全部 N 个峰，返回 (N, len(x)) 各峰曲线
+def split_pearson_vii_table(x: np.ndarray, table: np.ndarray) -> np.ndarray:
+    a, x0, w_L, w_R, m = (col[:, None] for col in np.asarray(table, dtype=float).T)
+    dx = x - x0
+    w = np.where(dx <= 0, w_L, w_R)
+    return a / (1 + (4 * dx**2 / w**2) * (2**(1/m) - 1))**m
+
+# 峰表形式的 Split-Pearson VII 解析偏导数，返回 (N, len(x), 5)
+# 左右两侧分别只对本侧半宽求导，另一侧半宽的偏导数为 0
+def split_pearson_vii_table_jac(x: np.ndarray, table: np.ndarray) -> np.ndarray:
+    a, x0, w_L, w_R, m = (col[:, None] for col in np.asarray(table, dtype=float).T)
+    dx = x - x0
+    left = dx <= 0
+    w = np.where(left, w_L, w_R)
+    k = np.expm1(np.log(2) / m)  # 2^(1/m) - 1
+    u = 4 * dx**2 / w**2
+    base = 1 + u * k
+    log_base = np.log1p(u * k)
+    peak_a = np.exp(-m * log_base)  # 对 a 的偏导数即单位峰高的峰形（与 ∂/∂m 共用 log(base)，省去一次幂运算）
+    common = a * m * k * peak_a / base
+    d_w = common * 2 * u / w
+    # 按参数分块连续写入，最后一维转置为 (N, len(x), 5)
+    jac = np.empty((5,) + dx.shape)
+    jac[0] = peak_a
+    jac[1] = common * 8 * dx / w**2
+    jac[2] = np.where(left, d_w, 0)
+    jac[3] = np.where(left, 0, d_w)
+    jac[4] = a * peak_a * (u * (k + 1) * np.log(2) / (m * base) - log_base)
+    return np.moveaxis(jac, 0, -1)
+
+# Split-Pearson VII 函数对 (a, x0, w_L, w_R, m) 的解析偏导数，返回 (len(x), 5) 雅可比矩阵
+def split_pearson_vii_jac(x: np.ndarray, a: float, x0: float, w_L: float, w_R: float, m: float) -> np.ndarray:
+    return split_pearson_vii_table_jac(x, [[a, x0, w_L, w_R, m]])[0]
+
+# 定义二阶切比雪夫多项式
+def chebyshev(x: np.ndarray, c0, c1, c2):
+    return Chebyshev([c0, c1, c2])(x)
+
+# 二阶切比雪夫多项式对 (c0, c1, c2) 的偏导数，即 T0、T1、T2
+def chebyshev_jac(x: np.ndarray, c0, c1, c2):
+    return np.polynomial.chebyshev.chebvander(x, 2)
+
+"""N 峰模型引擎"""
+# 多峰模型：由峰表（N × 5）+ 切比雪夫背景系数描述，可选模型内回添 Kα2
+# 参数向量排列与原手写拟合函数一致：[a1, x01, w_L1, w_R1, m1, ..., c0, c1, ...]，可直接用于 curve_fit
+# 新物相模型（如 SiOx、硬碳包峰）只需定义峰名与初始峰位，无需再手写多参数函数
+# support 为各峰计算范围（以半宽的倍数计），设定后仅在峰位附近计算该峰，默认 None 在全网格计算；
+# 范围外截断的峰尾在范围边界处不超过 a / (1 + 4·support²·(2^(1/m) - 1))^m，m 接近 1 的宽尾峰需较大的 support
+class PeakModel:
+    def __init__(self, names, centers, background_order=2, ka2=False, support=None):
+        self.names = list(names)
+        self.centers = list(centers)
+        self.n_peaks = len(self.names)
+        self.n_background = background_order + 1
+        self.n_params = 5 * self.n_peaks + self.n_background
+        self.ka2 = ka2
+        self.support = support
+
+    # 拆分参数向量为峰表 (N, 5) 与背景系数
+    def split(self, params):
+        params = np.asarray(params, dtype=float)
+        return params[:5 * self.n_peaks].reshape(self.n_peaks, 5), params[5 * self.n_peaks:]
+
+    # 峰计算范围对应的网格下标区间（x 需单调递增）
+    def _spans(self, x, table):
+        half = self.support * np.maximum(np.abs(table[:, 2]), np.abs(table[:, 3]))
+        lo = np.searchsorted(x, table[:, 1] - half, side='left')
+        hi = np.searchsorted(x, table[:, 1] + half, side='right')
+        return zip(lo, hi)
+
+    # 各净峰曲线，返回 (N, len(x))
+    def peaks(self, x, params):
+        table, _ = self.split(params)
+        if self.support is None:
+            return split_pearson_vii_table(x, table)
+        curves = np.zeros((self.n_peaks, np.size(x)))
+        for i, (lo, hi) in enumerate(self._spans(x, table)):
+            if hi > lo:
+                curves[i, lo:hi] = split_pearson_vii_table(x[lo:hi], table[i:i + 1])[0]
+        return curves
+
+    # 背景曲线
+    def background(self, x, params):
+        _, coef = self.split(params)
+        return np.polynomial.chebyshev.chebval(x, coef)
+
+    # 峰 + 背景（不含 Kα2）
+    def evaluate(self, x, params):
+        return self.peaks(x, params).sum(axis=0) + self.background(x, params)
+
+    # 模型函数，签名与 curve_fit 所需一致（每次求值为一个时间预算检查点，见 time_budget，下同）
+    def __call__(self, x, *params):
+        time_budget.check()
+        y = self.evaluate(x, params)
+        return decorrect_ka2(x, y) if self.ka2 else y
+
+    # 解析雅可比矩阵 (len(x), n_params)，Kα2 回添为线性运算，链式作用于各列
+    def jac(self, x, *params):
+        time_budget.check()
+        table, _ = self.split(params)
+        jac = np.zeros((np.size(x), self.n_params))
+        if self.support is None:
+            jac[:, :5 * self.n_peaks] = split_pearson_vii_table_jac(x, table).transpose(1, 0, 2).reshape(np.size(x), -1)
+        else:
+            for i, (lo, hi) in enumerate(self._spans(x, table)):
+                if hi > lo:
+                    jac[lo:hi, 5 * i:5 * i + 5] = split_pearson_vii_table_jac(x[lo:hi], table[i:i + 1])[0]
+        jac[:, 5 * self.n_peaks:] = np.polynomial.chebyshev.chebvander(x, self.n_background - 1)
+        return decorrect_ka2_jac(x, jac) if self.ka2 else jac
+
+    # 批量模型函数：K 个共用同一 2θ 网格的样品，params 为 (K, n_params)，一次广播计算返回 (K, len(x))
+    # 批量计算始终在全网格上计算各峰（不使用 support）
+    def batch(self, x, params):
+        time_budget.check()
+        params = np.atleast_2d(np.asarray(params, dtype=float))
+        k, n = len(params), np.size(x)
+        table = params[:, :5 * self.n_peaks].reshape(k * self.n_peaks, 5)
+        y = split_pearson_vii_table(x, table).reshape(k, self.n_peaks, n).sum(axis=1)
+        y += params[:, 5 * self.n_peaks:] @ np.polynomial.chebyshev.chebvander(x, self.n_background - 1).T
+        return get_ka2_operator(x).decorrect(y.T).T if self.ka2 else y
+
+    # 批量解析雅可比矩阵，返回 (K, len(x), n_params)；Kα2 回添算子一次作用于全部样品的全部偏导数列
+    def batch_jac(self, x, params):
+        time_budget.check()
+        params = np.atleast_2d(np.asarray(params, dtype=float))
+        k, n = len(params), np.size(x)
+        table = params[:, :5 * self.n_peaks].reshape(k * self.n_peaks, 5)
+        jac = np.empty((k, n, self.n_params))
+        jac[:, :, :5 * self.n_peaks] = (split_pearson_vii_table_jac(x, table).reshape(k, self.n_peaks, n, 5)
+                                        .transpose(0, 2, 1, 3).reshape(k, n, 5 * self.n_peaks))
+        jac[:, :, 5 * self.n_peaks:] = np.polynomial.chebyshev.chebvander(x, self.n_background - 1)
+        if self.ka2:
+            flat = jac.transpose(1, 0, 2).reshape(n, k * self.n_params)
+            jac = get_ka2_operator(x).decorrect(flat).reshape(n, k, self.n_params).transpose(1, 0, 2)
+        return jac
+
+    # 由峰位附近峰高构建初始参数（半宽 0.1°，形状参数 m = 1.5，背景为 0）
+    def initial_guess(self, x, y, width=0.1, m=1.5):
+        p0 = []
+        for center in self.centers:
+            p0 += [find_peak_tip(x, y, center), center, width, width, m]
+        return p0 + [0] * self.n_background
+
+# 固定部分参数的峰模型（拟合降级策略中去掉次要峰、固定形状参数 m 时使用）：fixed 为 {参数下标: 固定值}，
+# 模型函数与雅可比矩阵只接受其余的自由参数，可直接用于 curve_fit；expand 将拟合得到的自由参数还原为完整参数向量
+class FixedParamsModel:
+    def __init__(self, model, fixed):
+        self.model = model
+        self.fixed = dict(fixed)
+        self.free_index = np.array([i for i in range(model.n_params) if i not in self.fixed])
+        self.n_params = len(self.free_index)
+
+    # 完整参数向量中的自由参数
+    def free(self, params):
+        return np.asarray(params, dtype=float)[self.free_index]
+
+    # 由自由参数还原完整参数向量
+    def expand(self, free):
+        params = np.empty(self.model.n_params)
+        params[list(self.fixed)] = list(self.fixed.values())
+        params[self.free_index] = free
+        return params
+
+    def __call__(self, x, *free):
+        return self.model(x, *self.expand(free))
+
+    def jac(self, x, *free):
+        return self.model.jac(x, *self.expand(free))[:, self.free_index]
+
+# 各计算模块的峰模型
+SI111_MODEL = PeakModel(['Silicon [111]'], [28.4])
+D002_MODEL = PeakModel(['Graphite [002]', 'Silicon [111]'], [26.5, 28.4])
+D002_RAW_MODEL = PeakModel(D002_MODEL.names, D002_MODEL.centers, ka2=True)
+OI_MODEL = PeakModel(['Graphite [004]', 'Silicon [311]', 'Silicon [400]', 'Silicon [331]', 'Graphite [110]'],
+                     [54.23, 56.12, 69.14, 76.38, 77.55])
+OI_RAW_MODEL = PeakModel(OI_MODEL.names, OI_MODEL.centers, ka2=True)
+
+"""反卷积模型"""
+# 洛伦兹净峰与硅峰卷积模型：结果等价于 convolve(kernel, lorentzian(x, amplitude, center, sigma), mode='same')
+# 硅峰（卷积核）在拟合过程中固定：仅截取高于峰高 threshold 的窗口，预先计算其 FFT，
+# 每次求值只需对洛伦兹峰（求雅可比矩阵时为其 3 个偏导数）做一次批量 FFT 卷积
+class LorentzianConvolution:
+    def __init__(self, x, kernel, threshold=1e-10):
+        kernel = np.asarray(kernel, dtype=float)
+        above = np.flatnonzero(kernel >= threshold * kernel.max())
+        j0, j1 = above[0], above[-1] + 1
+        self.n = np.size(x)
+        self.full_size = self.n + (j1 - j0) - 1  # 完整线性卷积长度
+        self.fft_size = next_fast_len(self.full_size, real=True)
+        self.kernel_fft = rfft(kernel[j0:j1], self.fft_size)
+        # 'same' 模式输出第 i 点对应截取窗口后完整卷积的第 i + offset 点，超出完整卷积范围的点为 0
+        self.offset = (self.n - 1) // 2 - j0
+        self.lo = max(0, -self.offset)
+        self.hi = min(self.n, self.full_size - self.offset)
+
+    # 对 (..., n) 曲线逐行与卷积核卷积，返回 (..., n)
+    def convolve(self, curves):
+        full = irfft(rfft(curves, self.fft_size) * self.kernel_fft, self.fft_size)
+        out = np.zeros(np.shape(curves)[:-1] + (self.n,))
+        out[..., self.lo:self.hi] = full[..., self.lo + self.offset:self.hi + self.offset]
+        return out
+
+    def __call__(self, x, amplitude, center, sigma):
+        time_budget.check()
+        return self.convolve(lorentzian(x, amplitude, center, sigma))
+
+    # 解析雅可比矩阵：卷积为线性运算，对各参数的偏导数即洛伦兹峰偏导数与卷积核的卷积，返回 (n, 3)
+    def jac(self, x, amplitude, center, sigma):
+        time_budget.check()
+        u = (x - center) / sigma
+        q = 1 / (1 + u**2)
+        d_amplitude = q
+        d_center = amplitude * 2 * u / sigma * q**2
+        d_sigma = amplitude * 2 * u**2 / sigma * q**2
+        return self.convolve(np.stack([d_amplitude, d_center, d_sigma])).T
+
+# 峰参数（a, x0, w_L, w_R, m）是否为对称洛伦兹峰
+def _is_lorentzian(params, tol=1e-3):
+    _, _, w_L, w_R, m = params
+    return abs(m - 1) < tol and abs(abs(w_L) - abs(w_R)) <= tol * max(abs(w_L), abs(w_R))
+
+# 反卷积计算净石墨半峰宽：以硅峰为仪器展宽，拟合洛伦兹净峰与硅峰的卷积，使其逼近平移至硅峰位的石墨峰形，
+# 净半峰宽为洛伦兹峰半峰宽 2|sigma|
+# 石墨峰与硅峰均为对称洛伦兹峰时卷积有解析解（两洛伦兹峰卷积仍为洛伦兹峰，半峰宽相加），直接取半峰宽之差
+# p0 为洛伦兹净峰初值 (amplitude, center, sigma)；return_params 为真时另返回拟合的洛伦兹参数（解析解时为 None）
+def calculate_fwhm_net(x, graphite, silicon, silicon_peak=None, p0=(1.0, 27.0, 0.1), return_params=False):
+    graphite = np.asarray(graphite, dtype=float)
+    silicon = np.asarray(silicon, dtype=float)
+    if _is_lorentzian(graphite) and _is_lorentzian(silicon):
+        fwhm = calculate_fwhm_spv(graphite[2], graphite[3]) - calculate_fwhm_spv(silicon[2], silicon[3])
+        if fwhm > 0:
+            return (fwhm, None) if return_params else fwhm
+    if silicon_peak is None:
+        silicon_peak = split_pearson_vii(x, *silicon)
+    graphite_peak_shift = split_pearson_vii(x, silicon[0], silicon[1], graphite[2], graphite[3], graphite[4])
+    with profiler.stage('deconvolution'):
+        model = LorentzianConvolution(x, silicon_peak)
+        params, _, info, _, _ = curve_fit(model, x, graphite_peak_shift, p0=list(p0), jac=model.jac, full_output=True)
+    profiler.count('deconvolution_nfev', info['nfev'])
+    return (2 * abs(params[2]), params) if return_params else 2 * abs(params[2])
+
+# 多组峰参数的净石墨半峰宽（如误差估计中的扰动参数）：graphites / silicons 为 (K, 5)，silicon_peaks 为 (K, len(x))，返回 (K,)
+# 第一组与 calculate_fwhm_net 完全相同（拟合失败时抛出异常），之后各组以上一组拟合的洛伦兹参数为初值（各组参数相近，迭代次数大幅减少）
+def calculate_fwhm_net_batch(x, graphites, silicons, silicon_peaks=None):
+    fwhm = np.empty(len(graphites))
+    p0 = (1.0, 27.0, 0.1)
+    for i in range(len(graphites)):
+        silicon_peak = None if silicon_peaks is None else silicon_peaks[i]
+        try:
+            fwhm[i], params = calculate_fwhm_net(x, graphites[i], silicons[i], silicon_peak, p0, return_params=True)
+        except RuntimeError:
+            if i == 0:
+                raise
+            fwhm[i], params = np.nan, None  # 其余各组反卷积不收敛时记为 nan
+        if params is not None:
+            p0 = tuple(params)
+    return fwhm
+
+"""拟合函数定义"""
+# 定义单峰拟合函数（Split-Pearson VII 峰 + 二阶切比雪夫背景）
+def single_peak(x: np.ndarray, *params):
+    return SI111_MODEL(x, *params)
+
+# 定义双峰拟合函数（2个Split-Pearson VII 峰 + 二阶切比雪夫背景）
+def double_peak(x, *params):
+    return D002_MODEL(x, *params)
+
+# 定义双峰直接拟合函数（2个Split-Pearson VII 峰 + 二阶切比雪夫背景 + Kaplha2）
+def double_peak_raw(x, *params):
+    return D002_RAW_MODEL(x, *params)
+
+# 定义多峰拟合函数（5个Split-Pearson VII 峰 + 二阶切比雪夫背景）
+def oi_peak(x, *params):
+    return OI_MODEL(x, *params)
+
+# 定义多峰直接拟合函数（5个Split-Pearson VII 峰 + 二阶切比雪夫背景）
+def oi_peak_raw(x, *params):
+    return OI_RAW_MODEL(x, *params)
+
+"""计算函数定义"""
+# 计算 Split-Pearson VII 函数的半峰宽（解析解）
+# x0 ± w/2 处 (1 + (2^(1/m) - 1))^m = 2，两侧半高点与 m 无关，FWHM = (|w_L| + |w_R|) / 2；支持数组参数
+def calculate_fwhm_spv(w_L, w_R, m=None):
+    return (np.abs(w_L) + np.abs(w_R)) / 2
+
+# 峰表形式的 Split-Pearson VII 半峰宽：table 为 (N, 5) 峰参数表，返回 (N,)
+def split_pearson_vii_fwhm(table: np.ndarray) -> np.ndarray:
+    table = np.atleast_2d(np.asarray(table, dtype=float))
+    return calculate_fwhm_spv(table[:, 2], table[:, 3])
+
+# Split-Pearson VII 单侧积分 ∫[0, d] (1 + c·t²)^(-m) dt = B(1/2, m-1/2) · I_z(1/2, m-1/2) / (2√c)，
+# 其中 c = 4(2^(1/m) - 1)/w²，z = c·d²/(1 + c·d²)；d 为 inf 时 z = 1，即半侧全积分
+# m ≤ 1/2 时峰尾积分发散，返回 nan
+def _spv_side_integral(d, w, m):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c = 4 * np.expm1(np.log(2) / m) / w**2  # 2^(1/m) - 1，m 很大时以 expm1 保证精度
+        z = 1 / (1 + 1 / (c * d**2))
+        beta = np.exp(gammaln(0.5) + gammaln(m - 0.5) - gammaln(m))
+        return np.where(m > 0.5, beta * betainc(0.5, m - 0.5, z) / (2 * np.sqrt(c)), np.nan)
+
+# 峰表形式的 Split-Pearson VII 峰面积（解析积分），积分区间 [lo, hi] 默认为全实轴，返回 (N,)
+# 全实轴面积 = a · √π · Γ(m - 1/2) / (Γ(m) · √(2^(1/m) - 1)) · (|w_L| + |w_R|) / 4
+def split_pearson_vii_area(table: np.ndarray, lo: float = -np.inf, hi: float = np.inf) -> np.ndarray:
+    a, x0, w_L, w_R, m = np.atleast_2d(np.asarray(table, dtype=float)).T
+
+    # 以峰位为原点的有符号原函数
+    def primitive(x):
+        d = x - x0
+        w = np.where(d < 0, np.abs(w_L), np.abs(w_R))
+        return np.sign(d) * _spv_side_integral(np.abs(d), w, m)
+
+    return a * (primitive(hi) - primitive(lo))
+
+# 峰表形式的 Split-Pearson VII 积分宽度（全实轴峰面积 / 峰高），返回 (N,)
+def split_pearson_vii_breadth(table: np.ndarray) -> np.ndarray:
+    table = np.atleast_2d(np.asarray(table, dtype=float))
+    return split_pearson_vii_area(table) / table[:, 0]
+
+# 兼容 numpy 1.x (trapz) / 2.x (trapezoid) 的梯形积分
+def _trapz(y, x):
+    trapz_func = getattr(np, 'trapezoid', None) or np.trapz
+    return trapz_func(y, x)
+
+# 前缀积分质心引擎：K 条共用同一 2θ 网格的净峰曲线（同一样品的多个峰或多个样品）同时计算 IUCr 迭代重心
+# 预先计算 y 与 x·y 的累积梯形积分，任意窗口 [lo, hi] 的面积与一阶矩由两端前缀积分相减得到：
+# 窗口内首末网格点由 searchsorted 定位（O(log N)），与对窗口内网格点（lo ≤ x ≤ hi）做梯形积分一致，
+# 窗口端点不插值（粗网格上插值会使质心偏移可达约 0.1°）
+# 迭代窗口总是包含峰高 1% 以上的有效范围，前缀积分只在各曲线有效范围及初始窗口外延 REGION_MARGIN 倍的区间内计算；
+# 窗口超出该区间时（极少出现）改为在完整网格上计算，结果不变
+class CentroidEngine:
+    REGION_MARGIN = 1.5
+
+    def __init__(self, x, curves):
+        self.x = x = np.asarray(x, dtype=float)
+        self.y = y = np.array(np.atleast_2d(curves), dtype=float)
+        np.maximum(y, 0, out=y)
+        self.k, n = y.shape
+        self.rows = np.tile(np.arange(self.k), 2)
+        self.peak_max = y.max(axis=1) if n else np.zeros(self.k)
+        # 峰超过峰高 1% 的有效范围（用于每次迭代自动推导积分窗口半宽）
+        above = y >= 0.01 * self.peak_max[:, None]
+        self.has_support = above.any(axis=1) & (self.peak_max > 0)
+        self.support_lo = np.where(self.has_support, x[np.argmax(above, axis=1)], np.nan)
+        self.support_hi = np.where(self.has_support, x[n - 1 - np.argmax(above[:, ::-1], axis=1)], np.nan)
+        self.start = None
+
+    # 在各曲线网格下标区间 [start, stop] 内计算前缀积分（各行补齐为同一长度，补齐部分网格间距为 0）
+    def _build(self, start, stop):
+        n = self.x.size
+        idx = np.minimum(start[:, None] + np.arange(int((stop - start).max()) + 1), n - 1)
+        x = self.x[idx]
+        y = self.y[np.arange(self.k)[:, None], idx]
+        half_dx = np.zeros_like(x)
+        half_dx[:, :-1] = np.diff(x, axis=1) / 2
+        weight = half_dx.copy()
+        weight[:, 1:] += half_dx[:, :-1]
+        # 梯形积分前缀以节点权重表示：F_i = Σ_{j≤i} y_j·a_j − y_i·Δx_i/2，a_j = (Δx_{j−1} + Δx_j)/2
+        self.mass_prefix = np.cumsum(y * weight, axis=1) - y * half_dx
+        self.moment_prefix = np.cumsum(y * (x * weight), axis=1) - y * x * half_dx
+        self.start, self.stop = start, stop
+
+    # 按初始窗口中心与半宽确定前缀积分区间
+    def _build_region(self, centers, half):
+        reach = self.REGION_MARGIN * np.where(np.isfinite(half), half, np.inf)
+        lo = np.fmin(centers, self.support_lo) - reach
+        hi = np.fmax(centers, self.support_hi) + reach
+        start = np.clip(np.searchsorted(self.x, lo, side='right') - 1, 0, self.x.size - 1)
+        stop = np.clip(np.searchsorted(self.x, hi, side='left'), 0, self.x.size - 1)
+        self._build(np.where(np.isfinite(lo), start, 0), np.where(np.isfinite(hi), stop, self.x.size - 1))
+
+    # 各曲线在窗口 [lo, hi]（(K,)）内网格点上的面积与一阶矩：两端各一次查找、一次取值
+    # 窗口内网格点少于 2 个时面积为 0（调用方视为无法计算）
+    def moments(self, lo, hi):
+        x = self.x
+        if self.start is None:
+            self._build(np.zeros(self.k, dtype=int), np.full(self.k, x.size - 1))
+        first = np.searchsorted(x, lo, side='left')
+        last = np.searchsorted(x, hi, side='right') - 1
+        i = np.clip(np.concatenate([first, np.maximum(last, first)]), 0, x.size - 1)
+        j = i - self.start[self.rows]
+        if np.any((j < 0) | (i > self.stop[self.rows])):
+            self._build(np.zeros(self.k, dtype=int), np.full(self.k, x.size - 1))
+            j = i
+        mass = self.mass_prefix[self.rows, j]
+        moment = self.moment_prefix[self.rows, j]
+        return mass[self.k:] - mass[:self.k], moment[self.k:] - moment[:self.k]
+
+    # 窗口半宽：fixed 为给定的固定半宽，否则为有效范围两侧到质心距离的较大者 ×1.02
+    def _half_width(self, centroid, fixed=None):
+        if fixed is not None:
+            return np.full(self.k, float(fixed))
+        return np.maximum(centroid - self.support_lo, self.support_hi - centroid) * 1.02
+
+    # IUCr 迭代重心（同 calculate_centroid），全部曲线同时迭代，各自收敛后不再更新
+    # centers 为各曲线初始窗口中心（默认最大强度位置），window 为固定窗口半宽（默认每次迭代自动推导）
+    # 返回 (质心 (K,), 积分范围下限 (K,), 积分范围上限 (K,))；峰高非正时质心为 nan，无法确定窗口时积分范围为 nan
+    def centroids(self, centers=None, window=None, tol=0.001, max_iter=100):
+        if centers is None:
+            centers = self.x[np.argmax(self.y, axis=1)]
+        centroid = np.array(np.broadcast_to(np.asarray(centers, dtype=float), (self.k,)))
+        valid = self.peak_max > 0
+        active = valid & (self.has_support if window is None else True)
+        with np.errstate(all='ignore'):
+            half = self._half_width(centroid, window)
+            if self.start is None:
+                self._build_region(centroid, half)
+            for _ in range(max_iter):
+                if not active.any():
+                    break
+                mass, moment = self.moments(centroid - half, centroid + half)
+                new = moment / mass
+                ok = active & (half > 0) & (mass > 0) & np.isfinite(new)
+                active = ok & (np.abs(new - centroid) >= tol)
+                centroid = np.where(ok, new, centroid)
+                half = self._half_width(centroid, window)
+        bad = ~(half > 0)
+        return (np.where(valid, centroid, np.nan),
+                np.where(bad, np.nan, centroid - half), np.where(bad, np.nan, centroid + half))
+
+# 计算拟合峰曲线的质心（强度加权平均位置，2θ）
+# 参照 IUCr 重心法（Centroid Method）：在背景扣除后的净峰曲线上，
+# 以峰中心对称的角窗口内积分，避免全扫描范围非对称截断引入的系统性偏差。
+# 采用迭代收敛：以最大强度位置（或给定 center）为初始窗口中心计算质心，
+# 再将前次计算出的质心作为新的窗口中心重复积分，
+# 每次迭代同时重新计算窗口半宽（净峰降至峰高 1% 处两侧较大者 ×1.02），
+# 直至两次计算的角度变化 < tol（默认 0.001°）。
+# 窗口积分由 CentroidEngine 的前缀积分得到，每次迭代只需 O(log N) 查找
+def calculate_centroid(x: np.ndarray, peak_curve: np.ndarray,
+                       center: float = None, window: float = None,
+                       tol: float = 0.001, max_iter: int = 100,
+                       return_window: bool = False):
+    centroid, lo, hi = CentroidEngine(x, peak_curve).centroids(None if center is None else [center], window, tol, max_iter)
+    if return_window:
+        return float(centroid[0]), (float(lo[0]), float(hi[0]))
+    return float(centroid[0])
+
+# 同一网格上多个净峰曲线的质心（一次计算），curves 为 (K, N)，centers 为各峰初始窗口中心
+# 返回 [(质心, (积分范围下限, 上限)), ...]
+def calculate_centroids(x: np.ndarray, curves, centers=None, window: float = None,
+                        tol: float = 0.001, max_iter: int = 100):
+    centroid, lo, hi = CentroidEngine(x, curves).centroids(centers, window, tol, max_iter)
+    return [(float(c), (float(a), float(b))) for c, a, b in zip(centroid, lo, hi)]
+
+# 计算拟合峰曲线的面积
+# 给定峰参数 params（a, x0, w_L, w_R, m）时按解析积分计算扫描范围内的峰面积，不在网格上做梯形积分；
+# 解析积分不适用（m ≤ 1/2）时退回梯形积分
+def calculate_peak_area(x: np.ndarray, peak_curve: np.ndarray = None, params=None) -> float:
+    if params is not None:
+        area = float(split_pearson_vii_area(params, x.min(), x.max())[0])
+        if np.isfinite(area):
+            return max(area, 0.0)
+        if peak_curve is None:
+            peak_curve = split_pearson_vii(x, *params)
+    return _trapz(np.clip(peak_curve, 0, None), x)
+
+# 计算 Pseudo-Voigt 函数的半峰宽
+def calculate_fwhm_pv(sigma, eta):
+    fwhm_lorentz = 2 * sigma  # 洛伦兹成分的半峰宽
+    fwhm_gauss = 2 * sigma * np.sqrt(2 * np.log(2))  # 高斯成分的半峰宽
+    return eta * fwhm_lorentz + (1 - eta) * fwhm_gauss
+
+# 计算校正后半峰宽 参考 JIS R 7651:2007（固定参数，有错误）
+def calculate_fwhm_jis(g002_fwhm, si111_fwhm):
+    v = si111_fwhm / g002_fwhm
+    return g002_fwhm * (0.9981266 - 0.0681532 * v - 2.592769 * v**2 + 2.621163 * v**3 - 0.9584715 * v**4)
+
+# 以峰模型及其解析雅可比矩阵拟合数据（sigma 为各点不确定度，合并网格时按合并点数加权）
+# 记录模型求值次数 nfev 与雅可比矩阵求值次数 njev（见 profiler）
+def fit_model(model, x, y, p0, sigma=None):
+    try:
+        with profiler.stage('curve_fit'):
+            popt, _, info, _, _ = curve_fit(model, x, y, p0=p0, sigma=sigma, jac=model.jac, full_output=True)
+        profiler.count('nfev', info['nfev'])
+        profiler.count('njev', info.get('njev', 0))
+        return popt
+    except RuntimeError as e:
+        print(f"拟合失败: {e}")
+        return None
+
+# G[002]+Si[111] 双峰模型拟合数据（p0 为空时由峰位附近峰高构建初值，下同）
+def fit_data_d002(x, y, p0=None, sigma=None):
+    return fit_model(D002_MODEL, x, y, D002_MODEL.initial_guess(x, y) if p0 is None else p0, sigma)
+    
+# G[002]+Si[111] 双峰模型拟合数据(直接拟合)
+def fit_data_d002_raw(x, y, p0=None, sigma=None):
+    return fit_model(D002_RAW_MODEL, x, y, D002_RAW_MODEL.initial_guess(x, y) if p0 is None else p0, sigma)
+
+# Si[111] 单峰模型初值
+def initial_guess_sifwhm(x, y):
+    return [max(y)-min(y), 28.4, 0.3, 0.3, 0.6, 0, 0, 0]
+
+# Si[111] 单峰模型拟合数据（拟合前 Savitzky-Golay 平滑，x 需为等间距网格）
+def fit_data_sifwhm(x, y, p0=None, sigma=None):
+    if p0 is None:
+        p0 = initial_guess_sifwhm(x, y)
+    y = savgol_smooth(y, 25, 3)
+    return fit_model(SI111_MODEL, x, y, p0, sigma)
+
+# OI值 多峰曲线拟合数据
+def fit_data_oi(x, y, p0=None, sigma=None):
+    return fit_model(OI_MODEL, x, y, OI_MODEL.initial_guess(x, y) if p0 is None else p0, sigma)
+
+# OI值 多峰曲线拟合数据（直接拟合）
+def fit_data_oi_raw(x, y, p0=None, sigma=None):
+    return fit_model(OI_RAW_MODEL, x, y, OI_RAW_MODEL.initial_guess(x, y) if p0 is None else p0, sigma)
+    
+"""曲线计算函数"""
+# G[002]+Si[111] 双峰曲线计算
+def fit_peak_d002(x, popt):
+    fitted_curve = D002_MODEL.evaluate(x, popt)
+    background = D002_MODEL.background(x, popt)
+    graphite_peak, silicon_peak = D002_MODEL.peaks(x, popt)
+
+    # 反卷积计算净石墨半峰宽
+    fwhm = calculate_fwhm_net(x, popt[0:5], popt[5:10], silicon_peak)
+
+    return fitted_curve, background, graphite_peak, silicon_peak, fwhm
+
+# Si[111] 单峰曲线计算
+def fit_peak_sifwhm(x, popt):
+    fitted_curve = SI111_MODEL.evaluate(x, popt)
+    background = SI111_MODEL.background(x, popt)
+    silicon_peak = SI111_MODEL.peaks(x, popt)[0]
+    return fitted_curve, background, silicon_peak
+
+# OI值 多峰曲线计算
+def fit_peak_oi(x, popt):
+    fitted_curve = OI_MODEL.evaluate(x, popt)
+    g004_peak, si311_peak, si400_peak, si331_peak, g110_peak = OI_MODEL.peaks(x, popt)
+    background = OI_MODEL.background(x, popt)
+
+    return fitted_curve, background, g004_peak, si311_peak, si400_peak, si331_peak, g110_peak
\ No newline at end of file
@@ -1,97 +1,310 @@
-import xml.dom.minidom
-import xml.parsers.expat
-import numpy as np
-import struct
-
-# 基础数据读取接口
-class BaseReader:
-    @staticmethod
-    def read_data(file_path):
-        raise NotImplementedError("必须实现read_data方法")
-
-# .xrdml 读取模块
-class XRDMLReader(BaseReader):
-    @staticmethod
-    def read_data(file_path):
-        try:
-            """读取.xrdml文件并返回处理后的数据"""
-            DOMTree = xml.dom.minidom.parse(file_path)
-            collection = DOMTree.documentElement
-            scan_start = float(collection.getElementsByTagName('startPosition')[0].childNodes[0].data)
-            scan_end = float(collection.getElementsByTagName('endPosition')[0].childNodes[0].data)
-            if collection.getElementsByTagName('counts') != []:
-                data_point = collection.getElementsByTagName('counts')[0].childNodes[0].data.split(" ")
-            else:
-                data_point = collection.getElementsByTagName('intensities')[0].childNodes[0].data.split(" ")
-            scan_number = len(data_point)
-            scan_step = (scan_end - scan_start) / (scan_number - 1)
-            scan_x = np.array([scan_start + i * scan_step for i in range(scan_number)])
-            scan_y = np.array([float(pt) for pt in data_point])
-            return scan_x, scan_y
-        except RuntimeError as e:
-            print(f"读取失败: {e}")
-            return None, None
-        except xml.parsers.expat.ExpatError as e:
-            return None, None
-
-# .rd 读取模块
-class PhilipsRDReader(BaseReader):
-    @staticmethod
-    def read_data(file_path):
-        """读取.rd文件并返回处理后的数据"""
-        with open(file_path, 'rb') as f:
-            head = f.read(4)
-            if head not in [b"V3RD", b"V5RD"]:
-                raise ValueError("无效的RD文件")
-            
-            f.seek(214)
-            x_step = np.frombuffer(f.read(8), dtype=np.float64)[0]
-            x_start = np.frombuffer(f.read(8), dtype=np.float64)[0]
-            x_end = np.frombuffer(f.read(8), dtype=np.float64)[0]
-            
-            pt_cnt = int((x_end - x_start) / x_step)
-            f.seek(810 if head == b"V5RD" else 250)
-            ycol = np.frombuffer(f.read(pt_cnt * 2), dtype=np.uint16)
-            ycol = 0.01 * ycol * ycol
-            
-            xcol = np.linspace(x_start + x_step / 2, x_end - x_step / 2, pt_cnt)
-            return xcol, ycol
-        
-# 理学 .raw 读取模块
-class RigakuRawReader(BaseReader):
-    @staticmethod
-    def read_data(file_path):
-        try:
-            with open(file_path, 'rb') as f:
-                header = f.read(3158)
-                f.seek(0x0B92)
-                start_angle = struct.unpack('<f', f.read(4))[0]
-                f.seek(0x0B96)
-                end_angle = struct.unpack('<f', f.read(4))[0]
-                f.seek(0x0B9A)
-                step = struct.unpack('<f', f.read(4))[0]
-                num_points = int(round((end_angle - start_angle) / step)) + 1
-                scan_x = np.arange(start_angle, end_angle + step/2, step)
-
-                f.seek(0x0C56)
-                scan_y = []
-                for _ in range(num_points):
-                    value = struct.unpack('<f', f.read(4))[0]
-                    scan_y.append(value)
-                scan_y = np.array(scan_y)
-            return scan_x, scan_y
-        except RuntimeError as e:
-            print(f"读取失败: {e}")
-            return None, None
-
-# 文件读取工厂函数
-def get_reader(file_type):
-    """根据文件类型返回对应的读取器"""
-    if file_type == "1":
-        return PhilipsRDReader()
-    elif file_type == "2":
-        return XRDMLReader()
-    elif file_type == "3":
-        return RigakuRawReader()
-    else:
-        raise ValueError("无效的文件类型选择")
\ No newline at end of file
+import os
+import mmap
+import importlib.util
+import xml.etree.ElementTree as ET
+import numpy as np
+
+from itertools import islice
+
+SNIFF_BYTES = 4096                   # 识别文件格式时读取的文件头长度
+PLUGINS_ENV = 'XRD_READER_PLUGINS'   # 读取器插件模块环境变量（逗号分隔的模块名或 .py 文件路径）
+DEFAULT_PLUGINS = ('xy_reader',)     # 默认加载的读取器插件
+
+# 已注册的读取器 {注册名: 读取器类}，自动识别时按注册顺序依次检查文件头
+READERS = {}
+# 旧版文件类型编号与注册名的对应关系
+LEGACY_FILE_TYPES = {"1": 'rd', "2": 'xrdml', "3": 'raw'}
+
+
+# 扫描元数据（文件头信息）：2θ 起止位置（°）、平均步长、点数、扫描时间与样品名（文件头中没有的项为 None）
+def scan_header(start, end, points, scan_time=None, sample=None):
+    step = (end - start) / (points - 1) if points > 1 else 0.0
+    return {'start': float(start), 'end': float(end), 'step': float(step), 'points': int(points),
+            'scan_time': scan_time, 'sample': sample or None}
+
+# 注册读取器（类装饰器）：插件模块以 @data_reader.register_reader 注册新格式，无需修改其余模块
+def register_reader(cls):
+    READERS[cls.name] = cls
+    return cls
+
+# 基础数据读取接口：name 为注册名（命令行 --file-type 取值），extensions 为该格式常见扩展名（查找文件时初筛），
+# sniff 由文件头（前 SNIFF_BYTES 字节）判断是否为该格式
+class BaseReader:
+    name = None
+    extensions = ()
+
+    @staticmethod
+    def sniff(head):
+        return False
+
+    @staticmethod
+    def read_data(file_path):
+        raise NotImplementedError("必须实现read_data方法")
+
+    # 读取扫描元数据（见 scan_header），无法读取时返回 None；
+    # 默认解码完整数据后统计，内置读取器改为只读取文件头，不解码强度数据
+    @classmethod
+    def read_header(cls, file_path):
+        scan_x, _ = cls.read_data(file_path)
+        if scan_x is None or len(scan_x) == 0:
+            return None
+        return scan_header(np.min(scan_x), np.max(scan_x), len(scan_x))
+
+# .xrdml 读取模块
+# 采用 iterparse 流式解析：逐个 <scan> 读取 2θ 起止位置与计数，计数字符串整体转换为 numpy 数组，
+# 处理完的元素立即清理，不在内存中保留整棵 DOM 树
+# 多扫描文件：处理流程（read_data、缓存、索引、拟合）只使用第一个扫描（scan 0），其余扫描不处理；
+# read_scans 仅供脚本调用读取全部扫描
+@register_reader
+class XRDMLReader(BaseReader):
+    name = 'xrdml'
+    extensions = ('.xrdml',)
+
+    # 根元素为 <xrdMeasurements>
+    @staticmethod
+    def sniff(head):
+        return b'<xrdMeasurements' in head
+
+    @staticmethod
+    def _local_name(tag):
+        return tag.rsplit('}', 1)[-1]
+
+    @staticmethod
+    def read_scans(file_path, max_scans=None):
+        """读取.xrdml文件中的全部（或前 max_scans 个）扫描，返回 [(scan_x, scan_y), ...]（处理流程只使用第一个扫描）"""
+        with open(file_path, 'rb') as f:
+            return list(islice(XRDMLReader._iter_scans(f), max_scans))
+
+    # 逐个产出扫描数据；调用方停止迭代时解析随之停止，不再读取文件剩余部分
+    @staticmethod
+    def _iter_scans(f):
+        positions = None     # 当前扫描的 2θ 轴：(start, end) 或 listPositions 数组
+        data_point = None    # 当前扫描的计数字符串（counts 优先于 intensities）
+        data_tag = None
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            tag = XRDMLReader._local_name(elem.tag)
+            if event == 'start':
+                if tag == 'scan':
+                    positions, data_point, data_tag = None, None, None
+                continue
+            if tag == 'positions':
+                # 优先取 2θ 轴；无轴标记时取第一个 positions
+                if positions is None or elem.get('axis') == '2Theta':
+                    values = {XRDMLReader._local_name(child.tag): child.text for child in elem}
+                    if 'listPositions' in values:
+                        positions = np.fromstring(values['listPositions'], sep=' ')
+                    elif 'startPosition' in values and 'endPosition' in values:
+                        positions = (float(values['startPosition']), float(values['endPosition']))
+                elem.clear()
+            elif tag in ('counts', 'intensities'):
+                if data_point is None or (tag == 'counts' and data_tag != 'counts'):
+                    data_point, data_tag = elem.text, tag
+                elem.clear()
+            elif tag == 'scan':
+                if positions is not None and data_point:
+                    scan_y = np.fromstring(data_point, sep=' ')
+                    if isinstance(positions, tuple):
+                        scan_x = np.linspace(positions[0], positions[1], scan_y.size)
+                    else:
+                        scan_x = positions
+                    yield scan_x, scan_y
+                elem.clear()
+
+    # 只读取文件头：样品名（<sample> 的 name，为空时取 id）、第一个扫描的起始时间、2θ 起止位置与点数，
+    # 读到第一个计数元素即停止解析；计数字符串只统计个数，不转换为数值
+    @staticmethod
+    def read_header(file_path):
+        sample = scan_time = positions = None
+        try:
+            with open(file_path, 'rb') as f:
+                for event, elem in ET.iterparse(f, events=('end',)):
+                    tag = XRDMLReader._local_name(elem.tag)
+                    if tag == 'sample' and sample is None:
+                        values = {XRDMLReader._local_name(child.tag): (child.text or '').strip() for child in elem}
+                        sample = values.get('name') or values.get('id') or ''
+                    elif tag == 'startTimeStamp' and scan_time is None:
+                        scan_time = (elem.text or '').strip() or None
+                    elif tag == 'positions' and (positions is None or elem.get('axis') == '2Theta'):
+                        values = {XRDMLReader._local_name(child.tag): child.text for child in elem}
+                        if 'listPositions' in values:
+                            positions = np.fromstring(values['listPositions'], sep=' ')
+                        elif 'startPosition' in values and 'endPosition' in values:
+                            positions = (float(values['startPosition']), float(values['endPosition']))
+                    elif tag in ('counts', 'intensities') and positions is not None and elem.text:
+                        if isinstance(positions, tuple):
+                            return scan_header(*positions, len(elem.text.split()), scan_time, sample)
+                        return scan_header(positions.min(), positions.max(), positions.size, scan_time, sample)
+        except ET.ParseError:
+            pass
+        return None
+
+    @staticmethod
+    def read_data(file_path):
+        """读取.xrdml文件并返回第一个扫描（scan 0）的处理后数据，多扫描文件的其余扫描不处理"""
+        try:
+            scans = XRDMLReader.read_scans(file_path, max_scans=1)
+            if not scans:
+                return None, None
+            return scans[0]
+        except RuntimeError as e:
+            print(f"读取失败: {e}")
+            return None, None
+        except ET.ParseError:
+            return None, None
+
+# .rd 读取模块
+@register_reader
+class PhilipsRDReader(BaseReader):
+    name = 'rd'
+    extensions = ('.rd',)
+
+    # 文件头 V3RD / V5RD
+    @staticmethod
+    def sniff(head):
+        return head[:4] in (b"V3RD", b"V5RD")
+
+    # 扫描范围头（偏移 214：步长、起始角、终止角，float64）
+    @staticmethod
+    def _range_header(f):
+        head = f.read(4)
+        if head not in [b"V3RD", b"V5RD"]:
+            raise ValueError("无效的RD文件")
+        f.seek(214)
+        x_step, x_start, x_end = (float(v) for v in np.frombuffer(f.read(24), dtype=np.float64))
+        return head, x_step, x_start, x_end, int((x_end - x_start) / x_step)
+
+    # 只读取文件头：2θ 范围与点数（与 read_data 的网格一致；文件头中的样品名与扫描时间偏移未确定，不读取）
+    @staticmethod
+    def read_header(file_path):
+        with open(file_path, 'rb') as f:
+            _, x_step, x_start, x_end, pt_cnt = PhilipsRDReader._range_header(f)
+        if pt_cnt < 1:
+            return None
+        return scan_header(x_start + x_step / 2, x_end - x_step / 2, pt_cnt)
+
+    @staticmethod
+    def read_data(file_path):
+        """读取.rd文件并返回处理后的数据"""
+        with open(file_path, 'rb') as f:
+            head, x_step, x_start, x_end, pt_cnt = PhilipsRDReader._range_header(f)
+            f.seek(810 if head == b"V5RD" else 250)
+            ycol = np.frombuffer(f.read(pt_cnt * 2), dtype=np.uint16)
+            ycol = 0.01 * ycol * ycol
+            
+            xcol = np.linspace(x_start + x_step / 2, x_end - x_step / 2, pt_cnt)
+            return xcol, ycol
+        
+# 理学 .raw 读取模块
+# 以内存映射方式打开文件，强度数据块由 np.frombuffer 一次整体读取；
+# 只读取第一个扫描范围（范围头与强度数据位于固定偏移，与原读取逻辑一致）。多范围文件中后续范围头的位置与长度
+# 尚无样品文件验证，不作推测读取
+@register_reader
+class RigakuRawReader(BaseReader):
+    name = 'raw'
+    extensions = ('.raw',)
+    RANGE_OFFSET = 0x0B92  # 扫描范围头偏移
+    DATA_OFFSET = 0x0C56   # 强度数据偏移
+
+    # 文件头无固定标识：第一个扫描范围头为合理的起始角/终止角/步长（float32，扫描宽度不小于 0.1°、步长不小于 1e-4°）
+    # 即视为理学 .raw（文本文件的 ASCII 字节按 float32 解释时量级均小于 1e-3，不会误判）；
+    # 布鲁克 .raw（RAW1.01 / RAW2 / RAW4.00 开头）等其他 .raw 格式排除在外
+    @staticmethod
+    def sniff(head):
+        if head[:3] == b'RAW' or len(head) < RigakuRawReader.RANGE_OFFSET + 12:
+            return False
+        start_angle, end_angle, step = (float(v) for v in np.frombuffer(head, dtype='<f4', count=3,
+                                                                         offset=RigakuRawReader.RANGE_OFFSET))
+        return bool(np.isfinite([start_angle, end_angle, step]).all() and 1e-4 <= step < 10
+                    and 0 <= start_angle and start_angle + 0.1 <= end_angle <= 180)
+
+
+    # 解析扫描范围头，数据不合理（非正步长、角度越界、数据超出文件长度）时返回 None
+    @staticmethod
+    def _range_header(buf, header_offset, data_offset):
+        if header_offset + 12 > len(buf):
+            return None
+        start_angle, end_angle, step = (float(v) for v in np.frombuffer(buf, dtype='<f4', count=3, offset=header_offset))
+        if not (np.isfinite([start_angle, end_angle, step]).all() and step > 0 and 0 <= start_angle < end_angle <= 180):
+            return None
+        num_points = int(round((end_angle - start_angle) / step)) + 1
+        if data_offset + 4 * num_points > len(buf):
+            return None
+        return start_angle, end_angle, step, num_points
+
+    # 只读取文件头：第一个扫描范围（与 read_data 一致）的 2θ 范围与点数（内存映射只访问范围头，不读取强度数据）
+    @staticmethod
+    def read_header(file_path):
+        if os.path.getsize(file_path) == 0:
+            return None
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            header = RigakuRawReader._range_header(buf, RigakuRawReader.RANGE_OFFSET, RigakuRawReader.DATA_OFFSET)
+        if header is None:
+            return None
+        start_angle, _, step, num_points = header
+        return scan_header(start_angle, start_angle + step * (num_points - 1), num_points)
+
+    @staticmethod
+    def read_data(file_path):
+        """读取.raw文件并返回第一个扫描范围的处理后数据"""
+        try:
+            if os.path.getsize(file_path) == 0:
+                return None, None
+            with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                header = RigakuRawReader._range_header(buf, RigakuRawReader.RANGE_OFFSET, RigakuRawReader.DATA_OFFSET)
+                if header is None:
+                    return None, None
+                start_angle, end_angle, step, num_points = header
+                scan_x = np.arange(start_angle, end_angle + step/2, step)
+                scan_y = np.frombuffer(buf, dtype='<f4', count=num_points, offset=RigakuRawReader.DATA_OFFSET).astype(np.float64)
+            return scan_x, scan_y
+        except RuntimeError as e:
+            print(f"读取失败: {e}")
+            return None, None
+
+# 加载读取器插件：DEFAULT_PLUGINS 及环境变量 XRD_READER_PLUGINS 给出的模块（模块名或 .py 文件路径），
+# 插件模块导入时自行注册读取器；插件加载失败只提示，不影响内置读取器
+def load_plugins(plugins=None):
+    if plugins is None:
+        plugins = list(DEFAULT_PLUGINS) + [p.strip() for p in os.environ.get(PLUGINS_ENV, '').split(',') if p.strip()]
+    for plugin in plugins:
+        try:
+            if plugin.endswith('.py'):
+                name = os.path.splitext(os.path.basename(plugin))[0]
+                spec = importlib.util.spec_from_file_location(name, plugin)
+                spec.loader.exec_module(importlib.util.module_from_spec(spec))
+            else:
+                importlib.import_module(plugin)
+        except Exception as e:
+            print(f"读取器插件加载失败 {plugin}: {type(e).__name__}: {e}")
+
+# 查找文件时初筛的扩展名：file_type 为 'auto' 时为全部已注册读取器的扩展名
+def reader_extensions(file_type='auto'):
+    if file_type == 'auto':
+        return {ext for cls in READERS.values() for ext in cls.extensions}
+    return set(get_reader(file_type).extensions)
+
+# 由文件头识别格式，返回对应读取器；无法识别时抛出 ValueError
+def detect_reader(file_path):
+    with open(file_path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    for cls in READERS.values():
+        if cls.sniff(head):
+            return cls()
+    raise ValueError("无法识别的文件格式")
+
+# 文件读取工厂函数
+def get_reader(file_type):
+    """根据文件类型（注册名或旧版编号 1/2/3）返回对应的读取器"""
+    cls = READERS.get(LEGACY_FILE_TYPES.get(file_type, file_type))
+    if cls is None:
+        raise ValueError("无效的文件类型选择")
+    return cls()
+
+# 按文件类型返回读取器：file_type 为 'auto' 时由文件头识别
+def reader_for(file_path, file_type='auto'):
+    if file_type == 'auto':
+        return detect_reader(file_path)
+    return get_reader(file_type)
+
+
+load_plugins()
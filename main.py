@@ -1,357 +1,121 @@
-import os
-import numpy as np
-import matplotlib.pyplot as plt
-import data_reader as dr
-import data_processor as dp
-
-from openpyxl import Workbook
-from scipy.signal import savgol_filter
-
-
-# 创建拟合结果记录表
-def create_output_sheet(wb, sample_name, sam_index, columns):
-    ws = wb.create_sheet(sample_name)
-    ws.freeze_panes = 'A3'
-    for col_idx, col_name in enumerate(columns, start=1):
-        ws.cell(2, col_idx).value = col_name
-    ws.cell(1, 1).hyperlink = f"#'Sample list'!A{sam_index}"
-    return ws
-
-# 回写拟合结果记录表
-def pushpack_peak(worksheet, cont, col_index, start_row=3):
-    j = start_row
-    for cell in cont:
-        worksheet.cell(j, col_index).value = float(cell) if cell is not None else None
-        j += 1
-    return worksheet
-
-if __name__ == "__main__":
-    # 选择文件类型
-    file_type = input("请选择文件类型 (1: Philips.rd, 2: Panalytical.xrdml, 3: Rigaku.raw): ").strip()
-    calc_type = input("请选择计算类型 (1: D002, 2: Si_FWHM, 3: OI+D004): ").strip()
-    if calc_type == "2":
-        smooth_y = input("是否平滑数据 (1: Yes, 2: No): ").strip()
-    peak_output = input("是否输出拟合结果 (1: Yes, 2: No): ").strip()
-    if peak_output == "1":
-        trim_filename = input("是否裁切文件名 (1: Yes, 2: No): ").strip()
-    else:
-        trim_filename = "0"
-    reader = dr.get_reader(file_type)
-
-    # 抓取文件清单
-    file_list = []
-    for root, _, files in os.walk('.'):
-        for f in files:
-            ext = os.path.splitext(f)[1].lower()
-            if (file_type == "1" and ext == ".rd") or (file_type == "2" and ext == ".xrdml") or (file_type == "3" and ext == ".raw"):
-                file_list.append(os.path.join(root, f))
-
-    # 初始化计算结果汇总表
-    wb = Workbook()
-    ws_res = wb.active
-    ws_res.title = 'Sample list'
-    ws_res.freeze_panes = 'A2'
-    if calc_type == "1":
-        ws_res.cell(1, 1).value = 'Sample Name'
-        ws_res.cell(1, 2).value = 'D002 (Å)'
-        ws_res.cell(1, 3).value = 'G%'
-        ws_res.cell(1, 4).value = 'Graphite [002] Peak (deg)'
-        ws_res.cell(1, 5).value = 'Graphite [002] Int. Range (deg)'
-        ws_res.cell(1, 6).value = 'Graphite [002] FWHM (deg)'
-        ws_res.cell(1, 7).value = 'Silicon [111] Peak (deg)'
-        ws_res.cell(1, 8).value = 'Silicon [111] Int. Range (deg)'
-        ws_res.cell(1, 9).value = 'Silicon [111] FWHM (deg)'
-        ws_res.cell(1, 10).value = 'Graphite [002] FWHM NET.(deg)'
-        ws_res.cell(1, 11).value = 'Graphite [002] Lc NET.(Å)'
-        ws_res.cell(1, 12).value = 'Graphite [002] FWHM JIS(deg)'
-        ws_res.cell(1, 13).value = 'Graphite [002] Lc JIS(Å)'
-    elif calc_type == "2":
-        ws_res.cell(1, 1).value = 'Sample Name'
-        ws_res.cell(1, 2).value = 'Silicon [111] Peak (deg)'
-        ws_res.cell(1, 3).value = 'Silicon [111] FWHM (deg)'
-    elif calc_type == "3":
-        ws_res.cell(1, 1).value = 'Sample Name'
-        ws_res.cell(1, 2).value = 'Graphite OI value (-)'
-        ws_res.cell(1, 3).value = 'Dual D004 (Å)'
-        ws_res.cell(1, 4).value = 'G%'
-        ws_res.cell(1, 5).value = 'Graphite [004] Peak (deg)'
-        ws_res.cell(1, 6).value = 'Graphite [004] Int. Range (deg)'
-        ws_res.cell(1, 7).value = 'Graphite [004] Intensity (counts)'
-        ws_res.cell(1, 8).value = 'Graphite [004] FWHM (deg)'
-        ws_res.cell(1, 9).value = 'Graphite [110] Peak (deg)'
-        ws_res.cell(1, 10).value = 'Graphite [110] Int. Range (deg)'
-        ws_res.cell(1, 11).value = 'Graphite [110] Intensity (counts)'
-        ws_res.cell(1, 12).value = 'Graphite [110] FWHM (deg)'
-
-    # 初始化辅助变量
-    sam_list = []
-    sam_index = 1
-
-    # 数据处理模块
-    for file_path in file_list:
-        sample_name = os.path.splitext(os.path.basename(file_path))[0]
-        out_dir = os.path.dirname(file_path) or '.'  # 输出目录与源文件同级（子目录读取则图片保存回子目录）
-        sam_list.append(sample_name)
-        sam_index += 1
-        try:
-            scan_x, scan_y = reader.read_data(file_path)
-            if scan_x is not None:
-                # 按扫描范围过滤：仅处理与当前计算类型峰位区间匹配的文件，避免 OI/D002 数据混用时拟合失败
-                if calc_type == "1":
-                    # D002：需覆盖石墨[002]~26.5° 与硅[111]~28.4°
-                    range_ok = (scan_x.min() <= 26.5) and (scan_x.max() >= 28.4)
-                elif calc_type == "2":
-                    # Si_FWHM：需覆盖硅[111]~28.4°
-                    range_ok = (scan_x.min() <= 28.4) and (scan_x.max() >= 28.4)
-                else:
-                    # OI+D004：需覆盖石墨[004]~54.2° 与石墨[110]~77.6°
-                    range_ok = (scan_x.min() <= 54.5) and (scan_x.max() >= 77.0)
-                if not range_ok:
-                    print(f"跳过 {sample_name}: 扫描范围 {scan_x.min():.1f}°-{scan_x.max():.1f}° 与计算类型不匹配")
-                    continue
-            if (scan_x is not None)&(calc_type == "1"):
-                # 计算石墨 D002 相关
-                popt = dp.fit_data_d002_raw(scan_x, scan_y)
-                if popt is not None:
-                    fitted_curve, background, graphite_peak, silicon_peak, fwhm_gn = dp.fit_peak_d002(scan_x, popt)  # 计算拟合结果曲线
-                    g_peak_pos, (g_lo, g_hi) = dp.calculate_centroid(scan_x, graphite_peak, center=popt[1], return_window=True)  # 石墨 [002] 峰位（拟合曲线质心）及积分范围
-                    si_peak_pos, (si_lo, si_hi) = dp.calculate_centroid(scan_x, silicon_peak, center=popt[6], return_window=True)  # 硅 [111] 峰位（拟合曲线质心）及积分范围
-                    ws_res.cell(sam_index, 1).value = sample_name  # 样品名
-                    ws_res.cell(sam_index, 2).value = d_002 = 1.54056/(2*np.sin(np.radians((28.443 - si_peak_pos + g_peak_pos)/2)))  # 计算石墨 D002 层间距
-                    ws_res.cell(sam_index, 3).value = 100 * (3.440 - d_002)/(3.440 - 3.354)  # 计算石墨化度
-                    ws_res.cell(sam_index, 4).value = g_peak_pos  # 计算石墨 [002] 峰位（拟合曲线质心）
-                    ws_res.cell(sam_index, 5).value = f"{g_lo:.3f}~{g_hi:.3f}"  # 石墨 [002] 质心积分范围（deg）
-                    ws_res.cell(sam_index, 6).value = fwhm_g = dp.calculate_fwhm_spv(popt[2], popt[3], popt[4])  # 计算石墨 [002] 峰半峰宽
-                    ws_res.cell(sam_index, 7).value = si_peak_pos  # 计算硅 [111] 峰位（拟合曲线质心）
-                    ws_res.cell(sam_index, 8).value = f"{si_lo:.3f}~{si_hi:.3f}"  # 硅 [111] 质心积分范围（deg）
-                    ws_res.cell(sam_index, 9).value = fwhm_si = dp.calculate_fwhm_spv(popt[7], popt[8], popt[9])  # 计算硅 [111] 峰半峰宽
-                    ws_res.cell(sam_index, 10).value = fwhm_gn  # 计算石墨半峰宽 via deconvolution
-                    ws_res.cell(sam_index, 11).value = 0.89 * 1.54056 / (np.radians(fwhm_gn) * np.cos(np.radians((28.443 - si_peak_pos + g_peak_pos)/2)))  # 计算石墨Lc值 via deconvolution
-                    ws_res.cell(sam_index, 12).value = fwhm_jis = dp.calculate_fwhm_jis(fwhm_g, fwhm_si)  # 计算半峰宽 via JISR7651:2007
-                    ws_res.cell(sam_index, 13).value = 0.89 * 1.54056 / (np.radians(fwhm_jis) * np.cos(np.radians((28.443 - si_peak_pos + g_peak_pos)/2)))  # 计算Lc值 via JISR7651:2007
-                    if peak_output == "1":
-                        # 初始化拟合结果记录表
-                        if trim_filename == "1":
-                            try:
-                                sample_name = sample_name.split()[-3]
-                            except:
-                                pass
-                        ws_raw = wb.create_sheet(sample_name)
-                        ws_raw.freeze_panes = 'A3'
-                        ws_raw.cell(2, 1).value = '2-Theta (deg)'
-                        ws_raw.cell(2, 2).value = 'Intensity (A.U.)'
-                        ws_raw.cell(2, 3).value = 'Corrected Intensity'
-                        ws_raw.cell(2, 4).value = 'Fitted Curve'
-                        ws_raw.cell(2, 5).value = 'Fitted Background'
-                        ws_raw.cell(2, 6).value = 'Graphite [002] Net. Peak'
-                        ws_raw.cell(2, 7).value = 'Silicon [111s] Net. Peak'
-                        ws_raw.cell(2, 8).value = 'Graphite [002] Peak'
-                        ws_raw.cell(2, 9).value = 'Silicon [111] Peak'
-                        ws_raw.cell(1, 1).value = 'Back'
-                        ws_raw.cell(1, 1).hyperlink = "#'Sample list'!A%s" % str(sam_index)
-                        ws_res.cell(sam_index, 1).hyperlink = "#'%s'!A1" %(sample_name)
-                        # 回写拟合结果曲线
-                        corrected_x, corrected_y = dp.correct_ka2(scan_x, scan_y, fitted_curve)
-                        ws_raw = pushpack_peak(ws_raw, corrected_x, 1)
-                        ws_raw = pushpack_peak(ws_raw, scan_y, 2)
-                        ws_raw = pushpack_peak(ws_raw, corrected_y, 3)
-                        ws_raw = pushpack_peak(ws_raw, fitted_curve, 4)
-                        ws_raw = pushpack_peak(ws_raw, background, 5)
-                        ws_raw = pushpack_peak(ws_raw, graphite_peak, 6)
-                        ws_raw = pushpack_peak(ws_raw, silicon_peak, 7)
-                        ws_raw = pushpack_peak(ws_raw, graphite_peak + background, 8)
-                        ws_raw = pushpack_peak(ws_raw, silicon_peak + background, 9)
-                        
-                        # 创建绘图
-                        plt.figure(figsize=(10, 6))  # 设置图表大小
-                        # plt.plot(corrected_x, scan_y, label='Raw Intensity', linewidth=0.5, color='gray', linestyle='--')  # 原始数据
-                        plt.plot(corrected_x, corrected_y, label='Corrected Intensity', linewidth=0.5, color='blue')  # 校正后数据
-                        plt.plot(corrected_x, fitted_curve, label='Fitted Curve', linewidth=0.5, color='red')  # 拟合曲线
-                        plt.plot(corrected_x, background, label='Background', linewidth=0.5, color='green', linestyle='--')  # 背景
-                        plt.plot(corrected_x, graphite_peak + background, label='Graphite [002] Peak', linewidth=0.5, color='orange')  # 石墨峰
-                        plt.plot(corrected_x, silicon_peak + background, label='Silicon [111] Peak', linewidth=0.5, color='purple')  # 硅峰
-                        plt.axvline(g_peak_pos, color='orange', linestyle='--') # 石墨峰（质心）
-                        plt.axvline(si_peak_pos, color='purple', linestyle='--') # 硅峰（质心）
-
-                        # 美化图表
-                        plt.title(sample_name, fontsize=14, fontweight='bold')  # 标题
-                        plt.xlabel('2Theta (°)', fontsize=12)  # X轴标签
-                        plt.xlim(25, 29)
-                        plt.ylabel('Intensity (Counts)', fontsize=12)  # Y轴标签
-                        plt.grid(True, linestyle='--', linewidth=0.5, alpha=0.7)  # 网格线
-                        plt.legend(loc='upper left', fontsize=10)  # 图例
-                        plt.tight_layout()  # 自动调整布局
-
-                        # 保存图表（保存到源文件所在目录）
-                        plt.savefig(os.path.join(out_dir, f'{sample_name}_plot.png'), dpi=300)  # 保存为PNG文件
-                        plt.close()  # 关闭图表，释放内存
-
-
-                else: 
-                    print(f"Failed to fit peaks for sample {sample_name}: 拟合失败，未返回参数")
-                    
-            elif (scan_x is not None)&(calc_type == "2"):
-                # 计算纳米硅相关
-                corrected_x, corrected_y = dp.correct_ka2(scan_x, scan_y)
-                smoothed_y = savgol_filter(corrected_y, 25, 3)
-                if smooth_y == "1":
-                    popt = dp.fit_data_sifwhm(corrected_x, smoothed_y)
-                else:
-                    popt = dp.fit_data_sifwhm(corrected_x, corrected_y)
-                if popt is not None:
-                    # 计算硅 [111] 峰位（拟合曲线质心）
-                    silicon_peak_net = dp.split_pearson_vii(corrected_x, popt[0], popt[1], popt[2], popt[3], popt[4])
-                    si_peak_pos = dp.calculate_centroid(corrected_x, silicon_peak_net, center=popt[1])
-                    ws_res.cell(sam_index, 1).value = sample_name  # 样品名
-                    ws_res.cell(sam_index, 2).value = si_peak_pos  # 计算硅 [111] 峰位（拟合曲线质心）
-                    ws_res.cell(sam_index, 3).value = dp.calculate_fwhm_spv(popt[2], popt[3], popt[4])  # 计算硅 [111] 峰半峰宽
-                    if peak_output == "1":
-                        # 初始化拟合结果记录表
-                        if trim_filename == "1":
-                            try:
-                                sample_name = sample_name.split()[-3]
-                            except:
-                                pass
-                        ws_raw = wb.create_sheet(sample_name)
-                        ws_raw.freeze_panes = 'A3'
-                        ws_raw.cell(2, 1).value = '2-Theta (deg)'
-                        ws_raw.cell(2, 2).value = 'Intensity (A.U.)'
-                        ws_raw.cell(2, 3).value = 'Corrected Intensity'
-                        ws_raw.cell(2, 4).value = 'Smoothed Intensity'
-                        ws_raw.cell(2, 5).value = 'Fitted Curve'
-                        ws_raw.cell(2, 6).value = 'Fitted Background'
-                        ws_raw.cell(2, 7).value = 'Silicon [111] Peak'
-                        ws_raw.cell(1, 1).value = 'Back'
-                        ws_raw.cell(1, 1).hyperlink = "#'Sample list'!A%s" % str(sam_index)
-                        ws_res.cell(sam_index, 1).hyperlink = "#'%s'!A1" %(sample_name)
-                        # 计算拟合结果曲线
-                        fitted_curve, background, silicon_peak = dp.fit_peak_sifwhm(corrected_x, popt)
-                        # 回写拟合结果曲线
-                        ws_raw = pushpack_peak(ws_raw, corrected_x, 1)
-                        ws_raw = pushpack_peak(ws_raw, scan_y, 2)
-                        ws_raw = pushpack_peak(ws_raw, corrected_y, 3)
-                        ws_raw = pushpack_peak(ws_raw, smoothed_y, 4)
-                        ws_raw = pushpack_peak(ws_raw, fitted_curve, 5)
-                        ws_raw = pushpack_peak(ws_raw, background, 6)
-                        ws_raw = pushpack_peak(ws_raw, silicon_peak, 7)
-                else:
-                    print(f"Failed to fit peaks for sample {sample_name}: 拟合失败，未返回参数")
-                    ws_res.cell(sam_index, 1).value = sample_name  # 样品名
-                    if peak_output == "1":
-                        # 初始化拟合结果记录表
-                        if trim_filename == "1":
-                            try:
-                                sample_name = sample_name.split()[-3]
-                            except:
-                                pass
-                        ws_raw = wb.create_sheet(sample_name)
-                        ws_raw.freeze_panes = 'A3'
-                        ws_raw.cell(2, 1).value = '2-Theta (deg)'
-                        ws_raw.cell(2, 2).value = 'Intensity (A.U.)'
-                        ws_raw.cell(2, 3).value = 'Corrected Intensity'
-                        ws_raw.cell(2, 4).value = 'Smoothed Intensity'
-                        ws_raw.cell(1, 1).value = 'Back'
-                        ws_raw.cell(1, 1).hyperlink = "#'Sample list'!A%s" % str(sam_index)
-                        ws_res.cell(sam_index, 1).hyperlink = "#'%s'!A1" %(sample_name)
-                        # 回写拟合结果曲线
-                        ws_raw = pushpack_peak(ws_raw, corrected_x, 1)
-                        ws_raw = pushpack_peak(ws_raw, scan_y, 2)
-                        ws_raw = pushpack_peak(ws_raw, corrected_y, 3)
-                        ws_raw = pushpack_peak(ws_raw, smoothed_y, 4)
-
-            elif (scan_x is not None)&(calc_type == "3"):
-                # 计算OI值
-                popt = dp.fit_data_oi_raw(scan_x, scan_y)
-                if popt is not None:
-                    # 计算各净峰曲线、峰位（质心）及峰面积
-                    g004_peak = dp.split_pearson_vii(scan_x, popt[0], popt[1], popt[2], popt[3], popt[4])
-                    g110_peak = dp.split_pearson_vii(scan_x, popt[20], popt[21], popt[22], popt[23], popt[24])
-                    si311_peak = dp.split_pearson_vii(scan_x, popt[5], popt[6], popt[7], popt[8], popt[9])
-                    g004_pos, (g004_lo, g004_hi) = dp.calculate_centroid(scan_x, g004_peak, center=popt[1], return_window=True)  # 石墨 [004] 峰位（拟合曲线质心）及积分范围
-                    g110_pos, (g110_lo, g110_hi) = dp.calculate_centroid(scan_x, g110_peak, center=popt[21], return_window=True)  # 石墨 [110] 峰位（拟合曲线质心）及积分范围
-                    si311_pos = dp.calculate_centroid(scan_x, si311_peak, center=popt[6])  # 硅 [311] 峰位（拟合曲线质心）
-                    oi_value = dp.calculate_peak_area(scan_x, g004_peak)/dp.calculate_peak_area(scan_x, g110_peak)  # 计算OI值（峰面积比）
-                    ws_res.cell(sam_index, 1).value = sample_name  # 样品名
-                    ws_res.cell(sam_index, 2).value = oi_value  # 计算OI值（峰面积比）
-                    ws_res.cell(sam_index, 3).value = d_004x2 = 2*(1.54056/(2*np.sin(np.radians((56.12 - si311_pos + g004_pos)/2))))  # 计算石墨 D004 层间距
-                    ws_res.cell(sam_index, 4).value = 100 * (3.440 - d_004x2)/(3.440 - 3.354)  # 计算石墨化度
-                    ws_res.cell(sam_index, 5).value = g004_pos  # 计算石墨 [004] 峰位（拟合曲线质心）
-                    ws_res.cell(sam_index, 6).value = f"{g004_lo:.3f}~{g004_hi:.3f}"  # 石墨 [004] 质心积分范围（deg）
-                    ws_res.cell(sam_index, 7).value = popt[0]  # 计算石墨 [004] 峰高
-                    ws_res.cell(sam_index, 8).value = dp.calculate_fwhm_spv(popt[2], popt[3], popt[4])  # 计算石墨 [004] 峰半峰宽
-                    ws_res.cell(sam_index, 9).value = g110_pos  # 计算石墨 [110] 峰位（拟合曲线质心）
-                    ws_res.cell(sam_index, 10).value = f"{g110_lo:.3f}~{g110_hi:.3f}"  # 石墨 [110] 质心积分范围（deg）
-                    ws_res.cell(sam_index, 11).value = popt[20]  # 计算石墨 [110] 峰高
-                    ws_res.cell(sam_index, 12).value = dp.calculate_fwhm_spv(popt[22], popt[23], popt[24])  # 计算石墨 [110] 峰半峰宽
-                    if peak_output == "1":
-                        # 初始化拟合结果记录表
-                        if trim_filename == "1":
-                            try:
-                                sample_name = sample_name.split()[-3]
-                            except:
-                                pass
-                        ws_raw = wb.create_sheet(sample_name)
-                        ws_raw.freeze_panes = 'A3'
-                        ws_raw.cell(2, 1).value = '2-Theta (deg)'
-                        ws_raw.cell(2, 2).value = 'Intensity (A.U.)'
-                        ws_raw.cell(2, 3).value = 'Corrected Intensity'
-                        ws_raw.cell(2, 4).value = 'Fitted Curve'
-                        ws_raw.cell(2, 5).value = 'Fitted Background'
-                        ws_raw.cell(2, 6).value = 'Graphite [004] Peak'
-                        ws_raw.cell(2, 7).value = 'Silicon [311] Peak'
-                        ws_raw.cell(2, 8).value = 'Silicon [400] Peak'
-                        ws_raw.cell(2, 9).value = 'Silicon [331] Peak'
-                        ws_raw.cell(2, 10).value = 'Graphite [110] Peak'
-                        ws_raw.cell(1, 1).value = 'Back'
-                        ws_raw.cell(1, 1).hyperlink = "#'Sample list'!A%s" % str(sam_index)
-                        ws_res.cell(sam_index, 1).hyperlink = "#'%s'!A1" %(sample_name)
-                        # 计算拟合结果曲线
-                        fitted_curve, background, g004_peak, si311_peak, si400_peak, si331_peak, g110_peak = dp.fit_peak_oi(scan_x, popt)
-                        # 计算校正后数据
-                        corrected_x, corrected_y = dp.correct_ka2(scan_x, scan_y, fitted_curve)
-                        # 回写拟合结果曲线
-                        ws_raw = pushpack_peak(ws_raw, corrected_x, 1)
-                        ws_raw = pushpack_peak(ws_raw, scan_y, 2)
-                        ws_raw = pushpack_peak(ws_raw, corrected_y, 3)
-                        ws_raw = pushpack_peak(ws_raw, fitted_curve, 4)
-                        ws_raw = pushpack_peak(ws_raw, background, 5)
-                        ws_raw = pushpack_peak(ws_raw, g004_peak, 6)
-                        ws_raw = pushpack_peak(ws_raw, si311_peak, 7)
-                        ws_raw = pushpack_peak(ws_raw, si400_peak, 8)
-                        ws_raw = pushpack_peak(ws_raw, si331_peak, 9)
-                        ws_raw = pushpack_peak(ws_raw, g110_peak, 10)
-
-                        # 创建绘图
-                        plt.figure(figsize=(10, 6))  # 设置图表大小
-                        # plt.plot(corrected_x, scan_y, label='Raw Intensity', linewidth=0.5, color='gray', linestyle='--')  # 原始数据
-                        plt.plot(corrected_x, corrected_y, label='Corrected Intensity', linewidth=0.5, color='blue')  # 校正后数据
-                        plt.plot(corrected_x, fitted_curve, label='Fitted Curve', linewidth=0.5, color='red')  # 拟合曲线
-                        plt.plot(corrected_x, background, label='Background', linewidth=0.5, color='green', linestyle='--')  # 背景
-                        plt.plot(corrected_x, g004_peak + background, label='Graphite [004] Peak', linewidth=0.5, color='orange')  # 石墨[004]
-                        plt.plot(corrected_x, si311_peak + background, label='Silicon [311] Peak', linewidth=0.5, color='purple')  # 硅峰[311]
-                        plt.plot(corrected_x, si400_peak + background, label='Silicon [400] Peak', linewidth=0.5, color='gray')  # 硅峰[400]
-                        plt.plot(corrected_x, si331_peak + background, label='Silicon [331] Peak', linewidth=0.5, color='gray')  # 硅峰[331]
-                        plt.plot(corrected_x, g110_peak + background, label='Graphite [110] Peak', linewidth=0.5, color='cyan')  # 石墨[110]
-                        plt.axvline(g004_pos, color='orange', linestyle='--', linewidth=0.5) # 石墨[004]（质心）
-                        plt.axvline(si311_pos, color='purple', linestyle='--', linewidth=0.5) # 硅峰[311]（质心）
-
-                        # 美化图表
-                        plt.title(sample_name, fontsize=14, fontweight='bold')  # 标题
-                        plt.xlabel('2Theta (°)', fontsize=12)  # X轴标签
-                        plt.xlim(50, 80)
-                        plt.ylabel('Intensity (Counts)', fontsize=12)  # Y轴标签
-                        plt.grid(True, linestyle='--', linewidth=0.5, alpha=0.7)  # 网格线
-                        plt.legend(loc='upper right', fontsize=8)  # 图例
-                        plt.tight_layout()  # 自动调整布局
-
-                        # 保存图表（保存到源文件所在目录）
-                        plt.savefig(os.path.join(out_dir, f'{sample_name}_plot.png'), dpi=300)  # 保存为PNG文件
-                        plt.close()  # 关闭图表，释放内存
-                else: print(f"Failed to fit peaks for sample {sample_name}: 拟合失败，未返回参数")
-            else:
-                print(f"Failed to fit peaks for sample {sample_name}: 拟合失败，文件读取错误")
-        except RuntimeError as e:
-            print(f"Failed to fit peaks for sample {sample_name}: {e}")
-
-    wb.save('xrd_processed.xlsx')
-    print('处理完成，结果已写入')
+import sys
+import argparse
+import data_reader as dr
+
+
+CALC_TYPES = {'d002': "1", 'si': "2", 'oi': "3"}
+PLOT_MODES = ('png', 'preview', 'svg', 'none')
+FIT_GRID_MODES = ('full', 'bin', 'roi')
+PROFILE_MODES = ('none', 'timing', 'cprofile')
+UNCERTAINTY_MODES = ('none', 'linear', 'bootstrap')
+
+
+# 处理选项参数（批处理与监视模式 watcher.py 共用）
+def add_option_arguments(parser):
+    parser.add_argument('--smooth', action='store_true', help="拟合前平滑数据（仅 si）")
+    parser.add_argument('--peak-output', action='store_true', help="输出拟合结果曲线与拟合图")
+    parser.add_argument('--trim-filename', action='store_true', help="裁切文件名作为工作表名")
+    parser.add_argument('--curve-format', choices=('sheet', 'csv', 'npz'), default='sheet', help="拟合结果曲线输出格式")
+    parser.add_argument('--plot', choices=PLOT_MODES, default='png',
+                        help="拟合图输出（png 300 dpi / preview 72 dpi / svg / none，需 --peak-output）")
+    parser.add_argument('--fit-grid', choices=FIT_GRID_MODES, default='full',
+                        help="拟合数据预处理（full 全范围逐点，默认 / bin 平坦背景自适应合并 / roi 裁剪至计算区间 + 合并）")
+    parser.add_argument('--warm-start', action='store_true', help="以已拟合样品参数作为初值（结果在拟合容差内可能随处理历史略有差异）")
+    parser.add_argument('--uncertainty', choices=UNCERTAINTY_MODES, default='none',
+                        help="汇总表附加各指标标准不确定度（linear 线性化误差传递 / bootstrap 残差自助法）")
+    parser.add_argument('--bootstrap-samples', type=int, default=100, help="残差自助法重采样次数（默认 100）")
+    parser.add_argument('--time-budget', type=float, default=None,
+                        help="单样品处理时间预算（秒，默认不限制），超出时依次以降级策略拟合，汇总表附加状态与耗时")
+    parser.add_argument('--use-cache', action='store_true', help="经解析结果缓存读取数据（默认目录 .xrd_cache，指定 --cache-dir 时同样启用）")
+    parser.add_argument('--cache-dir', default=None, help="解析结果缓存目录（默认 .xrd_cache）")
+    parser.add_argument('--keep-artifacts', action='store_true',
+                        help="保存各样品拟合参数、指标与不确定度，再次导出（如改为输出拟合结果）时跳过重复计算")
+    parser.add_argument('--workers', type=int, default=None, help="并行进程数（默认 CPU 核数）")
+    parser.add_argument('--store', default=None, help="结果库路径（默认 xrd_results.sqlite）")
+    parser.add_argument('--index', default=None, help="扫描元数据索引路径（默认 xrd_index.sqlite）")
+
+# 由参数构建计算类型 calc_type 的处理选项（数值计算模块在此时才导入），overrides 为其余选项
+def options_from_args(args, calc_type, **overrides):
+    import pipeline
+    from plot_renderer import PLOT_DPI, PREVIEW_DPI
+    from artifacts import ARTIFACT_DIR
+    from scan_cache import CACHE_DIR
+
+    return pipeline.make_options(
+        calc_type=calc_type,
+        smooth_y="1" if args.smooth and calc_type == "2" else "0",
+        peak_output="1" if args.peak_output else "2",
+        trim_filename="1" if args.trim_filename else "0",
+        cache_dir=args.cache_dir or (CACHE_DIR if args.use_cache else None),
+        plot_format={'png': 'png', 'preview': 'png', 'svg': 'svg'}.get(args.plot) if args.peak_output else None,
+        plot_dpi=PREVIEW_DPI if args.plot == 'preview' else PLOT_DPI,
+        fit_binning=args.fit_grid in ('bin', 'roi'),
+        fit_roi=args.fit_grid == 'roi',
+        warm_start=args.warm_start,
+        uncertainty=None if args.uncertainty == 'none' else args.uncertainty,
+        bootstrap_samples=args.bootstrap_samples,
+        time_budget=args.time_budget,
+        artifact_dir=ARTIFACT_DIR if args.keep_artifacts else None,
+        **overrides,
+    )
+
+# 命令行参数（仅依赖标准库，--help 等不导入数值计算模块）
+def build_parser():
+    parser = argparse.ArgumentParser(description="XRD 批量拟合（D002 / Si_FWHM / OI+D004）；不带参数运行时进入交互模式")
+    parser.add_argument('inputs', nargs='*', help="输入文件、目录或通配符（支持 **，默认当前目录下全部该类型文件）")
+    parser.add_argument('--file-type', choices=['auto'] + list(dr.READERS), default='auto',
+                        help="文件类型（默认 auto：由文件头识别，混合格式目录一次处理）")
+    parser.add_argument('--calc', choices=CALC_TYPES, default='d002', help="计算类型（默认 d002）")
+    add_option_arguments(parser)
+    parser.add_argument('--batch-fit', action='store_true', help="批量拟合同一扫描网格的样品")
+    parser.add_argument('--incremental', action='store_true', help="增量处理（仅拟合新增或变化的样品）")
+    parser.add_argument('--use-index', action='store_true',
+                        help="按扫描元数据索引（只读取文件头）预先过滤扫描范围（指定 --index 时同样启用）；默认全部文件解码后再按扫描范围过滤")
+    parser.add_argument('--profile', choices=PROFILE_MODES, default='none', help="性能分析模式")
+    parser.add_argument('-o', '--output', default='xrd_processed.xlsx', help="输出工作簿路径")
+    return parser
+
+# 交互输入：输入结束（如管道输入的回答不足）时返回空字符串，按默认值处理
+def _ask(prompt):
+    try:
+        return input(prompt).strip()
+    except EOFError:
+        return ''
+
+# 交互模式：逐项询问（与原有提问顺序一致），返回与命令行参数相同的命名空间；
+# 其余选项（曲线格式、拟合图、拟合网格、误差估计、批量拟合、增量处理、性能分析、并行进程数等）取命令行参数默认值
+def prompt_args():
+    args = build_parser().parse_args([])
+    file_type = _ask("请选择文件类型 (0: 自动识别, 1: Philips.rd, 2: Panalytical.xrdml, 3: Rigaku.raw): ")
+    calc_type = _ask("请选择计算类型 (1: D002, 2: Si_FWHM, 3: OI+D004): ")
+    if calc_type == "2":
+        args.smooth = _ask("是否平滑数据 (1: Yes, 2: No): ") == "1"
+    args.peak_output = _ask("是否输出拟合结果 (1: Yes, 2: No): ") == "1"
+    if args.peak_output:
+        args.trim_filename = _ask("是否裁切文件名 (1: Yes, 2: No): ") == "1"
+    args.file_type = 'auto' if file_type == "0" else dr.LEGACY_FILE_TYPES.get(file_type, file_type)
+    if args.file_type != 'auto' and args.file_type not in dr.READERS:
+        raise ValueError("无效的文件类型选择")
+    if calc_type not in CALC_TYPES.values():
+        raise ValueError("无效的计算类型选择")
+    args.calc = next(name for name, code in CALC_TYPES.items() if code == calc_type)
+    return args
+
+# 由参数构建处理选项并运行完整处理流程
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = build_parser().parse_args(argv) if argv else prompt_args()
+
+    import pipeline
+
+    options = options_from_args(args, CALC_TYPES[args.calc], file_type=args.file_type,
+                                batch_fit=args.batch_fit, profile=None if args.profile == 'none' else args.profile)
+    file_list = pipeline.find_files(args.inputs, options['file_type'])
+    pipeline.run(file_list, options, args.output, args.workers, incremental=args.incremental,
+                 store_path=args.store or pipeline.STORE_PATH,
+                 curve_format=args.curve_format if args.peak_output else 'sheet',
+                 index_path=args.index or (pipeline.INDEX_PATH if args.use_index else None))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1007 @@
+import os
+import glob
+import json
+import time
+import functools
+import importlib
+import traceback
+import numpy as np
+import data_reader as dr
+import data_processor as dp
+import batch_fitter as bf
+import warm_start
+import profiler
+import time_budget
+import uncertainty as unc
+
+from concurrent.futures import ProcessPoolExecutor
+from scan_cache import ScanCache, CACHE_MAX_BYTES
+from results_store import ResultsStore, STORE_PATH
+from scan_index import ScanIndex, INDEX_PATH
+from artifacts import ArtifactGraph, ArtifactStore
+from plot_renderer import PlotRenderer, plot_job, PLOT_DPI, PLOT_FORMAT
+
+
+# 汇总表（Sample list）表头
+SUMMARY_COLUMNS = {
+    "1": ['Sample Name', 'D002 (Å)', 'G%', 'Graphite [002] Peak (deg)', 'Graphite [002] Int. Range (deg)',
+          'Graphite [002] FWHM (deg)', 'Silicon [111] Peak (deg)', 'Silicon [111] Int. Range (deg)',
+          'Silicon [111] FWHM (deg)', 'Graphite [002] FWHM NET.(deg)', 'Graphite [002] Lc NET.(Å)',
+          'Graphite [002] FWHM JIS(deg)', 'Graphite [002] Lc JIS(Å)'],
+    "2": ['Sample Name', 'Silicon [111] Peak (deg)', 'Silicon [111] FWHM (deg)'],
+    "3": ['Sample Name', 'Graphite OI value (-)', 'Dual D004 (Å)', 'G%', 'Graphite [004] Peak (deg)',
+          'Graphite [004] Int. Range (deg)', 'Graphite [004] Intensity (counts)', 'Graphite [004] FWHM (deg)',
+          'Graphite [110] Peak (deg)', 'Graphite [110] Int. Range (deg)', 'Graphite [110] Intensity (counts)',
+          'Graphite [110] FWHM (deg)'],
+}
+
+# 汇总表中给出标准不确定度的数值指标（质心积分范围除外），启用误差估计时以 "<列名> σ" 依次附加在汇总表末尾
+UNCERTAINTY_COLUMNS = {calc_type: [c for c in columns[1:] if 'Int. Range' not in c] for calc_type, columns in SUMMARY_COLUMNS.items()}
+UNCERTAINTY_MODES = (None, 'linear', 'bootstrap')
+UNCERTAINTY_TOL = 1e-6  # 误差估计时计算指标的质心迭代容差（远小于参数扰动引起的峰位变化）
+
+# 单样品拟合结果记录表表头
+SHEET_COLUMNS = {
+    "1": ['2-Theta (deg)', 'Intensity (A.U.)', 'Corrected Intensity', 'Fitted Curve', 'Fitted Background',
+          'Graphite [002] Net. Peak', 'Silicon [111s] Net. Peak', 'Graphite [002] Peak', 'Silicon [111] Peak'],
+    "2": ['2-Theta (deg)', 'Intensity (A.U.)', 'Corrected Intensity', 'Smoothed Intensity', 'Fitted Curve',
+          'Fitted Background', 'Silicon [111] Peak'],
+    "3": ['2-Theta (deg)', 'Intensity (A.U.)', 'Corrected Intensity', 'Fitted Curve', 'Fitted Background',
+          'Graphite [004] Peak', 'Silicon [311] Peak', 'Silicon [400] Peak', 'Silicon [331] Peak',
+          'Graphite [110] Peak'],
+}
+
+
+# 各计算类型扫描范围需覆盖的峰位区间（°）
+# D002：石墨[002]~26.5° 与硅[111]~28.4°；Si_FWHM：硅[111]~28.4°；OI+D004：石墨[004]~54.2° 与石墨[110]~77.6°
+SCAN_RANGES = {"1": (26.5, 28.4), "2": (28.4, 28.4), "3": (54.5, 77.0)}
+
+# 各计算类型拟合网格参数：roi_margin 为拟合区间在峰位区间两侧的外延，window 为峰位保护窗口半宽（°），
+# max_bin 为平坦背景处最多合并的点数；Si_FWHM 拟合前做 Savitzky-Golay 平滑（要求等间距网格），不合并
+FIT_GRIDS = {
+    "1": {'roi_margin': 1.5, 'window': 1.0, 'max_bin': 8},
+    "2": {'roi_margin': 1.5, 'window': 1.0, 'max_bin': 1},
+    "3": {'roi_margin': 2.5, 'window': 1.5, 'max_bin': 8},
+}
+
+# 默认处理选项（各项含义见 make_options）
+DEFAULT_OPTIONS = {
+    'file_type': 'auto',
+    'calc_type': "1",
+    'smooth_y': "0",
+    'peak_output': "2",
+    'trim_filename': "0",
+    'cache_dir': None,
+    'cache_max_bytes': CACHE_MAX_BYTES,
+    'plot_format': PLOT_FORMAT,
+    'plot_dpi': PLOT_DPI,
+    'fit_binning': False,
+    'fit_roi': False,
+    'batch_fit': False,
+    'warm_start': False,
+    'profile': None,
+    'profile_dir': None,
+    'uncertainty': None,
+    'bootstrap_samples': unc.BOOTSTRAP_SAMPLES,
+    'time_budget': None,
+    'artifact_dir': None,
+}
+
+# 时间预算下的拟合降级策略（见 fit_fallback）：roi 裁剪至计算区间并合并平坦背景点，其后各级均在 roi 基础上再施加一项简化：
+# fewer_peaks 去掉次要峰，fixed_m 固定各峰形状参数 m，no_ka2 先校正 Kα2 再以不含 Kα2 的模型拟合
+# （多项简化逐级叠加时 OI 值等峰面积比严重偏离，甚至收敛到无意义的解，故不叠加）
+FALLBACK_LADDER = ('roi', 'fewer_peaks', 'fixed_m', 'no_ka2')
+LADDER_SHARE = 0.5  # 每次拟合尝试可用剩余时间预算的比例，其余留给后续策略与指标计算
+# 设定时间预算时汇总表末尾附加的处理状态与耗时列
+STATUS_COLUMNS = ['Status', 'Time (s)']
+
+
+# 按扫描范围过滤：仅处理与当前计算类型峰位区间匹配的文件，避免 OI/D002 数据混用时拟合失败
+def range_ok(scan_x, calc_type):
+    return range_covers(scan_x.min(), scan_x.max(), calc_type)
+
+# 扫描范围 [x_min, x_max] 是否覆盖计算类型的峰位区间（元数据索引只有起止位置时使用）
+def range_covers(x_min, x_max, calc_type):
+    lo, hi = SCAN_RANGES[calc_type]
+    return (x_min <= lo) and (x_max >= hi)
+
+# 扫描范围不匹配的提示
+def _range_message(x_min, x_max):
+    return f"扫描范围 {x_min:.1f}°-{x_max:.1f}° 与计算类型不匹配"
+
+# 拟合区间（ROI）：由扫描范围检查的峰位区间两侧外延得到
+def fit_roi(calc_type):
+    lo, hi = SCAN_RANGES[calc_type]
+    margin = FIT_GRIDS[calc_type]['roi_margin']
+    return lo - margin, hi + margin
+
+# 裁切文件名（取文件名倒数第 3 段作为工作表名）
+def trim_sample_name(sample_name):
+    try:
+        return sample_name.split()[-3]
+    except IndexError:
+        return sample_name
+
+# 样品处理结果（在子进程中生成，由主进程统一写入工作簿）
+def _new_result(file_path):
+    return {
+        'file_path': file_path,
+        'sample_name': os.path.splitext(os.path.basename(file_path))[0],
+        'status': 'failed',  # ok / fallback（降级策略拟合）/ timeout（超出时间预算）/ skipped / failed
+        'message': '',
+        'strategy': None,    # 所用拟合降级策略（如 'roi+fixed_m'），常规拟合为 None
+        'elapsed': None,     # 样品处理耗时（秒，读取 + 拟合 + 计算）
+        'popt': None,        # 拟合参数
+        'summary': None,     # 汇总表一行数据（从第 1 列开始）
+        'sheet': None,       # 拟合结果记录表 {'title', 'columns', 'data'}
+        'plot': None,        # 拟合图任务（见 plot_renderer.plot_job），交由渲染器输出后移除
+        'timings': None,     # 各阶段耗时与计数（启用 profiler 时记录）
+    }
+
+# 拟合图任务（保存到源文件所在目录），由主进程提交给渲染器输出；options['plot_format'] 为空时不输出拟合图
+def _plot(options, out_dir, title, x, lines, vlines, xlim, legend_loc, legend_size):
+    return plot_job(out_dir, title, x, lines, vlines, xlim, legend_loc, legend_size,
+                    dpi=options.get('plot_dpi', PLOT_DPI), plot_format=options.get('plot_format', PLOT_FORMAT))
+
+# 石墨 D002 各项指标：K 组拟合参数 P (K, n_params) 同时计算（汇总表与误差估计共用），
+# 返回 {汇总表列名: (K,) 数组}，质心积分范围列为 (下限, 上限) 数组对；tol 为质心迭代容差
+# components 为已计算的各组全部峰曲线 (K, 峰数, len(x))（如中间结果图的分量曲线），给出时不再重新计算
+def _metrics_d002(x, P, tol=0.001, components=None):
+    P = np.atleast_2d(np.asarray(P, dtype=float))
+    table = P[:, :10].reshape(-1, 5)  # 各组依次为石墨 [002]、硅 [111]
+    peaks = dp.split_pearson_vii_table(x, table) if components is None else components.reshape(-1, np.size(x))
+    # 石墨 [002] / 硅 [111] 峰位（拟合曲线质心）及积分范围，全部峰一次计算
+    centroid, lo, hi = dp.CentroidEngine(x, peaks).centroids(table[:, 1], tol=tol)
+    g_pos, si_pos = centroid[0::2], centroid[1::2]
+    fwhm = dp.split_pearson_vii_fwhm(table)  # 计算石墨 [002] / 硅 [111] 峰半峰宽（解析解）
+    fwhm_g, fwhm_si = fwhm[0::2], fwhm[1::2]
+    fwhm_gn = dp.calculate_fwhm_net_batch(x, P[:, 0:5], P[:, 5:10], peaks[1::2])  # 计算石墨半峰宽 via deconvolution
+    fwhm_jis = dp.calculate_fwhm_jis(fwhm_g, fwhm_si)  # 计算半峰宽 via JISR7651:2007
+    theta = np.radians((28.443 - si_pos + g_pos)/2)
+    d_002 = 1.54056/(2*np.sin(theta))  # 计算石墨 D002 层间距
+    return {
+        'D002 (Å)': d_002,
+        'G%': 100 * (3.440 - d_002)/(3.440 - 3.354),  # 计算石墨化度
+        'Graphite [002] Peak (deg)': g_pos,
+        'Graphite [002] Int. Range (deg)': (lo[0::2], hi[0::2]),
+        'Graphite [002] FWHM (deg)': fwhm_g,
+        'Silicon [111] Peak (deg)': si_pos,
+        'Silicon [111] Int. Range (deg)': (lo[1::2], hi[1::2]),
+        'Silicon [111] FWHM (deg)': fwhm_si,
+        'Graphite [002] FWHM NET.(deg)': fwhm_gn,
+        'Graphite [002] Lc NET.(Å)': 0.89 * 1.54056 / (np.radians(fwhm_gn) * np.cos(theta)),  # 计算石墨Lc值 via deconvolution
+        'Graphite [002] FWHM JIS(deg)': fwhm_jis,
+        'Graphite [002] Lc JIS(Å)': 0.89 * 1.54056 / (np.radians(fwhm_jis) * np.cos(theta)),  # 计算Lc值 via JISR7651:2007
+    }
+
+# 由指标字典生成汇总表一行（第 i 组参数），质心积分范围写为 "下限~上限"（deg）
+def _summary_row(sample_name, calc_type, metrics, i=0):
+    row = [sample_name]
+    for column in SUMMARY_COLUMNS[calc_type][1:]:
+        value = metrics[column]
+        row.append(f"{value[0][i]:.3f}~{value[1][i]:.3f}" if isinstance(value, tuple) else float(value[i]))
+    return row
+
+# 石墨 D002 拟合结果记录表（中间结果图节点，见 ARTIFACT_RULES，下同）
+def _sheet_d002(a):
+    if a['popt'] is None:
+        return None
+    corrected_x, corrected_y = a['corrected']
+    background = a['background']
+    graphite_peak, silicon_peak = a['components']
+    return {
+        'title': a['title'],
+        'columns': SHEET_COLUMNS["1"],
+        'data': [corrected_x, a['raw'][1], corrected_y, a['fitted'], background, graphite_peak, silicon_peak,
+                 graphite_peak + background, silicon_peak + background],
+    }
+
+# 石墨 D002 拟合图任务（不输出拟合图时不计算 Kα2 校正等所需节点）
+def _plot_d002(a):
+    if a['popt'] is None or not a['options'].get('plot_format'):
+        return None
+    corrected_x, corrected_y = a['corrected']
+    background, metrics = a['background'], a['metrics']
+    graphite_peak, silicon_peak = a['components']
+    return _plot(a['options'], a['out_dir'], a['title'], corrected_x,
+                 [(corrected_y, dict(label='Corrected Intensity', color='blue')),  # 校正后数据
+                  (a['fitted'], dict(label='Fitted Curve', color='red')),  # 拟合曲线
+                  (background, dict(label='Background', color='green', linestyle='--')),  # 背景
+                  (graphite_peak + background, dict(label='Graphite [002] Peak', color='orange')),  # 石墨峰
+                  (silicon_peak + background, dict(label='Silicon [111] Peak', color='purple'))],  # 硅峰
+                 [(metrics['Graphite [002] Peak (deg)'][0], dict(color='orange')),
+                  (metrics['Silicon [111] Peak (deg)'][0], dict(color='purple'))],  # 石墨峰/硅峰（质心）
+                 (25, 29), 'upper left', 10)
+
+# 纳米硅各项指标（同 _metrics_d002），x 为 Kα2 校正后数据的 2θ 网格
+def _metrics_sifwhm(x, P, tol=0.001, components=None):
+    P = np.atleast_2d(np.asarray(P, dtype=float))
+    peaks = dp.split_pearson_vii_table(x, P[:, :5]) if components is None else components[:, 0]
+    # 计算硅 [111] 峰位（拟合曲线质心）
+    centroid, _, _ = dp.CentroidEngine(x, peaks).centroids(P[:, 1], tol=tol)
+    return {
+        'Silicon [111] Peak (deg)': centroid,
+        'Silicon [111] FWHM (deg)': dp.calculate_fwhm_spv(P[:, 2], P[:, 3], P[:, 4]),
+    }
+
+# 纳米硅拟合数据：Kα2 校正（及可选平滑）后的数据，与记录表共用校正、平滑结果
+def _fit_input_sifwhm(a):
+    with profiler.stage('fit_input'):
+        corrected_x, corrected_y = a['corrected']
+        return fit_grid(corrected_x, a['smoothed'] if a['options']['smooth_y'] == "1" else corrected_y, a['options'])
+
+# 纳米硅拟合目标：拟合数据即未平滑、未裁剪的 Kα2 校正数据时，拟合前的平滑与记录表中的平滑数据相同，直接复用
+# （拟合前平滑 smooth_y 时拟合函数仍在其上再平滑一次，与此前的拟合结果一致）
+def _fit_target_sifwhm(a):
+    fit_y = a['fit_input'][1]
+    return a['smoothed'] if fit_y is a['corrected'][1] else fit_target(fit_y, a['options'])
+
+# 纳米硅汇总表一行（拟合失败时仍记录样品名）
+def _summary_sifwhm(a):
+    return [a['name']] if a['popt'] is None else _summary(a)
+
+# 纳米硅拟合结果记录表（拟合失败时仍记录校正/平滑数据）
+def _sheet_sifwhm(a):
+    corrected_x, corrected_y = a['corrected']
+    data = [corrected_x, a['raw'][1], corrected_y, a['smoothed']]
+    if a['popt'] is not None:
+        data += [a['fitted'], a['background'], a['components'][0]]
+    return {'title': a['title'], 'columns': SHEET_COLUMNS["2"][:len(data)], 'data': data}
+
+# OI值 各项指标（同 _metrics_d002）
+def _metrics_oi(x, P, tol=0.001, components=None):
+    P = np.atleast_2d(np.asarray(P, dtype=float))
+    table = P[:, :25].reshape(-1, 5, 5)[:, [0, 4, 1]].reshape(-1, 5)  # 各组依次为石墨 [004]、石墨 [110]、硅 [311]
+    if components is None:
+        peaks = dp.split_pearson_vii_table(x, table)
+    else:
+        peaks = components[:, [0, 4, 1]].reshape(-1, np.size(x))
+    # 石墨 [004] / [110] 峰位（拟合曲线质心）及积分范围、硅 [311] 峰位，全部峰一次计算
+    centroid, lo, hi = dp.CentroidEngine(x, peaks).centroids(table[:, 1], tol=tol)
+    g004_pos, g110_pos, si311_pos = centroid[0::3], centroid[1::3], centroid[2::3]
+    # 计算OI值（扫描范围内解析峰面积比）
+    area = np.array([dp.calculate_peak_area(x, peak, params) for peak, params in zip(peaks, table)])
+    oi_value = area[0::3] / area[1::3]
+    fwhm = dp.split_pearson_vii_fwhm(table)  # 各峰半峰宽（解析解）
+    d_004x2 = 2*(1.54056/(2*np.sin(np.radians((56.12 - si311_pos + g004_pos)/2))))  # 计算石墨 D004 层间距
+    return {
+        'Graphite OI value (-)': oi_value,
+        'Dual D004 (Å)': d_004x2,
+        'G%': 100 * (3.440 - d_004x2)/(3.440 - 3.354),  # 计算石墨化度
+        'Graphite [004] Peak (deg)': g004_pos,
+        'Graphite [004] Int. Range (deg)': (lo[0::3], hi[0::3]),
+        'Graphite [004] Intensity (counts)': P[:, 0],  # 石墨 [004] 峰高
+        'Graphite [004] FWHM (deg)': fwhm[0::3],
+        'Graphite [110] Peak (deg)': g110_pos,
+        'Graphite [110] Int. Range (deg)': (lo[1::3], hi[1::3]),
+        'Graphite [110] Intensity (counts)': P[:, 20],  # 石墨 [110] 峰高
+        'Graphite [110] FWHM (deg)': fwhm[1::3],
+        'Silicon [311] Peak (deg)': si311_pos,  # 不在汇总表中，用于拟合图标注
+    }
+
+# OI值 拟合结果记录表
+def _sheet_oi(a):
+    if a['popt'] is None:
+        return None
+    corrected_x, corrected_y = a['corrected']
+    return {
+        'title': a['title'],
+        'columns': SHEET_COLUMNS["3"],
+        'data': [corrected_x, a['raw'][1], corrected_y, a['fitted'], a['background'], *a['components']],
+    }
+
+# OI值 拟合图任务
+def _plot_oi(a):
+    if a['popt'] is None or not a['options'].get('plot_format'):
+        return None
+    corrected_x, corrected_y = a['corrected']
+    background, metrics = a['background'], a['metrics']
+    g004_peak, si311_peak, si400_peak, si331_peak, g110_peak = a['components']
+    return _plot(a['options'], a['out_dir'], a['title'], corrected_x,
+                 [(corrected_y, dict(label='Corrected Intensity', color='blue')),  # 校正后数据
+                  (a['fitted'], dict(label='Fitted Curve', color='red')),  # 拟合曲线
+                  (background, dict(label='Background', color='green', linestyle='--')),  # 背景
+                  (g004_peak + background, dict(label='Graphite [004] Peak', color='orange')),  # 石墨[004]
+                  (si311_peak + background, dict(label='Silicon [311] Peak', color='purple')),  # 硅峰[311]
+                  (si400_peak + background, dict(label='Silicon [400] Peak', color='gray')),  # 硅峰[400]
+                  (si331_peak + background, dict(label='Silicon [331] Peak', color='gray')),  # 硅峰[331]
+                  (g110_peak + background, dict(label='Graphite [110] Peak', color='cyan'))],  # 石墨[110]
+                 [(metrics['Graphite [004] Peak (deg)'][0], dict(color='orange', linewidth=0.5)),
+                  (metrics['Silicon [311] Peak (deg)'][0], dict(color='purple', linewidth=0.5))],  # 石墨[004]/硅峰[311]（质心）
+                 (50, 80), 'upper right', 8)
+
+# 各计算类型的拟合数据：D002 / OI+D004 直接拟合原始数据，Si_FWHM 拟合 Kα2 校正（及可选平滑）后的数据
+# options['fit_roi'] 为真时截取至拟合区间，options['fit_binning'] 为真时在平坦背景处自适应合并相邻点（见 data_processor.FitGrid），
+# 返回 (fit_x, fit_y, sigma)；拟合参数与 2θ 网格无关，各项指标仍在完整扫描网格上计算
+def fit_input(scan_x, scan_y, options):
+    with profiler.stage('fit_input'):
+        return _fit_input(scan_x, scan_y, options)
+
+def _fit_input(scan_x, scan_y, options):
+    if options['calc_type'] == "2":
+        scan_x, scan_y = dp.correct_ka2(scan_x, scan_y)
+        if options['smooth_y'] == "1":
+            scan_y = dp.savgol_smooth(scan_y, 25, 3)
+    return fit_grid(scan_x, scan_y, options)
+
+# 拟合区间截取与平坦背景合并（见 fit_input），不截取、不合并时原样返回 (x, y, None)
+def fit_grid(x, y, options):
+    calc_type = options['calc_type']
+    config = FIT_GRIDS[calc_type]
+    roi = fit_roi(calc_type) if options.get('fit_roi') else None
+    max_bin = config['max_bin'] if options.get('fit_binning') else 1
+    if roi is None and max_bin == 1:
+        return x, y, None
+    grid = dp.get_fit_grid(x, FIT_MODELS[calc_type].centers, roi, config['window'], max_bin)
+    return grid.x, grid.reduce(y), grid.sigma
+
+# 拟合目标：拟合前对拟合数据所做的变换（FIT_TRANSFORMS，如 Si_FWHM 的平滑），无变换时即 fit_y
+def fit_target(fit_y, options):
+    transform = FIT_TRANSFORMS.get(options['calc_type'])
+    return fit_y if transform is None else transform(fit_y)
+
+# 拟合数据与拟合目标 (fit_x, fit_y, sigma, target)：初值由变换前的 fit_y 估计，拟合 target
+def fit_inputs(scan_x, scan_y, options):
+    fit_x, fit_y, sigma = fit_input(scan_x, scan_y, options)
+    return fit_x, fit_y, sigma, fit_target(fit_y, options)
+
+# 以初值 p0（None 时为经验初值）拟合目标 target，返回 popt（未收敛为 None）
+def _fit_once(calc_type, fit_x, fit_y, target, p0=None, sigma=None):
+    if p0 is None:
+        p0 = INITIAL_GUESS_FUNCTIONS[calc_type](fit_x, fit_y)
+    return dp.fit_model(FIT_MODELS[calc_type], fit_x, target, p0, sigma)
+
+# 单样品拟合，返回拟合参数 popt（拟合失败为 None）
+# 启用热启动时以参数库中最接近的已收敛样品参数作为初值，热启动拟合失败时退回经验初值重新拟合
+# inputs 为已计算的 (fit_x, fit_y, sigma, target)（见 fit_inputs，如中间结果图的节点），未给出时在此计算
+def fit_scan(scan_x, scan_y, options, name=None, inputs=None):
+    with profiler.stage('fit'):
+        return _fit_scan(scan_x, scan_y, options, name, inputs)
+
+def _fit_scan(scan_x, scan_y, options, name, inputs):
+    calc_type = options['calc_type']
+    fit_x, fit_y, sigma, target = inputs or fit_inputs(scan_x, scan_y, options)
+    library = warm_start.get_library()
+    popt = None
+    if library is not None:
+        p0, source = library.initial_guess(fit_x, fit_y, name, INITIAL_GUESS_FUNCTIONS[calc_type](fit_x, fit_y))
+        if source is not None:
+            popt = _fit_once(calc_type, fit_x, fit_y, target, p0, sigma)
+    if popt is None:
+        popt = _fit_once(calc_type, fit_x, fit_y, target, sigma=sigma)
+    if library is not None and popt is not None:
+        library.add(name, popt)
+    return popt
+
+# 同一 2θ 网格的多个样品批量拟合，返回各样品 popt 列表；热启动初值同 fit_scan，批量拟合失败的热启动样品退回经验初值逐个拟合
+# inputs 为各样品已计算的 fit_input，未给出时在此计算
+def fit_scans_batch(scan_x, scan_ys, options, names=None, inputs=None):
+    calc_type = options['calc_type']
+    names = names or [None] * len(scan_ys)
+    inputs = inputs or [fit_input(scan_x, scan_y, options) for scan_y in scan_ys]
+    fit_x, sigma = inputs[0][0], inputs[0][2]
+    library = warm_start.get_library()
+    P0, sources = None, [None] * len(inputs)
+    if library is not None:
+        guesses = [library.initial_guess(fit_x, fit_y, name, INITIAL_GUESS_FUNCTIONS[calc_type](fit_x, fit_y))
+                   for (_, fit_y, _), name in zip(inputs, names)]
+        P0 = [p0 for p0, _ in guesses]
+        sources = [source for _, source in guesses]
+    popts, _ = BATCH_FIT_FUNCTIONS[calc_type](fit_x, np.array([fit_y for _, fit_y, _ in inputs]), P0, sigma)
+    for i, (_, fit_y, _) in enumerate(inputs):
+        if popts[i] is None and sources[i] is not None:
+            popts[i] = _fit_once(calc_type, fit_x, fit_y, fit_target(fit_y, options), sigma=sigma)
+        if library is not None and popts[i] is not None:
+            library.add(names[i], popts[i])
+    return popts
+
+# 时间预算下的单样品拟合，返回 (popt, strategy)：先以常规方式拟合（fit_scan），超出分配的时间或未收敛时
+# 依次尝试 FALLBACK_LADDER 中逐级累加的降级策略；每次尝试可用剩余预算的 LADDER_SHARE，超时则以 time_budget 检查点取消
+# strategy 为成功的降级策略（'+' 连接，常规拟合为 None）；全部未收敛时返回 (None, None)，
+# 样品总预算耗尽或各次尝试均未收敛且其中有超时的尝试时抛出 BudgetExceeded
+# 未设定时间预算（options['time_budget'] 为空）时与 fit_scan 相同；inputs 同 fit_scan（仅用于常规拟合）
+def fit_scan_budgeted(scan_x, scan_y, options, name=None, inputs=None):
+    if not options.get('time_budget'):
+        return fit_scan(scan_x, scan_y, options, name, inputs), None
+    timed_out = False
+    with time_budget.limit(options['time_budget']):
+        for rungs in [()] + fallback_ladder(options['calc_type']):
+            try:
+                with time_budget.limit(time_budget.remaining() * LADDER_SHARE):
+                    popt = fit_fallback(scan_x, scan_y, options, rungs) if rungs else fit_scan(scan_x, scan_y, options, name, inputs)
+            except time_budget.BudgetExceeded:
+                if time_budget.remaining() <= 0:
+                    raise
+                popt, timed_out = None, True
+            if popt is not None:
+                return popt, '+'.join(rungs) or None
+    if timed_out:
+        raise time_budget.BudgetExceeded("超出时间预算")
+    return None, None
+
+# 计算类型适用的降级策略序列 [('roi',), ('roi', 'fewer_peaks'), ...]，不适用的策略（无次要峰时的 fewer_peaks、Si_FWHM 的 no_ka2）跳过
+def fallback_ladder(calc_type):
+    applicable = {'fewer_peaks': calc_type in MINOR_PEAKS, 'no_ka2': calc_type in KA2_FREE_MODELS}
+    return [('roi',)] + [('roi', rung) for rung in FALLBACK_LADDER[1:] if applicable.get(rung, True)]
+
+# 以降级策略 rungs 拟合（不使用热启动初值，以经验初值拟合），返回完整参数向量 popt（未收敛为 None）
+# 次要峰峰高固定为 0、其余参数固定为初值；固定 m 时取经验初值；no_ka2 的参数与含 Kα2 模型含义相同，可直接计算指标
+def fit_fallback(scan_x, scan_y, options, rungs):
+    calc_type = options['calc_type']
+    model = FIT_MODELS[calc_type]
+    with profiler.stage('fallback'):
+        if 'no_ka2' in rungs:
+            scan_x, scan_y = dp.correct_ka2(scan_x, scan_y)
+            model = KA2_FREE_MODELS[calc_type]
+        if 'roi' in rungs:
+            options = dict(options, fit_roi=True, fit_binning=True)
+        fit_x, fit_y, sigma = fit_input(scan_x, scan_y, options)
+        p0 = np.asarray(INITIAL_GUESS_FUNCTIONS[calc_type](fit_x, fit_y), dtype=float)
+        if calc_type in FIT_TRANSFORMS:
+            fit_y = FIT_TRANSFORMS[calc_type](fit_y)
+        fixed = {}
+        if 'fewer_peaks' in rungs:
+            for i in MINOR_PEAKS[calc_type]:
+                fixed.update({5 * i + k: 0.0 if k == 0 else p0[5 * i + k] for k in range(5)})
+        if 'fixed_m' in rungs:
+            fixed.update({5 * i + 4: p0[5 * i + 4] for i in range(model.n_peaks) if 5 * i + 4 not in fixed})
+        if not fixed:
+            return dp.fit_model(model, fit_x, fit_y, p0, sigma)
+        model = dp.FixedParamsModel(model, fixed)
+        popt = dp.fit_model(model, fit_x, fit_y, model.free(p0), sigma)
+        return None if popt is None else model.expand(popt)
+
+# 拟合节点：(popt, strategy)（见 fit_scan_budgeted），拟合失败为 None（不持久化，下次运行重新拟合）
+def _fit(a):
+    popt, strategy = fit_scan_budgeted(*a['raw'], a['options'], a['name'], a['fit_input'] + (a['fit_target'],))
+    return None if popt is None else (popt, strategy)
+
+# 指标节点：与分量曲线节点共用各峰曲线，不再重新计算
+def _metrics(a):
+    return METRIC_FUNCTIONS[a['options']['calc_type']](a['raw'][0], a['popt'], components=a['components'][None])
+
+# 汇总表一行节点（拟合失败为 None）
+def _summary(a):
+    return None if a['popt'] is None else _summary_row(a['name'], a['options']['calc_type'], a['metrics'])
+
+# 指标不确定度节点：与拟合共用拟合数据与拟合目标；降级策略拟合的样品为 None
+def _uncertainty(a):
+    if a['strategy'] is not None:
+        return None
+    with profiler.stage('uncertainty'):
+        return metric_uncertainty(*a['raw'], a['options'], a['popt'], a['fit_input'] + (a['fit_target'],))
+
+# 由单样品中间结果图（见 sample_artifacts）生成汇总表一行、拟合结果记录表与拟合图任务，只计算这些输出实际请求的节点
+# （不输出拟合结果时不计算分量曲线以外的记录表数据与 Kα2 校正）；启用误差估计时在汇总表末尾附加各指标标准不确定度
+def _analyse(result, artifacts, options):
+    result['strategy'] = artifacts['strategy']
+    with profiler.stage('analyse'):
+        popt = artifacts['popt']
+        if popt is None:
+            result['message'] = "拟合失败，未返回参数"
+        else:
+            result['popt'] = popt
+            result['status'] = 'ok'
+        result['summary'] = artifacts['summary']
+        if options['peak_output'] == "1":
+            result['sheet'] = artifacts['sheet']
+            if 'plot' in artifacts:
+                result['plot'] = artifacts['plot']
+    if options.get('uncertainty') and result['status'] == 'ok':
+        # 降级策略拟合的参数不是完整模型的最优解，超出时间预算时同样不给出不确定度（记为 nan）
+        u = None
+        try:
+            u = artifacts['uncertainty']
+        except time_budget.BudgetExceeded:
+            pass
+        result['summary'] = result['summary'] + (u if u is not None else [float('nan')] * len(UNCERTAINTY_COLUMNS[options['calc_type']]))
+    return result
+
+# 汇总表数值指标（UNCERTAINTY_COLUMNS）的标准不确定度（1σ），返回列表：
+# options['uncertainty'] 为 'linear' 时由拟合参数协方差线性化传递（2P 组扰动参数一次批量计算指标），
+# 为 'bootstrap' 时以残差自助法生成 options['bootstrap_samples'] 组模拟谱，以同一模型、最优参数为初值批量拟合后统计指标标准差
+# 指标在完整扫描网格上计算，协方差与重采样在拟合网格（fit_input）上计算，与拟合一致；inputs 同 fit_scan
+def metric_uncertainty(scan_x, scan_y, options, popt, inputs=None):
+    calc_type = options['calc_type']
+    model = FIT_MODELS[calc_type]
+    fit_x, fit_y, sigma, target = inputs or fit_inputs(scan_x, scan_y, options)
+    transform = FIT_TRANSFORMS.get(calc_type)
+
+    def metrics(P):
+        values = METRIC_FUNCTIONS[calc_type](scan_x, P, UNCERTAINTY_TOL)
+        return np.column_stack([values[column] for column in UNCERTAINTY_COLUMNS[calc_type]])
+
+    if options['uncertainty'] == 'bootstrap':
+        u = unc.bootstrap(metrics, model, fit_x, fit_y, popt, sigma, options['bootstrap_samples'], transform)
+    else:
+        u = unc.linearized(metrics, popt, unc.parameter_covariance(model, fit_x, target, popt, sigma),
+                           METRIC_PARAMS[calc_type])
+    return [float(v) for v in u]
+
+# 汇总表表头（启用误差估计时附加各指标标准不确定度列，设定时间预算时再附加处理状态与耗时列）
+def summary_columns(options):
+    columns = SUMMARY_COLUMNS[options['calc_type']]
+    if options.get('uncertainty'):
+        columns = columns + [f"{column} σ" for column in UNCERTAINTY_COLUMNS[options['calc_type']]]
+    if options.get('time_budget'):
+        columns = columns + STATUS_COLUMNS
+    return columns
+
+INITIAL_GUESS_FUNCTIONS = {"1": dp.D002_RAW_MODEL.initial_guess, "2": dp.initial_guess_sifwhm, "3": dp.OI_RAW_MODEL.initial_guess}
+FIT_MODELS = {"1": dp.D002_RAW_MODEL, "2": dp.SI111_MODEL, "3": dp.OI_RAW_MODEL}
+# 降级策略 fewer_peaks 去掉的次要峰下标：OI+D004 的硅 [400]（远离各指标峰；硅 [331] 与石墨 [110] 重叠，去掉后石墨 [110] 面积严重偏大）
+MINOR_PEAKS = {"3": [2]}
+# 降级策略 no_ka2 所用的不含 Kα2 模型（Si_FWHM 本身拟合 Kα2 校正后的数据，不适用）
+KA2_FREE_MODELS = {"1": dp.D002_MODEL, "3": dp.OI_MODEL}
+BATCH_FIT_FUNCTIONS = {"1": bf.fit_data_d002_raw_batch, "2": bf.fit_data_sifwhm_batch, "3": bf.fit_data_oi_raw_batch}
+METRIC_FUNCTIONS = {"1": _metrics_d002, "2": _metrics_sifwhm, "3": _metrics_oi}
+# 各计算类型指标所依赖的拟合参数下标（D002：石墨 [002]、硅 [111]；Si_FWHM：硅 [111]；OI+D004：石墨 [004]、硅 [311]、石墨 [110]），
+# 背景系数与其余峰不影响汇总表指标
+METRIC_PARAMS = {"1": np.arange(0, 10), "2": np.arange(0, 5), "3": np.r_[0:10, 20:25]}
+# 拟合函数在拟合前对数据所做的变换（Si_FWHM 拟合前平滑，见 data_processor.fit_data_sifwhm），误差估计时同样作用于数据
+FIT_TRANSFORMS = {"2": functools.partial(dp.savgol_smooth, window=25, order=3, axis=-1)}
+
+# 单样品中间结果图的节点规则（见 artifacts.ArtifactGraph），初始节点为 raw（原始数据 (scan_x, scan_y)）、options、name（样品名）与 out_dir：
+# raw → corrected（Kα2 校正）→ smoothed（平滑，仅 Si_FWHM）→ fit_input（拟合数据）→ fit_target（拟合目标）→ fit（拟合参数与降级策略）
+# → components（各峰曲线）/ background / fitted（拟合曲线）→ metrics（各项指标）→ summary / uncertainty / sheet / plot
+# D002 与 OI+D004 直接拟合原始数据，Kα2 校正以拟合曲线为迭代初值，只在输出记录表或拟合图时计算
+COMMON_RULES = {
+    'title': lambda a: trim_sample_name(a['name']) if a['options']['trim_filename'] == "1" else a['name'],
+    'fit_input': lambda a: fit_input(*a['raw'], a['options']),
+    'fit_target': lambda a: fit_target(a['fit_input'][1], a['options']),
+    'fit': _fit,
+    'popt': lambda a: None if a['fit'] is None else a['fit'][0],
+    'strategy': lambda a: None if a['fit'] is None else a['fit'][1],
+    'components': lambda a: FIT_MODELS[a['options']['calc_type']].peaks(a['raw'][0], a['popt']),
+    'background': lambda a: FIT_MODELS[a['options']['calc_type']].background(a['raw'][0], a['popt']),
+    'fitted': lambda a: a['components'].sum(axis=0) + a['background'],
+    'corrected': lambda a: dp.correct_ka2(*a['raw'], a['fitted']),
+    'metrics': _metrics,
+    'summary': _summary,
+    'uncertainty': _uncertainty,
+}
+ARTIFACT_RULES = {
+    "1": dict(COMMON_RULES, sheet=_sheet_d002, plot=_plot_d002),
+    "2": dict(COMMON_RULES, corrected=lambda a: dp.correct_ka2(*a['raw']),
+              smoothed=lambda a: dp.savgol_smooth(a['corrected'][1], 25, 3),
+              fit_input=_fit_input_sifwhm, fit_target=_fit_target_sifwhm, summary=_summary_sifwhm, sheet=_sheet_sifwhm),
+    "3": dict(COMMON_RULES, sheet=_sheet_oi, plot=_plot_oi),
+}
+# 持久化的节点及其所依赖的处理选项（批量拟合与热启动只影响收敛精度，与结果库一样不计入）；
+# 其余节点（Kα2 校正、平滑、分量曲线等）重新计算均不足 1 ms，比读取持久化文件更快，不持久化
+FIT_OPTION_KEYS = ('calc_type', 'smooth_y', 'fit_roi', 'fit_binning', 'time_budget')
+PERSISTED_NODES = {
+    'fit': FIT_OPTION_KEYS,
+    'metrics': FIT_OPTION_KEYS,
+    'uncertainty': FIT_OPTION_KEYS + ('uncertainty', 'bootstrap_samples'),
+}
+
+# 读取数据（options['file_type'] 为 'auto' 时由文件头识别格式；options['cache_dir'] 非空时经解析结果缓存读取）
+def read_scan(file_path, options):
+    reader = dr.reader_for(file_path, options['file_type'])
+    with profiler.stage('read'):
+        if options.get('cache_dir'):
+            cache = ScanCache(options['cache_dir'], options.get('cache_max_bytes', CACHE_MAX_BYTES))
+            return cache.read(reader, file_path)
+        return reader.read_data(file_path)
+
+# 读取数据并按扫描范围过滤，返回 (scan_x, scan_y)；读取失败或范围不匹配时记录在结果中并返回 None
+def _load_scan(result, options):
+    scan_x, scan_y = read_scan(result['file_path'], options)
+    if scan_x is None:
+        result['message'] = "拟合失败，文件读取错误"
+        return None
+    if not range_ok(scan_x, options['calc_type']):
+        result['status'] = 'skipped'
+        result['message'] = _range_message(scan_x.min(), scan_x.max())
+        return None
+    return scan_x, scan_y
+
+# 单样品中间结果图（节点见 ARTIFACT_RULES）；options['artifact_dir'] 非空时 PERSISTED_NODES 中的节点持久化，
+# 以源文件（路径、大小、修改时间）、模型版本与节点所依赖的处理选项为键，再次导出（如改为输出拟合结果、附加误差估计）时直接加载
+def sample_artifacts(result, scan, options):
+    store, keys = None, None
+    if options.get('artifact_dir'):
+        store = ArtifactStore(options['artifact_dir'], options.get('cache_max_bytes', CACHE_MAX_BYTES))
+        st = os.stat(result['file_path'])
+        sample = [os.path.abspath(result['file_path']), st.st_size, st.st_mtime_ns, dp.MODEL_VERSION]
+        keys = {name: json.dumps(sample + [options.get(k) for k in option_keys]) for name, option_keys in PERSISTED_NODES.items()}
+    # 输出目录与源文件同级（子目录读取则图片保存回子目录）
+    return ArtifactGraph(ARTIFACT_RULES[options['calc_type']], store, keys, raw=scan, options=options,
+                         name=result['sample_name'], out_dir=os.path.dirname(result['file_path']) or '.')
+
+# 记录样品处理异常
+def _record_failure(result, e):
+    result['status'] = 'failed'
+    result['message'] = f"{type(e).__name__}: {e}"
+    result['traceback'] = traceback.format_exc()
+    return result
+
+# 记录超出时间预算的样品
+def _record_timeout(result, options):
+    result['status'] = 'timeout'
+    result['message'] = f"超出时间预算 {options['time_budget']:g} s"
+    return result
+
+# 记录样品处理耗时；降级策略拟合成功的样品状态记为 fallback
+# 设定时间预算时在汇总表末尾附加处理状态与耗时列（超时、失败的样品同样列出，跳过的样品不列出）
+def _finish(result, options, elapsed):
+    result['elapsed'] = elapsed
+    if result['status'] == 'ok' and result['strategy']:
+        result['status'] = 'fallback'
+    if options.get('time_budget') and result['status'] != 'skipped':
+        row = list(result['summary'] or [result['sample_name']])
+        row += [None] * (len(summary_columns(options)) - len(STATUS_COLUMNS) - len(row))
+        status = f"fallback ({result['strategy']})" if result['status'] == 'fallback' else result['status']
+        result['summary'] = row + [status, round(elapsed, 3)]
+    return result
+
+# 单样品处理：读取 → 过滤 → 拟合 → 计算 → 绘图，返回待写入工作簿的结果（拟合及之后各步为中间结果图的节点，按输出需要计算，见 sample_artifacts）
+# 任何异常均记录在结果中，不向上抛出，保证单个样品失败不影响整批处理
+# options['time_budget'] 为单样品处理的时间预算（秒），超出时依次尝试降级策略（见 fit_scan_budgeted），预算耗尽时记为 timeout
+def process_sample(file_path, options):
+    result = _new_result(file_path)
+    start = time.perf_counter()
+    with profiler.sample() as timings, time_budget.limit(options.get('time_budget')):
+        result['timings'] = timings
+        try:
+            scan = _load_scan(result, options)
+            if scan is None:
+                return result
+            return _analyse(result, sample_artifacts(result, scan, options), options)
+        except time_budget.BudgetExceeded:
+            return _record_timeout(result, options)
+        except Exception as e:
+            return _record_failure(result, e)
+        finally:
+            _finish(result, options, time.perf_counter() - start)
+
+# 逐个处理一组样品
+def process_samples(file_paths, options):
+    return [process_sample(file_path, options) for file_path in file_paths]
+
+# 分组批量处理一组样品：先读取全部扫描并按 2θ 网格分组，同一网格样品数不少于 batch_fitter.MIN_BATCH 的组
+# 一次批量拟合（批量拟合出错时退回逐个拟合），其余样品逐个拟合，再逐个计算指标
+# 启用 profiler 时批量拟合的耗时与计数按组内样品数平均计入各样品
+# 设定时间预算时批量拟合以组内样品数 × 单样品预算 × LADDER_SHARE 为限（超时退回逐个拟合），各样品的读取、批量拟合分摊耗时与
+# 逐个拟合、计算耗时合计不超过单样品预算；批量拟合未收敛的样品按 fit_scan_budgeted 尝试降级策略
+# 已持久化拟合结果的样品（见 sample_artifacts）不参与批量拟合
+def process_chunk(file_paths, options):
+    budget = options.get('time_budget')
+    results = [_new_result(file_path) for file_path in file_paths]
+    elapsed = [0.0] * len(results)
+    scans, artifacts, indices = {}, {}, []
+    for i, result in enumerate(results):
+        start = time.perf_counter()
+        with profiler.sample() as timings:
+            result['timings'] = timings
+            try:
+                scan = _load_scan(result, options)
+                if scan is not None:
+                    scans[i] = scan
+                    artifacts[i] = sample_artifacts(result, scan, options)
+                    if not artifacts[i].ready('fit'):  # 已持久化拟合结果的样品不参与批量拟合
+                        indices.append(i)
+            except Exception as e:
+                _record_failure(result, e)
+        elapsed[i] = time.perf_counter() - start
+
+    popts = {}
+    for scan_x, members in bf.group_by_grid([scans[i] for i in indices]):
+        members = [indices[j] for j in members]
+        if len(members) < bf.MIN_BATCH:
+            continue
+        start = time.perf_counter()
+        with profiler.sample() as group:
+            try:
+                with profiler.stage('fit'), time_budget.limit(budget * len(members) * LADDER_SHARE if budget else None):
+                    popts.update(zip(members, fit_scans_batch(scan_x, [scans[i][1] for i in members], options,
+                                                              [results[i]['sample_name'] for i in members],
+                                                              [artifacts[i]['fit_input'] for i in members])))
+            except Exception as e:
+                print(f"批量拟合失败，改为逐个拟合: {type(e).__name__}: {e}")
+        for i in members:
+            profiler.merge(results[i]['timings'], group, 1 / len(members))
+            elapsed[i] += (time.perf_counter() - start) / len(members)
+
+    for i in scans:
+        start = time.perf_counter()
+        with profiler.sample(results[i]['timings']), time_budget.limit(budget - elapsed[i] if budget else None):
+            try:
+                if i in popts and (popts[i] is not None or not budget):
+                    artifacts[i].put('fit', None if popts[i] is None else (popts[i], None))
+                _analyse(results[i], artifacts[i], options)
+            except time_budget.BudgetExceeded:
+                _record_timeout(results[i], options)
+            except Exception as e:
+                _record_failure(results[i], e)
+        elapsed[i] += time.perf_counter() - start
+    for result, seconds in zip(results, elapsed):
+        _finish(result, options, seconds)
+    return results
+
+# 拟合进程初始化：options['warm_start'] 为真时在当前进程中建立热启动参数库（以 seeds [(样品名, popt), ...] 预置），
+# 之后该进程拟合成功的样品依次加入参数库
+# options['profile'] / options['profile_dir'] 设置当前进程的分析模式与 cProfile 分段文件目录（见 profiler.configure）
+# 设定时间预算时预先导入 Si_FWHM 按需导入的平滑模块（见 data_processor.savgol_smooth），导入耗时不计入首个样品的预算
+def init_worker(options, seeds=()):
+    profiler.configure(options.get('profile'), options.get('profile_dir'))
+    if options.get('warm_start'):
+        warm_start.install(warm_start.WarmStartLibrary(FIT_MODELS[options['calc_type']], seeds))
+    else:
+        warm_start.install(None)
+    if options.get('time_budget') and options['calc_type'] in FIT_TRANSFORMS:
+        importlib.import_module('scipy.signal')  # 仅为预先导入，模块由 savgol_smooth 自行引用
+
+# 批量处理：按 workers 数量在进程池中并行处理样品，结果按原始文件顺序返回
+# options['batch_fit'] 为真时按进程数将文件清单切分为连续的若干组，各组在子进程中分组批量拟合；否则逐个样品分发
+# 拟合图由独立的渲染进程池（plot_workers 个进程，默认与 workers 相同）输出，与后续样品的拟合并行进行；
+# 串行处理时在主进程中直接渲染；seeds 为热启动参数库预置样品（见 init_worker）
+def process_batch(file_list, options, workers=None, plot_workers=None, seeds=()):
+    workers = workers or os.cpu_count() or 1
+    parallel = workers > 1 and len(file_list) > 1
+    if plot_workers is None:
+        plot_workers = workers if parallel else 0
+    if options.get('batch_fit'):
+        size = -(-len(file_list) // min(workers, len(file_list))) if file_list else 1
+        chunks = [file_list[i:i + size] for i in range(0, len(file_list), size)]
+        task = process_chunk
+    else:
+        chunks = [[file_path] for file_path in file_list]
+        task = process_samples
+
+    results, plot_paths = [], []
+
+    # 收集一组结果并提交拟合图渲染
+    def collect(chunk_results):
+        for result in chunk_results:
+            job = result.pop('plot', None)
+            renderer.submit(job)
+            plot_paths.append(job['path'] if job else None)
+            results.append(result)
+
+    with PlotRenderer(plot_workers) as renderer:
+        if not parallel:
+            init_worker(options, seeds)
+            for chunk in chunks:
+                collect(profiler.run(task, chunk, options))
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, len(chunks)), initializer=init_worker,
+                                     initargs=(options, seeds)) as executor:
+                futures = [executor.submit(profiler.run, task, chunk, options) for chunk in chunks]
+                for chunk, future in zip(chunks, futures):
+                    try:
+                        chunk_results = future.result()
+                    except Exception as e:
+                        # 子进程异常退出（如内存不足被终止）时仅标记当前组样品失败
+                        chunk_results = [_new_result(file_path) for file_path in chunk]
+                        for result in chunk_results:
+                            result['message'] = f"{type(e).__name__}: {e}"
+                    collect(chunk_results)
+
+    # 拟合图渲染耗时计入各样品记录
+    for result, path in zip(results, plot_paths):
+        if result['timings'] is not None and path in renderer.durations:
+            result['timings']['stages']['plot'] = renderer.durations[path]
+    return results
+
+# 增量批处理：结果库中文件哈希、计算选项与模型版本均未变化的样品直接复用已存结果，
+# 仅对新增或变化的样品重新拟合；reuse 为 False 时全部重新处理，但仍将结果写入结果库供下次增量运行使用
+# 启用热启动且 reuse 为真时以结果库中同一计算类型、同一模型版本最近拟合成功的样品参数预置参数库
+def process_batch_incremental(file_list, options, workers=None, store_path=STORE_PATH, reuse=True, plot_workers=None):
+    store = ResultsStore(store_path)
+    try:
+        results = [None] * len(file_list)
+        hashes = [store.content_hash(file_path, options['calc_type']) for file_path in file_list]
+        todo = []
+        for i, file_path in enumerate(file_list):
+            stored = store.lookup(file_path, options, dp.MODEL_VERSION, hashes[i]) if reuse else None
+            if stored is None:
+                todo.append(i)
+            else:
+                results[i] = stored
+        if reuse:
+            print(f"增量处理：{len(todo)} 个样品需要拟合，{len(file_list) - len(todo)} 个样品复用已存结果")
+        seeds = store.fitted_params(options['calc_type'], dp.MODEL_VERSION, warm_start.MAX_ENTRIES) if reuse and options.get('warm_start') and todo else []
+        for i, result in zip(todo, process_batch([file_list[i] for i in todo], options, workers, plot_workers, seeds)):
+            results[i] = result
+            store.save(result, options, dp.MODEL_VERSION, hashes[i], summary_columns(options))
+        store.commit()
+    finally:
+        store.close()
+    return results
+
+# 输出处理结果提示
+def report_result(result):
+    if result['status'] == 'skipped':
+        print(f"跳过 {result['sample_name']}: {result['message']}")
+    elif result['status'] == 'failed':
+        print(f"Failed to fit peaks for sample {result['sample_name']}: {result['message']}")
+    elif result['status'] == 'timeout':
+        print(f"超时 {result['sample_name']}: {result['message']}")
+    elif result['status'] == 'fallback':
+        print(f"{result['sample_name']}: 常规拟合超时或未收敛，以降级策略 {result['strategy']} 拟合")
+
+# 拟合结果曲线输出到旁路文件（CSV / NPZ），与源文件同级保存，返回文件路径
+# title 为文件名前缀（默认为记录表名称；写入工作簿时为去重后的名称，避免同名样品互相覆盖）
+def write_curve_file(result, curve_format, title=None):
+    sheet = result['sheet']
+    out_dir = os.path.dirname(result['file_path']) or '.'
+    path = os.path.join(out_dir, f"{title or sheet['title']}_curves.{curve_format}")
+    data = np.column_stack(sheet['data'])
+    if curve_format == 'npz':
+        np.savez_compressed(path, columns=np.array(sheet['columns']), data=data)
+    else:
+        np.savetxt(path, data, delimiter=',', header=','.join(sheet['columns']), comments='', fmt='%.10g', encoding='utf-8')
+    return path
+
+# 将批处理结果按原始文件顺序写入工作簿（单一写入端）
+# 采用 openpyxl 只写模式逐行流式写入，整行追加，不在内存中保留单元格对象
+# curve_format 为 'sheet' 时各样品曲线写入独立工作表，为 'csv' / 'npz' 时写入源文件同级的旁路文件
+# columns 为汇总表表头（默认为该计算类型的 SUMMARY_COLUMNS，启用误差估计时见 summary_columns）
+def write_workbook(results, calc_type, output_path='xrd_processed.xlsx', curve_format='sheet', columns=None):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.workbook.child import avoid_duplicate_name
+
+    wb = Workbook(write_only=True)
+    ws_res = wb.create_sheet('Sample list')
+    ws_res.freeze_panes = 'A2'
+    ws_res.append(columns or SUMMARY_COLUMNS[calc_type])
+
+    # 预先确定各拟合结果记录表（或旁路文件）名称（与 openpyxl 重名处理规则一致），以便在汇总表中写入超链接
+    sheet_names = ['Sample list']
+    links = {}
+    for sam_index, result in enumerate(results, start=2):
+        if result['sheet'] is None:
+            continue
+        title = avoid_duplicate_name(sheet_names, result['sheet']['title'])
+        sheet_names.append(title)
+        if curve_format == 'sheet':
+            links[sam_index] = "#'%s'!A1" % title
+        else:
+            path = write_curve_file(result, curve_format, title)
+            links[sam_index] = os.path.relpath(path, os.path.dirname(os.path.abspath(output_path)))
+
+    for sam_index, result in enumerate(results, start=2):
+        row = list(result['summary']) if result['summary'] is not None else []
+        if sam_index in links:
+            name_cell = WriteOnlyCell(ws_res, value=row[0] if row else None)
+            name_cell.hyperlink = links[sam_index]
+            row = [name_cell] + row[1:]
+        ws_res.append(row)
+
+    if curve_format == 'sheet':
+        titles = iter(sheet_names[1:])
+        for sam_index, result in enumerate(results, start=2):
+            sheet = result['sheet']
+            if sheet is None:
+                continue
+            # 拟合结果记录表：第 1 行返回链接，第 2 行表头，第 3 行起为整行曲线数据
+            ws_raw = wb.create_sheet(next(titles))
+            ws_raw.freeze_panes = 'A3'
+            back_cell = WriteOnlyCell(ws_raw, value='Back')
+            back_cell.hyperlink = "#'Sample list'!A%s" % str(sam_index)
+            ws_raw.append([back_cell])
+            ws_raw.append(sheet['columns'])
+            for row in np.column_stack(sheet['data']).tolist():
+                ws_raw.append(row)
+    wb.save(output_path)
+    return output_path
+
+# 构建处理选项：在 DEFAULT_OPTIONS 基础上按关键字覆盖，并检查文件类型与计算类型
+# file_type: 'auto' 由文件头识别格式，或读取器注册名（'rd' / 'xrdml' / 'raw' / 'xy' 及插件格式，旧版编号 "1"/"2"/"3" 仍可用）；calc_type: "1" D002 / "2" Si_FWHM / "3" OI+D004
+# smooth_y: "1" 拟合前平滑（仅 Si_FWHM）；peak_output: "1" 输出拟合曲线与拟合图；trim_filename: "1" 裁切工作表名
+# cache_dir: 解析结果缓存目录（None 则不使用缓存，默认）；plot_format: 'png' / 'svg'（None 则不输出拟合图）
+# fit_binning: 平坦背景处自适应合并相邻点（默认不合并，逐点拟合）；fit_roi: 截取至计算类型拟合区间；batch_fit: 同一 2θ 网格的样品批量拟合
+# warm_start: 以已拟合样品参数作为初值（默认不启用）；profile: None / 'timing' / 'cprofile'；profile_dir: cProfile 分段文件目录（run 按输出工作簿路径设定）
+# uncertainty: None / 'linear' 线性化误差传递 / 'bootstrap' 残差自助法（bootstrap_samples 组重采样），汇总表附加各指标标准不确定度
+# time_budget: 单样品处理时间预算（秒，None 不限制），超出时依次尝试降级策略，汇总表附加处理状态与耗时
+# artifact_dir: 中间结果（拟合参数、指标、不确定度）持久化目录（None 则不持久化），再次导出时跳过重复计算
+def make_options(**overrides):
+    unknown = set(overrides) - set(DEFAULT_OPTIONS)
+    if unknown:
+        raise ValueError(f"未知的处理选项: {', '.join(sorted(unknown))}")
+    options = dict(DEFAULT_OPTIONS, **overrides)
+    if options['file_type'] != 'auto':
+        dr.get_reader(options['file_type'])
+    if options['calc_type'] not in SUMMARY_COLUMNS:
+        raise ValueError("无效的计算类型选择")
+    if options['uncertainty'] not in UNCERTAINTY_MODES:
+        raise ValueError("无效的误差估计方式")
+    if options['time_budget'] is not None and not options['time_budget'] > 0:
+        raise ValueError("时间预算须为正数")
+    return options
+
+# 抓取文件清单：patterns 为文件、目录或通配符（支持 ** 递归），目录按读取器扩展名递归查找（只遍历一次）；
+# 未给出 patterns 时查找 root 目录下全部该类型文件；file_type 为 'auto' 时收集全部已注册格式的文件，
+# 并以文件头识别，跳过扩展名相符但无法识别的文件（如同名扩展的其他仪器格式）；结果去重并保持给出顺序
+def find_files(patterns, file_type='auto', root='.'):
+    extensions = dr.reader_extensions(file_type)
+    file_list = []
+    for pattern in patterns or [root]:
+        if os.path.isdir(pattern):
+            for dir_path, _, files in os.walk(pattern):
+                file_list += [os.path.join(dir_path, f) for f in files if os.path.splitext(f)[1].lower() in extensions]
+        elif glob.has_magic(pattern):
+            file_list += [path for path in sorted(glob.glob(pattern, recursive=True))
+                          if os.path.isfile(path) and os.path.splitext(path)[1].lower() in extensions]
+        elif os.path.isfile(pattern):
+            file_list.append(pattern)
+        else:
+            print(f"未找到文件: {pattern}")
+    file_list = list(dict.fromkeys(file_list))
+    if file_type == 'auto':
+        recognized = [path for path in file_list if _recognized(path)]
+        if len(recognized) < len(file_list):
+            print(f"跳过 {len(file_list) - len(recognized)} 个无法识别格式的文件")
+        file_list = recognized
+    return file_list
+
+def _recognized(file_path):
+    try:
+        dr.detect_reader(file_path)
+        return True
+    except (OSError, ValueError):
+        return False
+
+# 按元数据索引（只读取文件头，见 scan_index）预先过滤扫描范围：不匹配的文件直接记为跳过，不解码强度数据、不计算文件哈希
+# 返回 (需要处理的文件清单, 与 file_list 对应的预定结果列表（需要处理的文件为 None）)；
+# 文件头无法读取的文件仍交由完整读取流程处理（由其记录读取错误）
+def screen_files(file_list, options, index_path=INDEX_PATH):
+    index = ScanIndex(index_path)
+    try:
+        headers = index.headers(file_list, options['file_type'])
+    finally:
+        index.close()
+    selected, screened = [], []
+    for file_path, header in zip(file_list, headers):
+        result = None
+        if header is not None and not range_covers(header['start'], header['end'], options['calc_type']):
+            result = _new_result(file_path)
+            result['status'] = 'skipped'
+            result['message'] = _range_message(header['start'], header['end'])
+        else:
+            selected.append(file_path)
+        screened.append(result)
+    return selected, screened
+
+# 完整处理流程（命令行与脚本调用共用）：按元数据索引过滤、批量处理、输出提示、写入工作簿，启用性能分析时写入耗时报告（路径由 output_path 得到，见 profiler.output_paths）
+# incremental 为真时复用结果库中未变化样品的结果并将新结果写入结果库，否则不读写结果库；curve_format 为 'sheet' / 'csv' / 'npz'；
+# index_path 给出时按该路径的元数据索引预先过滤扫描范围，为 None（默认）时不使用索引（全部文件解码后再按扫描范围过滤）；返回结果列表
+def run(file_list, options, output_path='xrd_processed.xlsx', workers=None, incremental=False,
+        store_path=STORE_PATH, curve_format='sheet', index_path=None):
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if options.get('profile'):
+        report_prefix, profile_path, profile_dir = profiler.output_paths(output_path)
+        options = dict(options, profile_dir=profile_dir)
+    if index_path:
+        selected, results = screen_files(file_list, options, index_path)
+    else:
+        selected, results = file_list, [None] * len(file_list)
+    if incremental:
+        processed = process_batch_incremental(selected, options, workers, store_path)
+    else:
+        processed = process_batch(selected, options, workers)
+    processed = iter(processed)
+    results = [result if result is not None else next(processed) for result in results]
+    for result in results:
+        report_result(result)
+
+    workbook_start = time.perf_counter()
+    write_workbook(results, options['calc_type'], output_path, curve_format, summary_columns(options))
+    print(f'处理完成，结果已写入 {output_path}')
+
+    # 性能分析报告：各阶段耗时分位数（JSON）与逐样品记录（CSV），cProfile 模式另合并各进程的 cProfile 记录
+    if options.get('profile'):
+        end = time.perf_counter()
+        report = profiler.write_report(results, report_prefix, run={
+            'calc_type': options['calc_type'], 'files': len(file_list), 'workers': workers,
+            'batch_fit': options.get('batch_fit', False), 'wall_time': end - start, 'workbook': end - workbook_start})
+        print(f"耗时报告已写入 {', '.join(report)}")
+        if options['profile'] == 'cprofile':
+            profile_path = profiler.collect_profiles(profile_path, options['profile_dir'])
+            if profile_path:
+                print(f"cProfile 记录已写入 {profile_path}")
+    return results
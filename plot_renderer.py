@@ -0,0 +1,137 @@
+import os
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+PLOT_DPI = 300          # 默认输出分辨率
+PREVIEW_DPI = 72        # 快速预览分辨率
+PLOT_FORMAT = 'png'     # 默认输出格式（png / svg / pdf / jpg）
+MAX_PENDING = 16        # 待渲染队列上限（超出时提交方阻塞等待，控制内存占用）
+
+# 拟合图模板缓存（每个渲染进程各自一份）：{布局键: PlotTemplate}
+_templates = {}
+
+
+# 拟合图模板：直接使用 Figure + Agg 画布（不经过 pyplot 状态机），
+# 同一布局（曲线数量、图例、线型、坐标范围）只创建一次坐标轴、曲线、质心标注线与图例，
+# 之后每个样品仅更新曲线数据、标题与纵轴范围后保存；matplotlib 在首次创建模板时才导入（不输出拟合图时不导入）
+class PlotTemplate:
+    def __init__(self, line_styles, vline_styles, xlim, legend_loc, legend_size):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        self.figure = Figure(figsize=(10, 6))  # 设置图表大小
+        FigureCanvasAgg(self.figure)
+        ax = self.figure.add_subplot()
+        self.lines = [ax.plot([], [], linewidth=0.5, **kwargs)[0] for kwargs in line_styles]
+        self.vlines = [ax.axvline(0, linestyle='--', **kwargs) for kwargs in vline_styles]
+
+        # 美化图表
+        self.title = ax.set_title('', fontsize=14, fontweight='bold')  # 标题
+        ax.set_xlabel('2Theta (°)', fontsize=12)  # X轴标签
+        ax.set_xlim(*xlim)
+        ax.set_ylabel('Intensity (Counts)', fontsize=12)  # Y轴标签
+        ax.grid(True, linestyle='--', linewidth=0.5, alpha=0.7)  # 网格线
+        ax.legend(loc=legend_loc, fontsize=legend_size)  # 图例
+        self.ax = ax
+
+    # 布局键：曲线/标注线样式与坐标范围相同的拟合图共用同一模板
+    @staticmethod
+    def layout_key(job):
+        return (tuple(tuple(sorted(kwargs.items())) for _, kwargs in job['lines']),
+                tuple(tuple(sorted(kwargs.items())) for _, kwargs in job['vlines']),
+                tuple(job['xlim']), job['legend_loc'], job['legend_size'])
+
+    def render(self, job):
+        x = job['x']
+        for line, (y, _) in zip(self.lines, job['lines']):
+            line.set_data(x, y)
+        for vline, (pos, _) in zip(self.vlines, job['vlines']):
+            vline.set_xdata([pos, pos])
+        self.title.set_text(job['title'])
+        self.ax.relim()
+        self.ax.autoscale_view(scalex=False)
+        self.figure.tight_layout()  # 纵轴刻度标签宽度随强度量级变化，每张图重新调整布局
+        self.figure.savefig(job['path'], dpi=job['dpi'], format=job['format'])
+
+
+# 渲染一张拟合图（在渲染进程中执行），返回 (保存路径, 错误信息, 渲染耗时)
+def render_plot(job):
+    start = time.perf_counter()
+    try:
+        key = PlotTemplate.layout_key(job)
+        template = _templates.get(key)
+        if template is None:
+            template = _templates[key] = PlotTemplate([kwargs for _, kwargs in job['lines']],
+                                                      [kwargs for _, kwargs in job['vlines']],
+                                                      job['xlim'], job['legend_loc'], job['legend_size'])
+        template.render(job)
+        return job['path'], None, time.perf_counter() - start
+    except Exception as e:
+        return job['path'], f"{type(e).__name__}: {e}", time.perf_counter() - start
+
+# 拟合图任务：在拟合子进程中生成，只包含绘图所需数据，由渲染器统一输出
+# 输出格式为 None（不输出拟合图）时返回 None
+def plot_job(out_dir, title, x, lines, vlines, xlim, legend_loc, legend_size, dpi=PLOT_DPI, plot_format=PLOT_FORMAT):
+    if not plot_format:
+        return None
+    return {
+        'path': os.path.join(out_dir, f'{title}_plot.{plot_format}'),
+        'title': title,
+        'x': x,
+        'lines': lines,
+        'vlines': vlines,
+        'xlim': xlim,
+        'legend_loc': legend_loc,
+        'legend_size': legend_size,
+        'dpi': dpi,
+        'format': plot_format,
+    }
+
+
+# 拟合图渲染器：独立于拟合进程池的渲染进程池，拟合结果返回后即提交渲染，绘图与后续样品的拟合并行进行
+# 待渲染任务数不超过 max_pending（有界队列），workers 为 0 时在当前进程中直接渲染
+# 各拟合图渲染耗时记录在 durations {保存路径: 秒}
+class PlotRenderer:
+    def __init__(self, workers=1, max_pending=MAX_PENDING):
+        self.executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        self.pending = threading.BoundedSemaphore(max_pending)
+        self.errors = []
+        self.durations = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, job):
+        if job is None:
+            return
+        if self.executor is None:
+            self._report(*render_plot(job))
+            return
+        self.pending.acquire()
+        future = self.executor.submit(render_plot, job)
+        future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self.pending.release()
+        try:
+            self._report(*future.result())
+        except Exception as e:
+            self._report(None, f"{type(e).__name__}: {e}")
+
+    def _report(self, path, error, elapsed=None):
+        if elapsed is not None:
+            self.durations[path] = elapsed
+        if error is not None:
+            self.errors.append((path, error))
+            print(f"绘图失败 {path}: {error}")
+
+    # 等待全部渲染任务完成
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
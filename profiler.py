@@ -0,0 +1,148 @@
+import os
+import csv
+import json
+import glob
+import time
+import uuid
+import pstats
+import cProfile
+import numpy as np
+
+from contextlib import contextmanager, nullcontext
+
+
+PROFILE_DIR = '.xrd_profile'       # 默认 cProfile 分段文件目录（各进程每个任务一个文件，运行结束后合并）
+PROFILE_PATH = 'xrd_profile.prof'  # 默认合并后的 cProfile 文件
+REPORT_PATH = 'xrd_timing'         # 默认耗时报告路径前缀（.json 汇总 + .csv 逐样品）
+PERCENTILES = (50, 90, 99)
+
+# 当前进程的分析模式：None 不记录，'timing' 记录各阶段耗时与计数，'cprofile' 另外以 cProfile 记录每个任务
+_mode = None
+_profile_dir = PROFILE_DIR
+# 当前样品的耗时记录 {'stages': {阶段: 秒}, 'counters': {计数项: 次数}}，不在样品处理中或未启用时为 None
+_current = None
+_NULL = nullcontext()
+
+
+# 设置当前进程的分析模式与 cProfile 分段文件目录（进程池初始化时调用）
+def configure(mode, profile_dir=None):
+    global _mode, _profile_dir
+    _mode = mode or None
+    _profile_dir = profile_dir or PROFILE_DIR
+
+# 由输出工作簿路径得到本次运行的分析输出路径：(耗时报告前缀 <工作簿名>_timing, 合并后的 cProfile 文件 <工作簿名>_profile.prof,
+# cProfile 分段文件目录 <工作簿名>_profile_parts)，输出不同工作簿的运行（如同时进行的多个批处理）互不覆盖
+def output_paths(output_path):
+    stem = os.path.splitext(output_path)[0]
+    return stem + '_timing', stem + '_profile.prof', stem + '_profile_parts'
+
+def enabled():
+    return _mode is not None
+
+# 阶段计时（可嵌套，各阶段分别累计含子阶段在内的耗时）
+class _Stage:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        stages = _current['stages']
+        stages[self.name] = stages.get(self.name, 0.0) + time.perf_counter() - self.start
+
+# 阶段计时钩子：未启用或不在样品处理中时返回共享的空上下文，开销仅为一次全局变量判断
+def stage(name):
+    if _current is None:
+        return _NULL
+    return _Stage(name)
+
+# 计数钩子（模型求值次数、迭代次数等）
+def count(name, n=1):
+    if _current is not None:
+        _current['counters'][name] = _current['counters'].get(name, 0) + int(n)
+
+# 单样品（或一组样品）的记录范围：yield 记录字典，未启用时为 None；传入 timings 时在已有记录上继续累计
+@contextmanager
+def sample(timings=None):
+    global _current
+    if _mode is None:
+        yield None
+        return
+    previous = _current
+    _current = timings if timings is not None else {'stages': {}, 'counters': {}}
+    start = time.perf_counter()
+    try:
+        yield _current
+    finally:
+        _current['stages']['total'] = _current['stages'].get('total', 0.0) + time.perf_counter() - start
+        _current = previous
+
+# 将一组样品共用的记录（如批量拟合）按 share 比例计入单样品记录
+def merge(timings, group, share=1.0):
+    if timings is None or group is None:
+        return
+    for key in ('stages', 'counters'):
+        for name, value in group[key].items():
+            timings[key][name] = timings[key].get(name, 0) + value * share
+
+# 执行一个处理任务；cProfile 模式下以 cProfile 记录并写入分段文件目录（见 configure）
+def run(func, *args):
+    if _mode != 'cprofile':
+        return func(*args)
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        return func(*args)
+    finally:
+        profile.disable()
+        os.makedirs(_profile_dir, exist_ok=True)
+        profile.dump_stats(os.path.join(_profile_dir, f'{os.getpid()}-{uuid.uuid4().hex}.prof'))
+
+# 合并各分段 cProfile 文件为一个文件（可用 python -m pstats 或 snakeviz 查看），返回路径；无分段文件时返回 None
+def collect_profiles(output_path=PROFILE_PATH, profile_dir=PROFILE_DIR):
+    parts = sorted(glob.glob(os.path.join(profile_dir, '*.prof')))
+    if not parts:
+        return None
+    stats = pstats.Stats(parts[0])
+    for part in parts[1:]:
+        stats.add(part)
+    stats.dump_stats(output_path)
+    for part in parts:
+        os.remove(part)
+    if not os.listdir(profile_dir):
+        os.rmdir(profile_dir)
+    return output_path
+
+
+# 数值序列的分位数统计
+def _describe(values):
+    values = np.asarray(values, dtype=float)
+    summary = {'count': int(values.size), 'total': float(values.sum()), 'mean': float(values.mean()),
+               'max': float(values.max())}
+    summary.update({f'p{q}': float(np.percentile(values, q)) for q in PERCENTILES})
+    return summary
+
+# 写入耗时报告：<prefix>.json 为各阶段/计数项的分位数统计及整批运行信息，<prefix>.csv 为逐样品记录
+# 仅统计本次实际处理的样品（增量运行复用的样品无记录）；run 为整批运行级信息（如工作簿写入耗时）
+def write_report(results, prefix=REPORT_PATH, run=None):
+    rows = [(result, result['timings']) for result in results if result.get('timings')]
+    stages = sorted({name for _, timings in rows for name in timings['stages']})
+    counters = sorted({name for _, timings in rows for name in timings['counters']})
+    report = {
+        'run': dict(run or {}, samples=len(rows)),
+        'stages': {name: _describe([t['stages'][name] for _, t in rows if name in t['stages']]) for name in stages},
+        'counters': {name: _describe([t['counters'][name] for _, t in rows if name in t['counters']]) for name in counters},
+    }
+    with open(prefix + '.json', 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    with open(prefix + '.csv', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['sample_name', 'status'] + stages + counters)
+        for result, timings in rows:
+            writer.writerow([result['sample_name'], result['status']]
+                            + [timings['stages'].get(name, '') for name in stages]
+                            + [timings['counters'].get(name, '') for name in counters])
+    return prefix + '.json', prefix + '.csv'
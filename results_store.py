@@ -0,0 +1,144 @@
+import io
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import numpy as np
+
+
+STORE_PATH = 'xrd_results.sqlite'  # 默认结果库路径
+
+
+# 计算文件内容哈希
+def file_hash(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+# 影响拟合结果与输出的选项（计算类型、平滑、输出拟合结果、裁切文件名、拟合区间与背景合并；启用误差估计时另含误差估计方式，
+# 设定时间预算时另含预算，降级策略与汇总表状态列随之变化）；未启用这两项时与此前的记录一致，已存结果仍可复用
+# 拟合图只在拟合时渲染，输出拟合结果时另含拟合图格式与分辨率，切换后重新处理以输出拟合图；
+# 拟合结果曲线由结果库中的曲线在写入工作簿时重新生成，其输出格式（工作表 / CSV / NPZ）不计入
+def options_key(options):
+    key = {k: options.get(k) for k in ('calc_type', 'smooth_y', 'peak_output', 'trim_filename', 'fit_roi', 'fit_binning')}
+    if options.get('peak_output') == "1":
+        key['plot_format'] = options.get('plot_format')
+        key['plot_dpi'] = options.get('plot_dpi')
+    if options.get('uncertainty'):
+        key['uncertainty'] = options['uncertainty']
+        if options['uncertainty'] == 'bootstrap':
+            key['bootstrap_samples'] = options.get('bootstrap_samples')
+    if options.get('time_budget'):
+        key['time_budget'] = options['time_budget']
+    return json.dumps(key, sort_keys=True)
+
+# 拟合结果记录表曲线打包为 npz 二进制
+def _pack_sheet(sheet):
+    if sheet is None:
+        return None, None
+    buf = io.BytesIO()
+    np.savez(buf, *[np.asarray(col, dtype=float) for col in sheet['data']])
+    return json.dumps({'title': sheet['title'], 'columns': sheet['columns']}), buf.getvalue()
+
+def _unpack_sheet(meta, blob):
+    if meta is None:
+        return None
+    sheet = json.loads(meta)
+    with np.load(io.BytesIO(blob)) as data:
+        sheet['data'] = [data[f'arr_{i}'] for i in range(len(data.files))]
+    return sheet
+
+
+# 样品结果库（SQLite）：按 文件路径 + 计算类型 保存文件哈希、模型版本、拟合参数 popt、
+# 汇总表指标及拟合结果记录表曲线；增量运行时仅重新拟合文件内容、计算选项或模型版本发生变化的样品
+# 仅由主进程访问（子进程只负责拟合），不存在并发写入
+class ResultsStore:
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS samples (
+                file_path TEXT NOT NULL,
+                calc_type TEXT NOT NULL,
+                size INTEGER,
+                mtime_ns INTEGER,
+                content_hash TEXT,
+                model_version TEXT,
+                options_key TEXT,
+                status TEXT,
+                message TEXT,
+                popt TEXT,
+                metrics TEXT,
+                summary TEXT,
+                sheet_meta TEXT,
+                sheet_data BLOB,
+                updated_at REAL,
+                PRIMARY KEY (file_path, calc_type)
+            )""")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # 文件内容哈希：大小与修改时间均未变化时沿用库中记录，避免重复读取整个文件
+    def content_hash(self, file_path, calc_type):
+        st = os.stat(file_path)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, content_hash FROM samples WHERE file_path = ? AND calc_type = ?",
+            (os.path.abspath(file_path), calc_type)).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        return file_hash(file_path)
+
+    # 查询可复用的结果：文件哈希、模型版本与计算选项均一致时返回结果，否则返回 None
+    def lookup(self, file_path, options, model_version, content_hash=None):
+        calc_type = options['calc_type']
+        content_hash = content_hash or self.content_hash(file_path, calc_type)
+        row = self.conn.execute(
+            "SELECT content_hash, model_version, options_key, status, message, popt, summary, sheet_meta, sheet_data "
+            "FROM samples WHERE file_path = ? AND calc_type = ?",
+            (os.path.abspath(file_path), calc_type)).fetchone()
+        if row is None or row[0] != content_hash or row[1] != model_version or row[2] != options_key(options):
+            return None
+        return {
+            'file_path': file_path,
+            'sample_name': os.path.splitext(os.path.basename(file_path))[0],
+            'status': row[3],
+            'message': row[4],
+            'popt': json.loads(row[5]) if row[5] is not None else None,
+            'summary': json.loads(row[6]) if row[6] is not None else None,
+            'sheet': _unpack_sheet(row[7], row[8]),
+        }
+
+    # 保存样品结果（失败、超出时间预算的结果不保存，下次运行重新处理）
+    def save(self, result, options, model_version, content_hash=None, columns=None):
+        if result['status'] in ('failed', 'timeout'):
+            return
+        file_path = result['file_path']
+        st = os.stat(file_path)
+        popt = result.get('popt')
+        summary = result['summary']
+        metrics = dict(zip(columns[1:], summary[1:])) if columns and summary else None
+        sheet_meta, sheet_data = _pack_sheet(result['sheet'])
+        self.conn.execute(
+            "INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (os.path.abspath(file_path), options['calc_type'], st.st_size, st.st_mtime_ns,
+             content_hash or file_hash(file_path), model_version, options_key(options),
+             result['status'], result['message'],
+             json.dumps(np.asarray(popt, dtype=float).tolist()) if popt is not None else None,
+             json.dumps(metrics, default=float) if metrics is not None else None,
+             json.dumps(summary, default=float) if summary is not None else None,
+             sheet_meta, sheet_data, time.time()))
+
+    # 同一计算类型、同一模型版本最近拟合成功的样品参数（热启动参数库预置），按保存时间由早到晚返回 [(样品名, popt), ...]
+    def fitted_params(self, calc_type, model_version, limit=256):
+        rows = self.conn.execute(
+            "SELECT file_path, popt FROM samples WHERE calc_type = ? AND model_version = ? AND status = 'ok' "
+            "AND popt IS NOT NULL ORDER BY updated_at DESC LIMIT ?", (calc_type, model_version, limit)).fetchall()
+        return [(os.path.splitext(os.path.basename(path))[0], json.loads(popt)) for path, popt in reversed(rows)]
+
+    def commit(self):
+        self.conn.commit()
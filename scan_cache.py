@@ -0,0 +1,113 @@
+import os
+import argparse
+import hashlib
+import numpy as np
+
+
+CACHE_DIR = '.xrd_cache'                # 默认缓存目录
+CACHE_MAX_BYTES = 512 * 1024 * 1024     # 默认缓存容量上限
+
+
+# 解析结果缓存：以 文件路径 + 文件大小 + 修改时间 + 读取器类型 为键，将读取器解码得到的
+# (scan_x, scan_y) 存为 .npz；重复运行或更换计算类型时直接加载，跳过 XML/二进制解码
+# 每个条目单独成文件（原子替换写入），可被进程池中的多个进程同时读写；
+# 命中时刷新条目修改时间，超出容量上限时按最近最少使用（LRU）顺序淘汰
+class ScanCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    # 缓存条目路径：文件名以读取器类型为前缀，便于按读取器失效
+    def entry_path(self, reader, file_path):
+        st = os.stat(file_path)
+        reader_name = type(reader).__name__
+        key = f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}|{reader_name}"
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{reader_name}-{digest}.npz")
+
+    # 读取数据：优先从缓存加载，未命中时调用读取器解码并写入缓存
+    def read(self, reader, file_path):
+        path = self.entry_path(reader, file_path)
+        try:
+            with np.load(path) as data:
+                scan_x, scan_y = data['scan_x'], data['scan_y']
+            os.utime(path)  # 刷新最近使用时间
+            return scan_x, scan_y
+        except (OSError, KeyError, ValueError):
+            pass
+        scan_x, scan_y = reader.read_data(file_path)
+        if scan_x is not None:
+            self.store(path, scan_x, scan_y)
+        return scan_x, scan_y
+
+    # 写入缓存条目（先写临时文件再原子替换，避免并发读取到不完整文件）
+    def store(self, path, scan_x, scan_y):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, scan_x=scan_x, scan_y=scan_y)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"缓存写入失败: {e}")
+            return
+        self.evict()
+
+    # 缓存条目清单 [(最近使用时间, 大小, 路径), ...]
+    def entries(self, reader_name=None):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.npz'):
+                continue
+            if reader_name is not None and not name.startswith(f"{reader_name}-"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    # 超出容量上限时按 LRU 顺序淘汰
+    def evict(self):
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    # 清空缓存（指定读取器类型时仅清除该读取器的条目，用于读取器偏移量等解码逻辑变更后失效）
+    def clear(self, reader_name=None):
+        removed = 0
+        for _, _, path in self.entries(reader_name):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+# 缓存管理命令：python scan_cache.py info | clear [--reader RigakuRawReader]
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="XRD 解析结果缓存管理")
+    parser.add_argument('command', choices=['info', 'clear'])
+    parser.add_argument('--dir', default=CACHE_DIR, help="缓存目录")
+    parser.add_argument('--reader', default=None, help="仅处理指定读取器类型的条目，如 XRDMLReader")
+    args = parser.parse_args()
+
+    cache = ScanCache(args.dir)
+    if args.command == 'info':
+        entries = cache.entries(args.reader)
+        total = sum(size for _, size, _ in entries)
+        print(f"{len(entries)} 个缓存条目，共 {total / 1024 / 1024:.1f} MB（{args.dir}）")
+    else:
+        print(f"已清除 {cache.clear(args.reader)} 个缓存条目")
@@ -0,0 +1,111 @@
+import os
+import time
+import sqlite3
+import argparse
+import data_reader as dr
+
+
+INDEX_PATH = 'xrd_index.sqlite'  # 默认元数据索引路径
+HEADER_FIELDS = ('start', 'end', 'step', 'points', 'scan_time', 'sample')
+
+
+# 扫描元数据索引（SQLite）：按文件路径保存读取器注册名与文件头元数据（2θ 起止位置、步长、点数、扫描时间、样品名，
+# 见 data_reader.scan_header），以 文件大小 + 修改时间 判断是否需要重新读取，在归档目录上逐次增量建立；
+# 计算类型选择、扫描范围过滤与样品清单只查询索引，强度数据只在实际拟合时解码
+# 无法识别或无法读取文件头的文件同样记录（读取器为空），文件未变化时不再重复读取
+# 仅由主进程访问，不存在并发写入
+class ScanIndex:
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS scans (
+                file_path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime_ns INTEGER,
+                reader TEXT,
+                start REAL,
+                end REAL,
+                step REAL,
+                points INTEGER,
+                scan_time TEXT,
+                sample TEXT,
+                indexed_at REAL
+            )""")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def commit(self):
+        self.conn.commit()
+
+    # 文件元数据：索引中大小与修改时间均未变化时直接返回，否则读取文件头并更新索引
+    # 返回 data_reader.scan_header 的字典（另含读取器注册名 'reader'），无法识别或读取时返回 None
+    # file_type 为 'auto' 时由文件头识别格式，否则按指定格式读取
+    def header(self, file_path, file_type='auto'):
+        path = os.path.abspath(file_path)
+        st = os.stat(file_path)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, reader, start, end, step, points, scan_time, sample FROM scans WHERE file_path = ?",
+            (path,)).fetchone()
+        if row is not None and row[:2] == (st.st_size, st.st_mtime_ns) and (file_type == 'auto' or row[2] == dr.get_reader(file_type).name):
+            return None if row[2] is None else dict(zip(HEADER_FIELDS, row[3:]), reader=row[2])
+        try:
+            reader = dr.reader_for(file_path, file_type)
+            header = reader.read_header(file_path)
+        except (OSError, ValueError):
+            reader, header = None, None
+        name = reader.name if header is not None else None
+        self.conn.execute(
+            "INSERT OR REPLACE INTO scans VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, st.st_size, st.st_mtime_ns, name) +
+            tuple(header[k] if header else None for k in HEADER_FIELDS) + (time.time(),))
+        return None if header is None else dict(header, reader=name)
+
+    # 批量更新：依次取得各文件元数据（新增或变化的文件读取文件头），返回与 file_list 对应的元数据列表
+    def headers(self, file_list, file_type='auto'):
+        headers = [self.header(file_path, file_type) for file_path in file_list]
+        self.commit()
+        return headers
+
+    # 移除已不存在的文件，返回移除数量
+    def prune(self):
+        missing = [(path,) for path, in self.conn.execute("SELECT file_path FROM scans") if not os.path.exists(path)]
+        self.conn.executemany("DELETE FROM scans WHERE file_path = ?", missing)
+        self.commit()
+        return len(missing)
+
+
+# 样品清单：python scan_index.py [文件/目录/通配符 ...] [--calc d002]
+# 增量更新索引后按文件列出格式、样品名、扫描范围、步长、点数与扫描时间（指定计算类型时只列出扫描范围匹配的文件）
+if __name__ == "__main__":
+    import main as cli
+    import pipeline
+
+    parser = argparse.ArgumentParser(description="XRD 扫描元数据索引与样品清单")
+    parser.add_argument('inputs', nargs='*', help="输入文件、目录或通配符（默认当前目录）")
+    parser.add_argument('--file-type', choices=['auto'] + list(dr.READERS), default='auto', help="文件类型")
+    parser.add_argument('--calc', choices=cli.CALC_TYPES, default=None, help="只列出扫描范围匹配该计算类型的文件")
+    parser.add_argument('--index', default=INDEX_PATH, help="索引路径")
+    parser.add_argument('--prune', action='store_true', help="移除索引中已不存在的文件")
+    args = parser.parse_args()
+
+    index = ScanIndex(args.index)
+    try:
+        if args.prune:
+            print(f"已移除 {index.prune()} 个不存在的文件")
+        file_list = pipeline.find_files(args.inputs, args.file_type)
+        listed = 0
+        for file_path, header in zip(file_list, index.headers(file_list, args.file_type)):
+            if header is None:
+                print(f"{file_path}\t无法读取文件头")
+                continue
+            if args.calc and not pipeline.range_covers(header['start'], header['end'], cli.CALC_TYPES[args.calc]):
+                continue
+            listed += 1
+            print(f"{file_path}\t{header['reader']}\t{header['sample'] or '-'}\t{header['start']:.3f}°-{header['end']:.3f}°\t"
+                  f"{header['step']:.5f}°\t{header['points']}\t{header['scan_time'] or '-'}")
+        print(f"共 {listed} 个文件（索引 {args.index}）")
+    finally:
+        index.close()
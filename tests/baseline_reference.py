@@ -0,0 +1,281 @@
+# 基线实现：原始版本 data_processor.py 的逐字副本（优化前的 Kα2 插值、逐峰模型、fsolve 半峰宽、梯形积分面积、
+# 逐窗口掩码质心、scipy.signal.convolve 反卷积与 curve_fit 数值差分拟合），仅供一致性测试比较，不随主模块修改
+
+import numpy as np
+
+from numpy.polynomial.chebyshev import Chebyshev
+from scipy.interpolate import interp1d
+from scipy.signal import convolve
+from scipy.signal import savgol_filter
+from scipy.optimize import curve_fit
+from scipy.optimize import fsolve
+
+"""基础处理工具定义"""
+# 迭代法Kα2校正
+def correct_ka2(two_theta, intensity, intensity_0=None, lambda_ka1=1.54056, lambda_ka2=1.54439, iterations=8):
+   
+    theta_rad = np.radians(two_theta / 2)
+    sin_theta_ka1 = np.sin(theta_rad)
+    sin_theta_ka2 = sin_theta_ka1 * (lambda_ka1 / lambda_ka2)
+    
+    valid = sin_theta_ka2 <= 1.0
+    theta_ka2_rad = np.arcsin(sin_theta_ka2, where=valid, out=np.zeros_like(sin_theta_ka2))
+    two_theta_ka2 = np.degrees(theta_ka2_rad) * 2
+    
+    if intensity_0 is not None:
+        corrected_intensity = intensity_0
+    else:
+        corrected_intensity = intensity.copy()
+        
+    for _ in range(iterations):
+        bg_fill = np.mean(corrected_intensity[:30])
+        ka1_interp = interp1d(two_theta, corrected_intensity, kind='linear', bounds_error=False, fill_value=bg_fill)
+        ka2_intensity = ka1_interp(two_theta_ka2) * 0.5
+        ka2_intensity *= valid
+        corrected_intensity = np.clip(intensity - ka2_intensity, 0, None)
+    
+    return two_theta, corrected_intensity
+
+# 回添Kα2强度
+def decorrect_ka2(two_theta, intensity, lambda_ka1=1.54056, lambda_ka2=1.54439):
+    theta_rad = np.radians(two_theta / 2)
+    sin_theta_ka1 = np.sin(theta_rad)
+    sin_theta_ka2 = sin_theta_ka1 * (lambda_ka1 / lambda_ka2)
+    
+    theta_ka2_rad = np.arcsin(sin_theta_ka2)
+    two_theta_ka2 = np.degrees(theta_ka2_rad) * 2
+    
+    ka2_intensity = np.interp(two_theta_ka2, two_theta, intensity) * 0.5
+    decorrected_intensity = intensity + ka2_intensity
+
+    return decorrected_intensity
+
+# 查找峰高数据
+def find_peak_tip(x: np.ndarray, y: np.ndarray, c: float, delt = 0.1):
+    mask = (x >= c - delt) & (x <= c + delt)
+    if not np.any(mask):
+        return float(np.max(y) - np.min(y))
+    return np.max(y[mask]) - np.min(y)
+
+"""数学模型定义"""
+# 定义 Gaussian 函数
+def gaussian(x: np.ndarray, amplitude: float, center: float, sigma: float) -> np.ndarray:
+    return amplitude * np.exp(-((x - center) / sigma)**2)
+
+# 定义 Lorentzian 函数
+def lorentzian(x: np.ndarray, amplitude: float, center: float, sigma: float) -> np.ndarray:
+    return amplitude / (1 + ((x - center) / sigma)**2)
+
+# 定义 Pseudo-Voigt 函数：高斯函数和洛伦兹函数的线性组合
+def pseudo_voigt(x: np.ndarray, amplitude: float, center: float, sigma: float, eta: float) -> np.ndarray:
+    return eta * lorentzian(x, amplitude, center, sigma) + (1 - eta) * gaussian(x, amplitude, center, sigma)
+
+# 定义 Split-Pearson VII 函数：两侧具有不同形状参数的 Pearson VII 函数
+def split_pearson_vii(x: np.ndarray, a: float, x0: float, w_L: float, w_R: float, m: float) -> np.ndarray:
+    return np.where(
+        x <= x0,
+        a / (1 + (4 * (x - x0)**2 / w_L**2) * (2**(1/m) - 1))**m,
+        a / (1 + (4 * (x - x0)**2 / w_R**2) * (2**(1/m) - 1))**m
+    )
+
+# 定义二阶切比雪夫多项式
+def chebyshev(x: np.ndarray, c0, c1, c2):
+    return Chebyshev([c0, c1, c2])(x)
+
+"""拟合函数定义"""
+# 定义单峰拟合函数（Split-Pearson VII 峰 + 二阶切比雪夫背景）
+def single_peak(x: np.ndarray, a1, x01, w_L1, w_R1, m1, c0, c1, c2):
+    return split_pearson_vii(x, a1, x01, w_L1, w_R1, m1) + chebyshev(x, c0, c1, c2)
+
+# 定义双峰拟合函数（2个Split-Pearson VII 峰 + 二阶切比雪夫背景）
+def double_peak(x, a1, x01, w_L1, w_R1, m1, a2, x02, w_L2, w_R2, m2, c0, c1, c2):
+    return (split_pearson_vii(x, a1, x01, w_L1, w_R1, m1) + split_pearson_vii(x, a2, x02, w_L2, w_R2, m2) + chebyshev(x, c0, c1, c2))
+
+# 定义双峰直接拟合函数（2个Split-Pearson VII 峰 + 二阶切比雪夫背景 + Kaplha2）
+def double_peak_raw(x, a1, x01, w_L1, w_R1, m1, a2, x02, w_L2, w_R2, m2, c0, c1, c2):
+    return decorrect_ka2(x, double_peak(x, a1, x01, w_L1, w_R1, m1, a2, x02, w_L2, w_R2, m2, c0, c1, c2))
+
+# 定义多峰拟合函数（5个Split-Pearson VII 峰 + 二阶切比雪夫背景）
+def oi_peak(x, a1, x01, w_L1, w_R1, m1, a2, x02, w_L2, w_R2, m2, a3, x03, w_L3, w_R3, m3, a4, x04, w_L4, w_R4, m4, a5, x05, w_L5, w_R5, m5, c0, c1, c2):
+    return (split_pearson_vii(x, a1, x01, w_L1, w_R1, m1) + split_pearson_vii(x, a2, x02, w_L2, w_R2, m2) + split_pearson_vii(x, a3, x03, w_L3, w_R3, m3) + split_pearson_vii(x, a4, x04, w_L4, w_R4, m4) + split_pearson_vii(x, a5, x05, w_L5, w_R5, m5) + chebyshev(x, c0, c1, c2))
+
+# 定义多峰直接拟合函数（5个Split-Pearson VII 峰 + 二阶切比雪夫背景）
+def oi_peak_raw(x, a1, x01, w_L1, w_R1, m1, a2, x02, w_L2, w_R2, m2, a3, x03, w_L3, w_R3, m3, a4, x04, w_L4, w_R4, m4, a5, x05, w_L5, w_R5, m5, c0, c1, c2):
+    return decorrect_ka2(x, oi_peak(x, a1, x01, w_L1, w_R1, m1, a2, x02, w_L2, w_R2, m2, a3, x03, w_L3, w_R3, m3, a4, x04, w_L4, w_R4, m4, a5, x05, w_L5, w_R5, m5, c0, c1, c2))
+
+"""计算函数定义"""
+# 计算 Split-Pearson VII 函数的半峰宽
+def calculate_fwhm_spv(w_L, w_R, m):
+    a = 1
+    x0 = 0
+    left_x = fsolve(lambda x: split_pearson_vii(x, a, x0, w_L, w_R, m) - (a / 2), x0 - abs(w_L))[0]
+    right_x = fsolve(lambda x: split_pearson_vii(x, a, x0, w_L, w_R, m) - (a / 2), x0 + abs(w_R))[0]
+    return right_x - left_x
+
+# 兼容 numpy 1.x (trapz) / 2.x (trapezoid) 的梯形积分
+def _trapz(y, x):
+    trapz_func = getattr(np, 'trapezoid', None) or np.trapz
+    return trapz_func(y, x)
+
+# 计算拟合峰曲线的质心（强度加权平均位置，2θ）
+# 参照 IUCr 重心法（Centroid Method）：在背景扣除后的净峰曲线上，
+# 以峰中心对称的角窗口内积分，避免全扫描范围非对称截断引入的系统性偏差。
+# 采用迭代收敛：以最大强度位置（或给定 center）为初始窗口中心计算质心，
+# 再将前次计算出的质心作为新的窗口中心重复积分，
+# 每次迭代同时重新计算窗口半宽（净峰降至峰高 1% 处两侧较大者 ×1.02），
+# 直至两次计算的角度变化 < tol（默认 0.001°）。
+def calculate_centroid(x: np.ndarray, peak_curve: np.ndarray,
+                       center: float = None, window: float = None,
+                       tol: float = 0.001, max_iter: int = 100,
+                       return_window: bool = False):
+    nan_result = (float('nan'), (float('nan'), float('nan')))
+    y = np.clip(peak_curve, 0, None)
+    if center is None:
+        center = float(x[int(np.argmax(y))])
+    peak_max = float(np.max(y)) if y.size else 0.0
+    if peak_max <= 0:
+        return nan_result if return_window else float('nan')
+
+    # 峰超过峰高 1% 的有效范围（用于每次迭代自动推导积分窗口半宽）
+    xs = x[y >= 0.01 * peak_max]
+    has_xs = xs.size > 0
+
+    # 迭代：将前次计算出的质心作为新的积分窗口中值，
+    # 且每次迭代重新计算窗口半宽（对称半宽取两侧较大者 ×1.02），直至角度变化小于 tol
+    centroid = center
+    cur_window = window
+    for _ in range(max_iter):
+        if window is None:
+            if not has_xs:
+                break
+            cur_window = max(centroid - xs.min(), xs.max() - centroid) * 1.02
+        if cur_window <= 0:
+            break
+        mask = (x >= centroid - cur_window) & (x <= centroid + cur_window)
+        yw, xw = y[mask], x[mask]
+        if yw.size < 2:
+            break
+        mass = _trapz(yw, xw)
+        if mass <= 0:
+            break
+        new_centroid = _trapz(xw * yw, xw) / mass
+        if not np.isfinite(new_centroid):
+            break
+        if abs(new_centroid - centroid) < tol:
+            centroid = new_centroid
+            break
+        centroid = new_centroid
+
+    if return_window:
+        if window is None:
+            if not has_xs:
+                return centroid, (float('nan'), float('nan'))
+            cur_window = max(centroid - xs.min(), xs.max() - centroid) * 1.02
+        if cur_window <= 0:
+            return centroid, (float('nan'), float('nan'))
+        return centroid, (centroid - cur_window, centroid + cur_window)
+    return centroid
+
+# 计算拟合峰曲线的面积
+def calculate_peak_area(x: np.ndarray, peak_curve: np.ndarray) -> float:
+    return _trapz(np.clip(peak_curve, 0, None), x)
+
+# 计算 Pseudo-Voigt 函数的半峰宽
+def calculate_fwhm_pv(sigma, eta):
+    fwhm_lorentz = 2 * sigma  # 洛伦兹成分的半峰宽
+    fwhm_gauss = 2 * sigma * np.sqrt(2 * np.log(2))  # 高斯成分的半峰宽
+    return eta * fwhm_lorentz + (1 - eta) * fwhm_gauss
+
+# 计算校正后半峰宽 参考 JIS R 7651:2007（固定参数，有错误）
+def calculate_fwhm_jis(g002_fwhm, si111_fwhm):
+    v = si111_fwhm / g002_fwhm
+    return g002_fwhm * (0.9981266 - 0.0681532 * v - 2.592769 * v**2 + 2.621163 * v**3 - 0.9584715 * v**4)
+
+# G[002]+Si[111] 双峰模型拟合数据
+def fit_data_d002(x, y):
+    p0 = [find_peak_tip(x, y, 26.5), 26.5, 0.1, 0.1, 1.5, find_peak_tip(x, y, 28.4), 28.4, 0.1, 0.1, 1.5, 0, 0, 0]
+    try:
+        popt, _ = curve_fit(double_peak, x, y, p0=p0)
+        return popt
+    except RuntimeError as e:
+        print(f"拟合失败: {e}")
+        return None
+    
+# G[002]+Si[111] 双峰模型拟合数据(直接拟合)
+def fit_data_d002_raw(x, y):
+    p0 = [find_peak_tip(x, y, 26.5), 26.5, 0.1, 0.1, 1.5, find_peak_tip(x, y, 28.4), 28.4, 0.1, 0.1, 1.5, 0, 0, 0]
+    try:
+        popt, _ = curve_fit(double_peak_raw, x, y, p0=p0)
+        return popt
+    except RuntimeError as e:
+        print(f"拟合失败: {e}")
+        return None
+
+# Si[111] 单峰模型拟合数据
+def fit_data_sifwhm(x, y):
+    p0 = [max(y)-min(y), 28.4, 0.3, 0.3, 0.6, 0, 0, 0]
+    y = savgol_filter(y, 25, 3)
+    try:
+        popt, _ = curve_fit(single_peak, x, y, p0=p0)
+        return popt
+    except RuntimeError as e:
+        print(f"拟合失败: {e}")
+        return None
+
+# OI值 多峰曲线拟合数据
+def fit_data_oi(x, y):
+    p0 = [find_peak_tip(x, y, 54.23), 54.23, 0.1, 0.1, 1.5, find_peak_tip(x, y, 56.12), 56.12, 0.1, 0.1, 1.5, find_peak_tip(x, y, 69.14), 69.14, 0.1, 0.1, 1.5, find_peak_tip(x, y, 76.38), 76.38, 0.1, 0.1, 1.5, find_peak_tip(x, y, 77.55), 77.55, 0.1, 0.1, 1.5, 0, 0, 0]
+    try:
+        popt, _ = curve_fit(oi_peak, x, y, p0=p0)
+        return popt
+    except RuntimeError as e:
+        print(f"拟合失败: {e}")
+        return None
+
+# OI值 多峰曲线拟合数据（直接拟合）
+def fit_data_oi_raw(x, y):
+    p0 = [find_peak_tip(x, y, 54.23), 54.23, 0.1, 0.1, 1.5, find_peak_tip(x, y, 56.12), 56.12, 0.1, 0.1, 1.5, find_peak_tip(x, y, 69.14), 69.14, 0.1, 0.1, 1.5, find_peak_tip(x, y, 76.38), 76.38, 0.1, 0.1, 1.5, find_peak_tip(x, y, 77.55), 77.55, 0.1, 0.1, 1.5, 0, 0, 0]
+    try:
+        popt, _ = curve_fit(oi_peak_raw, x, y, p0=p0)
+        return popt
+    except RuntimeError as e:
+        print(f"拟合失败: {e}")
+        return None
+    
+"""曲线计算函数"""
+# G[002]+Si[111] 双峰曲线计算
+def fit_peak_d002(x, popt):
+    fitted_curve = double_peak(x, *popt)
+    background = chebyshev(x, popt[10], popt[11] , popt[12])
+    graphite_peak = split_pearson_vii(x, popt[0], popt[1], popt[2], popt[3], popt[4])
+    silicon_peak = split_pearson_vii(x, popt[5], popt[6], popt[7], popt[8], popt[9])
+
+    # 反卷积计算净石墨半峰宽
+    graphite_peak_shift = split_pearson_vii(x, popt[5], popt[6], popt[2], popt[3], popt[4])
+    initial_guess = [1.0, 27.0, 0.1]
+    def convolution_model(x, amplitude, center, sigma):
+        gtaphite_net = lorentzian(x, amplitude, center, sigma)
+        return convolve(silicon_peak, gtaphite_net, mode='same')
+    params, _ = curve_fit(convolution_model, x, graphite_peak_shift, p0=initial_guess)
+    fwhm = 2 * abs(params[2])
+
+    return fitted_curve, background, graphite_peak, silicon_peak, fwhm
+
+# Si[111] 单峰曲线计算
+def fit_peak_sifwhm(x, popt):
+    fitted_curve = single_peak(x, *popt)
+    background = chebyshev(x, popt[5], popt[6] , popt[7])
+    silicon_peak = split_pearson_vii(x, popt[0], popt[1], popt[2], popt[3], popt[4])
+    return fitted_curve, background, silicon_peak
+
+# OI值 多峰曲线计算
+def fit_peak_oi(x, popt):
+    fitted_curve = oi_peak(x, *popt)
+    g004_peak = split_pearson_vii(x, popt[0], popt[1], popt[2], popt[3], popt[4])
+    si311_peak = split_pearson_vii(x, popt[5], popt[6], popt[7], popt[8], popt[9])
+    si400_peak = split_pearson_vii(x, popt[10], popt[11], popt[12], popt[13], popt[14])
+    si331_peak = split_pearson_vii(x, popt[15], popt[16], popt[17], popt[18], popt[19])
+    g110_peak = split_pearson_vii(x, popt[20], popt[21], popt[22], popt[23], popt[24])
+    background = chebyshev(x, popt[25], popt[26] , popt[27])
+
+    return fitted_curve, background, g004_peak, si311_peak, si400_peak, si331_peak, g110_peak
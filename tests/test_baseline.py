@@ -0,0 +1,257 @@
+import os
+import glob
+import numpy as np
+import pytest
+from scipy.optimize import brentq
+import data_reader as dr
+import data_processor as dp
+import batch_fitter as bf
+import pipeline
+import baseline_reference as ref
+from benchmark import SYNTHETIC, SAMPLE_DIR, STEP, synthetic_scan
+
+
+MODEL_RTOL = 1e-12    # 模型求值、Kα2 回添/校正与基线实现的最大偏差（相对曲线最大值）
+JAC_RTOL = 1e-5       # 解析雅可比矩阵与基线模型中心差分的最大偏差（相对各列最大值）
+FWHM_ATOL = 1e-12     # 解析半峰宽与基线 fsolve 半峰宽的最大偏差（°）
+HALF_MAX_ATOL = 1e-9  # 解析半峰宽两端的峰函数值与半高的最大偏差（m 很大时基线公式 2^(1/m) - 1 有舍入误差）
+AREA_RTOL = 1e-8      # 解析峰面积与细网格梯形积分的最大相对偏差
+AREA_GRID_RTOL = 1e-3 # 解析峰面积与实测步长梯形积分（基线 OI 值的计算方式）的最大相对偏差
+FIT_RTOL = 1e-4       # 解析雅可比 curve_fit 与基线数值差分 curve_fit 拟合参数的最大相对偏差
+BATCH_RTOL = 1e-3     # 批量 Levenberg–Marquardt 与基线 curve_fit 拟合参数的最大相对偏差
+CURVE_RTOL = 1e-5     # 拟合曲线的最大偏差（相对曲线最大值）
+SI_CURVE_RTOL = 1e-4  # 纳米硅拟合曲线的最大偏差（高斯极限下两种拟合停止处的 m 不同，相对曲线最大值）
+NET_RTOL = 1e-5       # FFT 反卷积与基线 scipy.signal.convolve 反卷积净半峰宽的最大相对偏差
+SUMMARY_RTOL = 1e-3   # 汇总表数值指标与基线计算流程的最大相对偏差（OI 值由网格梯形积分改为解析积分，约 1e-4）
+BINNING_RTOL = 1e-3   # 自适应合并网格拟合与全网格拟合汇总表数值指标的最大相对偏差
+
+# 各峰模型对应的基线模型函数、基线拟合函数、当前拟合函数与批量拟合函数
+MODELS = {
+    'D002': (ref.double_peak_raw, ref.fit_data_d002_raw, dp.fit_data_d002_raw, bf.fit_data_d002_raw_batch),
+    'OI': (ref.oi_peak_raw, ref.fit_data_oi_raw, dp.fit_data_oi_raw, bf.fit_data_oi_raw_batch),
+}
+
+
+def _real_scans(kind):
+    files = sorted(glob.glob(os.path.join(SAMPLE_DIR, kind, '*.xrdml')))
+    assert files
+    return [dr.XRDMLReader.read_data(path) for path in files]
+
+# 拟合参数的规范形式：Split-Pearson VII 峰形只取决于 |w_L|、|w_R|，两种拟合可能收敛到符号相反的半宽
+def _canonical(model, params):
+    params = np.array(params, dtype=float)
+    table = params[:5 * model.n_peaks].reshape(model.n_peaks, 5)
+    table[:, 2:4] = np.abs(table[:, 2:4])
+    return params
+
+# 拟合参数最大相对偏差（量级很小的背景系数以 1 为尺度）
+def _param_deviation(model, a, b):
+    a, b = _canonical(model, a), _canonical(model, b)
+    return float(np.max(np.abs(a - b) / np.maximum(np.abs(b), 1.0)))
+
+# 基线半峰宽：fsolve 在形状参数 m 很大（高斯极限，如纳米硅 Si[111] 拟合）或两侧半宽相差较大时不收敛、返回约 0，
+# 此时以 brentq 在基线峰函数上求两侧半高点作为参照
+def baseline_fwhm(w_L, w_R, m):
+    fwhm = ref.calculate_fwhm_spv(w_L, w_R, m)
+    left, right = -abs(w_L) * fwhm / (abs(w_L) + abs(w_R)), abs(w_R) * fwhm / (abs(w_L) + abs(w_R))
+    if fwhm > 0 and np.allclose(ref.split_pearson_vii(np.array([left, right]), 1, 0, w_L, w_R, m), 0.5, atol=1e-9):
+        return fwhm
+    half = lambda x: ref.split_pearson_vii(np.float64(x), 1, 0, w_L, w_R, m) - 0.5
+    return brentq(half, 0, 2 * abs(w_R), xtol=1e-15) - brentq(half, -2 * abs(w_L), 0, xtol=1e-15)
+
+# 汇总表中的数值指标（去掉样品名与积分范围等文本列）
+def _summary_values(row):
+    return np.array([v for v in row[1:] if isinstance(v, (int, float, np.floating))], dtype=float)
+
+# 基线计算流程（原始版本 main.py 的逐样品计算）得到的汇总表一行
+def baseline_summary(calc_type, sample_name, scan_x, scan_y):
+    if calc_type == "1":
+        popt = ref.fit_data_d002_raw(scan_x, scan_y)
+        _, _, graphite_peak, silicon_peak, fwhm_gn = ref.fit_peak_d002(scan_x, popt)
+        g_peak_pos, g_range = ref.calculate_centroid(scan_x, graphite_peak, center=popt[1], return_window=True)
+        si_peak_pos, si_range = ref.calculate_centroid(scan_x, silicon_peak, center=popt[6], return_window=True)
+        theta = np.radians((28.443 - si_peak_pos + g_peak_pos) / 2)
+        d_002 = 1.54056 / (2 * np.sin(theta))
+        fwhm_g = baseline_fwhm(popt[2], popt[3], popt[4])
+        fwhm_si = baseline_fwhm(popt[7], popt[8], popt[9])
+        fwhm_jis = ref.calculate_fwhm_jis(fwhm_g, fwhm_si)
+        return [sample_name, d_002, 100 * (3.440 - d_002) / (3.440 - 3.354), g_peak_pos, g_range, fwhm_g,
+                si_peak_pos, si_range, fwhm_si, fwhm_gn, 0.89 * 1.54056 / (np.radians(fwhm_gn) * np.cos(theta)),
+                fwhm_jis, 0.89 * 1.54056 / (np.radians(fwhm_jis) * np.cos(theta))]
+    if calc_type == "2":
+        corrected_x, corrected_y = ref.correct_ka2(scan_x, scan_y)
+        popt = ref.fit_data_sifwhm(corrected_x, corrected_y)
+        silicon_peak = ref.split_pearson_vii(corrected_x, *popt[0:5])
+        return [sample_name, ref.calculate_centroid(corrected_x, silicon_peak, center=popt[1]),
+                baseline_fwhm(popt[2], popt[3], popt[4])]
+    popt = ref.fit_data_oi_raw(scan_x, scan_y)
+    g004_peak = ref.split_pearson_vii(scan_x, *popt[0:5])
+    g110_peak = ref.split_pearson_vii(scan_x, *popt[20:25])
+    si311_peak = ref.split_pearson_vii(scan_x, *popt[5:10])
+    g004_pos, g004_range = ref.calculate_centroid(scan_x, g004_peak, center=popt[1], return_window=True)
+    g110_pos, g110_range = ref.calculate_centroid(scan_x, g110_peak, center=popt[21], return_window=True)
+    si311_pos = ref.calculate_centroid(scan_x, si311_peak, center=popt[6])
+    d_004x2 = 2 * (1.54056 / (2 * np.sin(np.radians((56.12 - si311_pos + g004_pos) / 2))))
+    return [sample_name, ref.calculate_peak_area(scan_x, g004_peak) / ref.calculate_peak_area(scan_x, g110_peak),
+            d_004x2, 100 * (3.440 - d_004x2) / (3.440 - 3.354), g004_pos, g004_range, popt[0],
+            baseline_fwhm(popt[2], popt[3], popt[4]), g110_pos, g110_range, popt[20],
+            baseline_fwhm(popt[22], popt[23], popt[24])]
+
+
+"""模型求值与 Kα2"""
+# PeakModel（峰表广播 + 稀疏 Kα2 算子）与基线逐峰模型函数一致，批量求值与逐个求值一致
+@pytest.mark.parametrize('kind', sorted(SYNTHETIC))
+def test_model_matches_baseline(kind):
+    (_, _), model, params = SYNTHETIC[kind]
+    baseline = MODELS[kind][0]
+    for scale in (1, 10):
+        x, _ = synthetic_scan(kind, scale)
+        expected = baseline(x, *params)
+        atol = MODEL_RTOL * np.max(np.abs(expected))
+        np.testing.assert_allclose(model(x, *params), expected, rtol=0, atol=atol)
+        np.testing.assert_allclose(model.batch(x, [params, params]), [expected, expected], rtol=0, atol=atol)
+
+# 单峰模型（不含 Kα2）与基线 single_peak 一致
+def test_single_peak_matches_baseline():
+    x, _ = synthetic_scan('D002')
+    params = SYNTHETIC['D002'][2][5:10] + [10.0, -0.5, 0.01]
+    expected = ref.single_peak(x, *params)
+    np.testing.assert_allclose(dp.single_peak(x, *params), expected, rtol=0, atol=MODEL_RTOL * np.max(np.abs(expected)))
+
+# Kα2 位移算子：回添与迭代校正（含网格外填充背景值）与基线插值实现一致
+@pytest.mark.parametrize('kind', sorted(SYNTHETIC))
+def test_ka2_matches_baseline(kind):
+    x, y = synthetic_scan(kind)
+    atol = MODEL_RTOL * np.max(y)
+    np.testing.assert_allclose(dp.decorrect_ka2(x, y), ref.decorrect_ka2(x, y), rtol=0, atol=atol)
+    np.testing.assert_allclose(dp.correct_ka2(x, y)[1], ref.correct_ka2(x, y)[1], rtol=0, atol=atol)
+    seed = np.clip(y - 0.3 * y.mean(), 0, None)
+    np.testing.assert_allclose(dp.correct_ka2(x, y, seed)[1], ref.correct_ka2(x, y, seed)[1], rtol=0, atol=atol)
+
+# 解析雅可比矩阵（逐个与批量）与基线模型函数的中心差分一致
+@pytest.mark.parametrize('kind', sorted(SYNTHETIC))
+def test_jacobian_matches_finite_difference(kind):
+    (_, _), model, params = SYNTHETIC[kind]
+    baseline = MODELS[kind][0]
+    x, _ = synthetic_scan(kind)
+    params = np.array(params, dtype=float)
+    numeric = np.empty((x.size, params.size))
+    for i in range(params.size):
+        h = 1e-6 * max(1.0, abs(params[i]))
+        step = np.zeros(params.size)
+        step[i] = h
+        numeric[:, i] = (baseline(x, *(params + step)) - baseline(x, *(params - step))) / (2 * h)
+    jac = model.jac(x, *params)
+    scale = np.max(np.abs(numeric), axis=0)
+    assert np.max(np.abs(jac - numeric) / scale) < JAC_RTOL
+    np.testing.assert_allclose(model.batch_jac(x, [params, params]), [jac, jac], rtol=0, atol=1e-12 * scale.max())
+
+
+"""半峰宽与峰面积"""
+# 解析半峰宽 (|w_L| + |w_R|) / 2 与基线 fsolve 数值求解一致（典型峰参数，fsolve 收敛）
+@pytest.mark.parametrize('kind', sorted(SYNTHETIC))
+def test_fwhm_matches_baseline(kind):
+    table, _ = SYNTHETIC[kind][1].split(SYNTHETIC[kind][2])
+    expected = [ref.calculate_fwhm_spv(*row[2:]) for row in table]
+    np.testing.assert_allclose(dp.split_pearson_vii_fwhm(table), expected, rtol=0, atol=FWHM_ATOL)
+    np.testing.assert_allclose(dp.calculate_fwhm_spv(table[:, 2], table[:, 3], table[:, 4]), expected, rtol=0, atol=FWHM_ATOL)
+
+# 解析半峰宽两端恰为半高点（含 fsolve 不收敛的高斯极限与两侧半宽相差较大的峰形）
+@pytest.mark.parametrize('m', [0.6, 1.0, 1.5, 3.0, 20.0, 1e4])
+@pytest.mark.parametrize('w_L, w_R', [(0.1, 0.1), (0.2344, 0.1119), (-0.1824, 0.3473), (0.05, 0.4)])
+def test_fwhm_half_maximum(w_L, w_R, m):
+    fwhm = dp.calculate_fwhm_spv(w_L, w_R, m)
+    assert fwhm == pytest.approx(baseline_fwhm(w_L, w_R, m), abs=HALF_MAX_ATOL)
+    edges = np.array([-abs(w_L) / 2, abs(w_R) / 2])
+    np.testing.assert_allclose(ref.split_pearson_vii(edges, 1.0, 0.0, w_L, w_R, m), 0.5, rtol=0, atol=HALF_MAX_ATOL)
+# 解析峰面积与细网格梯形积分一致；与实测步长梯形积分（基线 calculate_peak_area）的差异在网格离散误差以内
+@pytest.mark.parametrize('kind', sorted(SYNTHETIC))
+def test_area_matches_trapezoid(kind):
+    (lo, hi), model, params = SYNTHETIC[kind]
+    table, _ = model.split(params)
+    fine = np.linspace(lo, hi, 200001)
+    coarse = np.arange(lo, hi, STEP)
+    expected = [ref.calculate_peak_area(fine, ref.split_pearson_vii(fine, *row)) for row in table]
+    np.testing.assert_allclose(dp.split_pearson_vii_area(table, lo, hi), expected, rtol=AREA_RTOL)
+    for row in table:
+        grid = ref.calculate_peak_area(coarse, ref.split_pearson_vii(coarse, *row))
+        assert dp.calculate_peak_area(coarse, params=row) == pytest.approx(grid, rel=AREA_GRID_RTOL)
+        assert dp.calculate_peak_area(coarse, dp.split_pearson_vii(coarse, *row)) == pytest.approx(grid, rel=1e-12)
+
+
+"""拟合"""
+# 解析雅可比 curve_fit 与基线数值差分 curve_fit：实测样品拟合参数与拟合曲线一致
+@pytest.mark.parametrize('kind', sorted(MODELS))
+def test_fit_matches_baseline(kind):
+    model = SYNTHETIC[kind][1]
+    baseline, baseline_fit, fit, _ = MODELS[kind]
+    for x, y in _real_scans(kind):
+        popt, expected = fit(x, y), baseline_fit(x, y)
+        assert _param_deviation(model, popt, expected) < FIT_RTOL
+        curve = baseline(x, *expected)
+        np.testing.assert_allclose(model(x, *popt), curve, rtol=0, atol=CURVE_RTOL * np.max(np.abs(curve)))
+
+# Si[111] 单峰拟合（Kα2 校正、拟合前平滑）与基线一致；实测样品的形状参数 m 趋于无穷（高斯极限），
+# 峰形对 m 不再敏感，两种拟合停止处的 m 不同，只比较其余参数与拟合曲线
+def test_fit_sifwhm_matches_baseline():
+    for x, y in _real_scans('D002'):
+        corrected_x, corrected_y = dp.correct_ka2(x, y)
+        popt = dp.fit_data_sifwhm(corrected_x, corrected_y)
+        expected = ref.fit_data_sifwhm(*ref.correct_ka2(x, y))
+        shape = [i for i in range(dp.SI111_MODEL.n_params) if i != 4]
+        assert _param_deviation(dp.SI111_MODEL, popt[shape], expected[shape]) < FIT_RTOL
+        curve = ref.single_peak(corrected_x, *expected)
+        np.testing.assert_allclose(dp.single_peak(corrected_x, *popt), curve, rtol=0, atol=SI_CURVE_RTOL * np.max(np.abs(curve)))
+
+# 批量 Levenberg–Marquardt（不退回逐个拟合）与基线 curve_fit 一致
+@pytest.mark.parametrize('kind', sorted(MODELS))
+def test_batch_fit_matches_baseline(kind):
+    model = SYNTHETIC[kind][1]
+    _, baseline_fit, _, _ = MODELS[kind]
+    scans = _real_scans(kind)
+    (x, index), = bf.group_by_grid(scans)
+    Y = [scans[i][1] for i in index]
+    P0 = [model.initial_guess(x, y) for y in Y]
+    popt, status = bf.fit_batch(model, x, Y, P0, fallback=False)
+    assert status == ['converged'] * len(Y)
+    for p, y in zip(popt, Y):
+        assert _param_deviation(model, p, baseline_fit(x, y)) < BATCH_RTOL
+
+
+"""反卷积"""
+# FFT 卷积模型与 scipy.signal.convolve(mode='same') 一致，净半峰宽与基线反卷积一致
+def test_deconvolution_matches_baseline():
+    from scipy.signal import convolve
+    for x, y in _real_scans('D002'):
+        popt = ref.fit_data_d002_raw(x, y)
+        silicon_peak = ref.split_pearson_vii(x, *popt[5:10])
+        lorentzian = ref.lorentzian(x, 1.0, 27.0, 0.1)
+        expected = convolve(silicon_peak, lorentzian, mode='same')
+        np.testing.assert_allclose(dp.LorentzianConvolution(x, silicon_peak)(x, 1.0, 27.0, 0.1), expected,
+                                   rtol=0, atol=1e-9 * np.max(expected))
+        assert dp.fit_peak_d002(x, popt)[4] == pytest.approx(ref.fit_peak_d002(x, popt)[4], rel=NET_RTOL)
+
+
+"""端到端"""
+# 实测样品汇总表（逐个拟合与批量拟合）与基线计算流程的数值指标一致
+@pytest.mark.parametrize('batch_fit', [False, True], ids=['serial', 'batch_fit'])
+@pytest.mark.parametrize('calc_type, kind', [("1", 'D002'), ("2", 'D002'), ("3", 'OI')])
+def test_summary_matches_baseline(calc_type, kind, batch_fit):
+    files = sorted(glob.glob(os.path.join(SAMPLE_DIR, kind, '*.xrdml')))
+    options = pipeline.make_options(file_type='xrdml', calc_type=calc_type, batch_fit=batch_fit)
+    for result, file_path in zip(pipeline.process_batch(files, options, workers=1), files):
+        scan_x, scan_y = dr.XRDMLReader.read_data(file_path)
+        expected = baseline_summary(calc_type, result['sample_name'], scan_x, scan_y)
+        np.testing.assert_allclose(_summary_values(result['summary']), _summary_values(expected),
+                                   rtol=SUMMARY_RTOL, err_msg=result['sample_name'])
+
+# 自适应合并网格（--fit-grid adaptive）拟合与全网格拟合的汇总表数值指标一致
+@pytest.mark.parametrize('calc_type, kind', [("1", 'D002'), ("2", 'D002'), ("3", 'OI')])
+def test_binning_matches_full_grid(calc_type, kind):
+    files = sorted(glob.glob(os.path.join(SAMPLE_DIR, kind, '*.xrdml')))
+    options = pipeline.make_options(file_type='xrdml', calc_type=calc_type)
+    full = pipeline.process_batch(files, options, workers=1)
+    binned = pipeline.process_batch(files, dict(options, fit_binning=True), workers=1)
+    for a, b in zip(full, binned):
+        np.testing.assert_allclose(_summary_values(b['summary']), _summary_values(a['summary']),
+                                   rtol=BINNING_RTOL, err_msg=a['sample_name'])
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+import data_processor as dp
+import baseline_reference as ref
+from benchmark import SYNTHETIC, STEP
+
+
+CENTROID_ATOL = 1e-9  # 质心及积分范围与基线逐窗口掩码实现的最大偏差（°）
+
+
+# 质心一致性：合成扫描各峰（典型峰参数）在实测步长及粗网格（网格起点随机偏移，峰位不落在网格点上）、
+# 自动推导与固定窗口半宽下，calculate_centroids（前缀积分）与基线 calculate_centroid 比较
+@pytest.mark.parametrize('window', [None, 0.3, 1.0])
+@pytest.mark.parametrize('step', [STEP, 0.05, 0.1, 0.2])
+@pytest.mark.parametrize('kind', sorted(SYNTHETIC))
+def test_centroids_match_baseline(kind, step, window):
+    (lo, hi), model, params = SYNTHETIC[kind]
+    table, _ = model.split(params)
+    x = np.arange(lo + np.random.default_rng(0).uniform(0, step), hi, step)
+    curves = dp.split_pearson_vii_table(x, table)
+    results = dp.calculate_centroids(x, curves, table[:, 1], window)
+    for (centroid, bounds), curve, x0 in zip(results, curves, table[:, 1]):
+        ref_centroid, ref_bounds = ref.calculate_centroid(x, curve, center=x0, window=window, return_window=True)
+        np.testing.assert_allclose((centroid, *bounds), (ref_centroid, *ref_bounds), rtol=0, atol=CENTROID_ATOL)
+
+# 单峰入口 calculate_centroid 与基线一致（含不返回积分范围的调用方式）
+def test_calculate_centroid_matches_baseline():
+    (lo, hi), model, params = SYNTHETIC['D002']
+    x = np.arange(lo, hi, STEP)
+    for curve, x0 in zip(model.peaks(x, params), model.split(params)[0][:, 1]):
+        assert dp.calculate_centroid(x, curve, center=x0) == pytest.approx(ref.calculate_centroid(x, curve, center=x0), abs=CENTROID_ATOL)
+        assert dp.calculate_centroid(x, curve) == pytest.approx(ref.calculate_centroid(x, curve), abs=CENTROID_ATOL)
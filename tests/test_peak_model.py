@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import data_processor as dp
+from benchmark import SYNTHETIC, synthetic_scan
+from test_baseline import _real_scans
+
+
+SUPPORT_FIT_TOL = 1e-4  # 设定 support 与全网格拟合的峰位（°）及半峰宽相对偏差上限
+
+
+# 与 model 相同但设定 support 的峰模型
+def _with_support(model, support):
+    return dp.PeakModel(model.names, model.centers, model.n_background - 1, model.ka2, support)
+
+# 各峰在计算范围边界处的峰值（截断峰尾的上限）
+def _tail_bound(table, support):
+    a, _, _, _, m = table.T
+    return np.abs(a) / (1 + 4 * support**2 * (2**(1 / m) - 1))**m
+
+# 设定 support 时各净峰与全网格计算之差不超过范围边界处的峰值，范围内完全一致
+@pytest.mark.parametrize('support', [5, 20, 50])
+@pytest.mark.parametrize('kind', sorted(SYNTHETIC))
+def test_support_peaks_match_full_grid(kind, support):
+    (_, _), model, params = SYNTHETIC[kind]
+    x, _ = synthetic_scan(kind)
+    table, _ = model.split(params)
+    full = model.peaks(x, params)
+    windowed = _with_support(model, support).peaks(x, params)
+    assert np.all(np.abs(windowed - full) <= _tail_bound(table, support)[:, None] * (1 + 1e-12))
+    np.testing.assert_array_equal(windowed[windowed != 0], full[windowed != 0])
+
+# 设定 support 时雅可比矩阵在各峰计算范围内与全网格一致，范围外为 0（背景列不受影响）
+@pytest.mark.parametrize('kind', sorted(SYNTHETIC))
+def test_support_jacobian_matches_full_grid(kind):
+    (_, _), model, params = SYNTHETIC[kind]
+    x, _ = synthetic_scan(kind)
+    table, _ = model.split(params)
+    plain = dp.PeakModel(model.names, model.centers)
+    windowed = _with_support(plain, 20)
+    full, jac = plain.jac(x, *params), windowed.jac(x, *params)
+    half = 20 * np.maximum(np.abs(table[:, 2]), np.abs(table[:, 3]))
+    for i, (x0, h) in enumerate(zip(table[:, 1], half)):
+        inside = (x >= x0 - h) & (x <= x0 + h)
+        np.testing.assert_array_equal(jac[inside, 5 * i:5 * i + 5], full[inside, 5 * i:5 * i + 5])
+        assert not jac[~inside, 5 * i:5 * i + 5].any()
+    np.testing.assert_array_equal(jac[:, 5 * plain.n_peaks:], full[:, 5 * plain.n_peaks:])
+
+# 实测 D002 样品以 support = 50 拟合：峰位与半峰宽与全网格拟合一致
+def test_support_fit_matches_full_grid():
+    model = dp.D002_RAW_MODEL
+    windowed = _with_support(model, 50)
+    for x, y in _real_scans('D002'):
+        p0 = model.initial_guess(x, y)
+        full, _ = model.split(dp.fit_model(model, x, y, p0))
+        table, _ = model.split(dp.fit_model(windowed, x, y, p0))
+        np.testing.assert_allclose(table[:, 1], full[:, 1], rtol=0, atol=SUPPORT_FIT_TOL)
+        np.testing.assert_allclose(dp.split_pearson_vii_fwhm(table), dp.split_pearson_vii_fwhm(full), rtol=SUPPORT_FIT_TOL)
@@ -0,0 +1,31 @@
+import os
+import glob
+import numpy as np
+import pytest
+import pipeline
+from benchmark import SAMPLE_DIR
+
+
+WARM_START_RTOL = 1e-3  # 热启动与经验初值拟合的汇总表数值指标最大相对偏差
+
+
+# 汇总表中的数值指标（去掉样品名与积分范围等文本列）
+def _summary_values(result):
+    return np.array([v for v in result['summary'][1:] if isinstance(v, (int, float))], dtype=float)
+
+# 热启动一致性：实测样品先以经验初值拟合，再开启热启动（以经验初值拟合结果预置参数库，运行中逐个加入）重新拟合，
+# 逐个拟合与批量拟合分别比较汇总表数值指标
+@pytest.mark.parametrize('batch_fit', [False, True], ids=['serial', 'batch_fit'])
+@pytest.mark.parametrize('calc_type, kind', [("1", 'D002'), ("2", 'D002'), ("3", 'OI')])
+def test_warm_start_matches_cold_fit(calc_type, kind, batch_fit):
+    files = sorted(glob.glob(os.path.join(SAMPLE_DIR, kind, '*.xrdml')))
+    assert files
+    options = pipeline.make_options(file_type='xrdml', calc_type=calc_type, cache_dir=None, batch_fit=batch_fit)
+    cold = pipeline.process_batch(files, options, workers=1)
+    seeds = [(result['sample_name'], result['popt']) for result in cold if result['popt'] is not None]
+    warm = pipeline.process_batch(files, dict(options, warm_start=True), workers=1, seeds=seeds)
+    for a, b in zip(cold, warm):
+        assert (a['summary'] is None) == (b['summary'] is None), a['sample_name']
+        if a['summary'] is not None:
+            np.testing.assert_allclose(_summary_values(b), _summary_values(a), rtol=WARM_START_RTOL, atol=0,
+                                       err_msg=a['sample_name'])
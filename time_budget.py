@@ -0,0 +1,36 @@
+import time
+
+from contextlib import contextmanager
+
+
+# 当前进程正在处理的样品（或一次拟合尝试）的截止时间（time.perf_counter 秒），未设定时为 None
+_deadline = None
+
+
+# 超出时间预算：由检查点 check 抛出，协作式取消正在进行的拟合或指标计算
+class BudgetExceeded(Exception):
+    pass
+
+
+# 检查点（模型函数、雅可比矩阵、反卷积模型每次求值时调用）：超过截止时间时抛出 BudgetExceeded
+# 未设定时间预算时开销仅为一次全局变量判断，可常驻于拟合代码中
+def check():
+    if _deadline is not None and time.perf_counter() > _deadline:
+        raise BudgetExceeded("超出时间预算")
+
+# 距截止时间的剩余秒数，未设定时间预算时为 None
+def remaining():
+    return None if _deadline is None else _deadline - time.perf_counter()
+
+# 时间预算范围：seconds 秒后截止，嵌套时取内外层中较早的截止时间，退出时恢复外层截止时间；seconds 为 None 时不改变截止时间
+@contextmanager
+def limit(seconds):
+    global _deadline
+    previous = _deadline
+    if seconds is not None:
+        deadline = time.perf_counter() + seconds
+        _deadline = deadline if previous is None else min(previous, deadline)
+    try:
+        yield
+    finally:
+        _deadline = previous
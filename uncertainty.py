@@ -0,0 +1,79 @@
+import numpy as np
+import batch_fitter as bf
+
+
+BOOTSTRAP_SAMPLES = 100  # 默认残差自助法重采样次数
+BOOTSTRAP_SEED = 0       # 重采样随机数种子（固定种子，同一数据重复运行结果一致）
+
+
+# 最优参数处的线性化：加权雅可比矩阵 J 的伪逆 J⁺（SVD，与 curve_fit 一样舍去奇异值过小的方向）、
+# 加权残差与各点权重 1/sigma，返回 (J⁺ (P, n), 加权残差 (n,), 权重 (n,))
+# 各列先按列范数归一化再分解（J⁺ = D⁻¹·(J·D⁻¹)⁺），参数量级相差悬殊时（如高斯极限下 m ~ 1e5 的形状参数，列范数小十几个数量级）
+# 近奇异方向不会因舍入混入其他参数，峰位、半宽等的方差不受其影响
+def _linearize(model, x, y, popt, sigma=None):
+    weight = np.ones(np.size(x)) if sigma is None else 1 / np.asarray(sigma, dtype=float)
+    J = model.jac(x, *popt) * weight[:, None]
+    r = (np.asarray(y, dtype=float) - model(x, *popt)) * weight
+    norm = np.linalg.norm(J, axis=0)
+    norm[norm == 0] = 1
+    U, s, VT = np.linalg.svd(J / norm, full_matrices=False)
+    keep = s > np.finfo(float).eps * max(J.shape) * s[0]
+    return (VT[keep].T / s[keep]) @ U[:, keep].T / norm[:, None], r, weight
+
+# 拟合参数协方差矩阵（与 curve_fit 默认 absolute_sigma=False 相同）：cov = (JᵀWJ)⁻¹ · χ²/(n − P) = J⁺J⁺ᵀ · χ²/(n − P)，W = 1/sigma²
+# y 为拟合目标数据（与拟合时相同）；单样品拟合、批量拟合与热启动拟合的参数均可由此得到协方差，无需保留各拟合路径的 pcov
+def parameter_covariance(model, x, y, popt, sigma=None):
+    pinv, r, _ = _linearize(model, x, y, popt, sigma)
+    return pinv @ pinv.T * (r @ r / max(np.size(x) - len(popt), 1))
+
+# 线性化误差传递：沿协方差矩阵平方根（相关系数矩阵特征分解 cov = D·V·w·Vᵀ·D = L·Lᵀ，D 为各参数标准差，
+# 先归一化避免极大方差的方向淹没其他方向的精度）各列方向取 p ± l_j 共 2P 组参数，由 metrics 一次批量计算，
+# 各指标方差 = Σ_j ((f(p + l_j) − f(p − l_j)) / 2)²；指标为参数的线性函数时与 J_f·cov·J_fᵀ 完全一致
+# 以 1σ 而非极小步长差分，质心迭代容差等引起的微小不连续不影响结果
+# 无法确定的参数方向（如高斯极限下的形状参数 m，方差极大）±1σ 可能越出模型定义域，该侧指标非有限时改用另一侧的单侧差分 f(p ± l_j) − f(p)（越界求值的溢出警告不输出）
+# params 为指标实际依赖的参数下标（如各峰参数，背景系数不影响指标），只在其边缘协方差上扰动，减少指标计算组数
+# metrics 为 (K, P) → (K, M) 的函数，返回各指标标准不确定度 (M,)
+def linearized(metrics, popt, cov, params=None):
+    popt = np.asarray(popt, dtype=float)
+    params = np.arange(len(popt)) if params is None else np.asarray(params)
+    sd = np.sqrt(np.clip(np.diag(cov)[params], 0, None))
+    scale = np.where(sd > 0, sd, 1)
+    w, V = np.linalg.eigh(cov[np.ix_(params, params)] / np.outer(scale, scale))
+    L = np.zeros((np.count_nonzero(w > 0), len(popt)))
+    L[:, params] = (scale[:, None] * V * np.sqrt(np.clip(w, 0, None)))[:, w > 0].T
+    with np.errstate(over='ignore', invalid='ignore'):
+        values = metrics(np.concatenate([popt[None], popt + L, popt - L]))
+    center, plus, minus = values[0], values[1:len(L) + 1], values[len(L) + 1:]
+    delta = np.where(np.isfinite(plus) & np.isfinite(minus), (plus - minus) / 2,
+                     np.where(np.isfinite(plus), plus - center, minus - center))
+    return np.sqrt(np.sum(delta**2, axis=0))
+
+# 残差自助法重采样参数：最优拟合曲线 + 有放回重采样的加权残差（去均值）构成 n 组模拟谱，
+# 以同一模型批量拟合（batch_fitter.fit_batch，未收敛的重采样直接舍去，不退回逐个拟合）
+# 各组初值为最优参数加一步 Gauss–Newton 修正 J⁺·(y* − f(p))（全部重采样一次矩阵乘法），批量拟合通常一两次迭代即收敛
+# y 为变换前的拟合数据，transform 为拟合前对数据的变换（如 Si_FWHM 的平滑，作用于 (n, len(x))），与原拟合一致
+# 返回收敛的各组参数 (B, P)
+def bootstrap_params(model, x, y, popt, sigma=None, n=BOOTSTRAP_SAMPLES, transform=None, seed=BOOTSTRAP_SEED):
+    popt = np.asarray(popt, dtype=float)
+    scale = np.ones(np.size(x)) if sigma is None else np.asarray(sigma, dtype=float)
+    fitted = model(x, *popt)
+    residual = (np.asarray(y, dtype=float) - fitted) / scale
+    residual -= residual.mean()
+    rng = np.random.default_rng(seed)
+    Y = fitted + residual[rng.integers(0, residual.size, size=(n, residual.size))] * scale
+    if transform is not None:
+        Y = transform(Y)
+    pinv, _, weight = _linearize(model, x, fitted, popt, sigma)
+    P0 = popt + ((Y - fitted) * weight) @ pinv.T
+    results, _ = bf.fit_batch(model, x, Y, P0, sigma, fallback=False)
+    return np.array([p for p in results if p is not None]).reshape(-1, len(popt))
+
+# 残差自助法误差估计：各重采样参数的指标标准差（ddof=1），有效重采样少于 2 组时为 nan；
+# metrics 同 linearized，返回各指标标准不确定度 (M,)
+def bootstrap(metrics, model, x, y, popt, sigma=None, n=BOOTSTRAP_SAMPLES, transform=None, seed=BOOTSTRAP_SEED):
+    P = bootstrap_params(model, x, y, popt, sigma, n, transform, seed)
+    values = metrics(P) if len(P) else np.empty((0, 0))
+    values = values[np.all(np.isfinite(values), axis=1)] if values.size else values
+    if len(values) < 2:
+        return np.full(np.shape(metrics(np.atleast_2d(popt)))[1], np.nan)
+    return np.std(values, axis=0, ddof=1)
@@ -0,0 +1,102 @@
+import re
+import numpy as np
+
+
+MAX_ENTRIES = 256   # 参数库容量（超出时淘汰最早加入的样品）
+CANDIDATES = 3      # 按谱形相似度提名的候选样品数
+GRID_POINTS = 256   # 谱形指纹网格点数
+GRID_MARGIN = 1.0   # 指纹网格在模型峰位范围两侧的外延（°）
+SHAPE_RANGE = (0.6, 20.0)  # 初值形状参数 m 的取值范围：m → ∞（高斯极限）的已收敛参数若直接作为初值，
+                           # 参数向量范数被 m 主导，相对步长判据在第一步即满足，拟合停留在初值
+
+# 当前进程的参数库（由 install 在各拟合进程中设置），None 表示不使用热启动
+_library = None
+
+
+# 批次（lot）键：去掉样品名末尾的序号及分隔符，如 "LOT-A_012" -> "LOT-A"；纯序号样品名不构成批次，返回 None
+def lot_key(sample_name):
+    if not sample_name:
+        return None
+    return re.sub(r'[\s_\-.#]*\d+$', '', sample_name) or None
+
+
+# 热启动参数库：保存同一计算类型已收敛样品的拟合参数，为新样品提供初值
+# 每个样品以模型在固定网格上的拟合曲线作为谱形指纹（只需拟合参数即可重建，无需保存原始数据）；
+# 新样品按同批次最近样品 + 谱形最相似的若干样品提名候选，候选参数按强度比例缩放后，
+# 与峰位经验初值一起在实测数据上比较残差平方和，取最小者作为初值
+class WarmStartLibrary:
+    def __init__(self, model, seeds=(), max_entries=MAX_ENTRIES):
+        self.model = model
+        self.max_entries = max_entries
+        self.grid = np.linspace(min(model.centers) - GRID_MARGIN, max(model.centers) + GRID_MARGIN, GRID_POINTS)
+        self.names = []
+        self.params = np.empty((0, model.n_params))
+        self.curves = np.empty((0, GRID_POINTS))
+        for name, popt in seeds:
+            self.add(name, popt)
+
+    def __len__(self):
+        return len(self.names)
+
+    # 加入已收敛样品（参数个数不符或曲线非有限值时忽略），超出容量时淘汰最早加入的样品
+    def add(self, name, popt):
+        popt = np.asarray(popt, dtype=float)
+        if popt.shape != (self.model.n_params,) or not np.all(np.isfinite(popt)):
+            return
+        with np.errstate(all='ignore'):
+            curve = self.model(self.grid, *popt)
+        if not np.all(np.isfinite(curve)):
+            return
+        self.names = (self.names + [name])[-self.max_entries:]
+        self.params = np.vstack([self.params, popt])[-self.max_entries:]
+        self.curves = np.vstack([self.curves, curve])[-self.max_entries:]
+
+    # 候选样品下标：同批次最近加入的样品，及谱形指纹（按最佳比例缩放后）残差最小的 k 个样品
+    def candidates(self, x, y, name=None, k=CANDIDATES):
+        if not self.names:
+            return []
+        picks = []
+        lot = lot_key(name)
+        if lot is not None:
+            same_lot = [i for i, other in enumerate(self.names) if lot_key(other) == lot]
+            picks += same_lot[-1:]
+        inside = (self.grid >= np.min(x)) & (self.grid <= np.max(x))
+        if np.count_nonzero(inside) > 1:
+            f = np.interp(self.grid[inside], x, y)
+            curves = self.curves[:, inside]
+            with np.errstate(all='ignore'):
+                scale = curves @ f / np.einsum('eg,eg->e', curves, curves)
+                resid = np.einsum('eg,eg->e', f - scale[:, None] * curves, f - scale[:, None] * curves)
+            picks += [int(i) for i in np.argsort(np.where(np.isfinite(resid), resid, np.inf))[:k]]
+        return list(dict.fromkeys(picks))
+
+    # 选取初值，返回 (p0, 来源样品名)；经验初值 default 残差最小（或无可用候选）时来源为 None
+    # 模型对峰高与背景系数为线性，候选参数的峰高与背景系数同乘强度比例即可匹配新样品强度；形状参数限制在 SHAPE_RANGE 内
+    def initial_guess(self, x, y, name=None, default=None):
+        best, best_cost, source = default, np.inf, None
+        with np.errstate(all='ignore'):
+            if default is not None:
+                best_cost = np.sum((y - self.model(x, *default))**2)
+            for i in self.candidates(x, y, name):
+                curve = self.model(x, *self.params[i])
+                scale = curve @ y / (curve @ curve)
+                if not np.isfinite(scale) or scale <= 0:
+                    continue
+                cost = np.sum((y - scale * curve)**2)
+                if cost < best_cost:
+                    p0 = self.params[i].copy()
+                    p0[4:5 * self.model.n_peaks:5] = np.clip(p0[4:5 * self.model.n_peaks:5], *SHAPE_RANGE)
+                    p0[0:5 * self.model.n_peaks:5] *= scale
+                    p0[5 * self.model.n_peaks:] *= scale
+                    best, best_cost, source = p0, cost, self.names[i]
+        return best, source
+
+
+# 在当前进程中设置参数库（进程池初始化函数），library 为 None 时关闭热启动
+def install(library):
+    global _library
+    _library = library
+
+# 当前进程的参数库
+def get_library():
+    return _library
@@ -0,0 +1,277 @@
+import os
+import time
+import queue
+import signal
+import argparse
+import main as cli
+import pipeline
+import data_reader as dr
+import data_processor as dp
+
+from concurrent.futures import ProcessPoolExecutor
+from results_store import ResultsStore, STORE_PATH
+from scan_index import ScanIndex, INDEX_PATH
+from plot_renderer import PlotRenderer
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # 未安装 watchdog 时仅以轮询方式发现新文件
+    Observer = None
+    FileSystemEventHandler = object
+
+
+POLL_INTERVAL = 2.0       # 轮询间隔（s）
+SETTLE_TIME = 2.0         # 文件大小与修改时间保持不变超过该时长（s）视为写入完成
+RESCAN_INTERVAL = 60.0    # 使用文件事件时的全量扫描间隔（s），补充网络共享目录等不产生事件的变化
+WORKBOOK_INTERVAL = 10.0  # 仍有样品在拟合时工作簿重写的最小间隔（s），全部完成时立即写入
+CALC_NAMES = {code: name for name, code in cli.CALC_TYPES.items()}
+
+
+# 按扫描范围确定计算类型：calc_types 中第一个峰位区间被扫描范围覆盖的计算类型，header 为元数据索引中的文件头信息
+# （D002 与 Si_FWHM 的峰位区间重叠，同一扫描两者均匹配时按 calc_types 给出的顺序优先）
+def route(header, calc_types):
+    return next((calc_type for calc_type in calc_types
+                 if pipeline.range_covers(header['start'], header['end'], calc_type)), None)
+
+# 拟合进程初始化：忽略 Ctrl+C（由主进程停止监视并等待拟合中的样品完成）
+def _init_worker(options, seeds):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    pipeline.init_worker(options, seeds)
+
+# watchdog 文件事件（创建、修改、移入）转发到队列，由主循环统一检查
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, events):
+        self.events = events
+
+    def on_any_event(self, event):
+        if not event.is_directory:
+            self.events.put(getattr(event, 'dest_path', '') or event.src_path)
+
+
+# 监视目录：发现新增或变化的已注册格式文件（按扩展名初筛，读取时由文件头识别格式），写入完成后按扫描范围确定计算类型，
+# 在各计算类型的进程池中拟合，结果写入结果库并重写各计算类型的工作簿（<output_prefix>_<计算类型>.xlsx）
+# 已安装 watchdog 时以文件事件（Linux 下为 inotify）发现文件，否则每 interval 秒全量扫描一次；
+# 文件大小与修改时间保持 settle 秒不变后才读取；结果库中文件内容与选项均未变化的样品直接复用，重启后不重复拟合
+class FolderWatcher:
+    def __init__(self, roots, options, workers=None, output_prefix='xrd_watch', curve_format='sheet',
+                 store_path=STORE_PATH, interval=POLL_INTERVAL, settle=SETTLE_TIME, use_events=True,
+                 index_path=INDEX_PATH):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.options = options      # 各计算类型的处理选项 {calc_type: options}，顺序即扫描范围匹配的优先顺序
+        self.workers = workers or os.cpu_count() or 1
+        self.output_prefix = output_prefix
+        self.curve_format = curve_format
+        self.interval = interval
+        self.settle = settle
+        self.store = ResultsStore(store_path)
+        self.index = ScanIndex(index_path)
+        self.renderer = PlotRenderer(1 if any(o.get('plot_format') for o in options.values()) else 0)
+        self.pools = {}       # 各计算类型的拟合进程池（首次使用时创建）
+        self.candidates = {}  # 待定文件 {path: (size, mtime_ns, 该状态首次观察到的时刻)}
+        self.detected = {}    # 文件首次发现时刻，用于输出处理用时
+        self.seen = {}        # 已处理文件 {path: (size, mtime_ns)}，文件再次变化时重新处理
+        self.futures = {}     # 拟合中的样品 {future: (calc_type, path, options, content_hash)}
+        self.results = {calc_type: {} for calc_type in options}  # 各计算类型结果 {path: result}，按完成顺序写入工作簿
+        self.dirty = set()
+        self.last_write = 0.0
+        self.extensions = dr.reader_extensions()
+        self.events = queue.Queue()
+        self.observer = None
+        if use_events and Observer is not None:
+            self.observer = Observer()
+            for root in self.roots:
+                self.observer.schedule(_EventHandler(self.events), root, recursive=True)
+            self.observer.start()
+
+    def workbook_path(self, calc_type):
+        return f"{self.output_prefix}_{CALC_NAMES[calc_type]}.xlsx"
+
+    # 全量扫描监视目录
+    def rescan(self):
+        for root in self.roots:
+            for dir_path, _, files in os.walk(root):
+                for f in files:
+                    self._observe(os.path.join(dir_path, f))
+
+    # 记录文件当前状态：状态变化时重新计时；修改时间早于 settle 秒前的文件（如启动时已存在的文件）无需等待
+    def _observe(self, path):
+        path = os.path.abspath(path)
+        if os.path.splitext(path)[1].lower() not in self.extensions:
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        state = (st.st_size, st.st_mtime_ns)
+        if self.seen.get(path) == state:
+            return
+        candidate = self.candidates.get(path)
+        if candidate is None or candidate[:2] != state:
+            since = time.monotonic()
+            if time.time() - st.st_mtime_ns / 1e9 >= self.settle:
+                since -= self.settle
+            self.candidates[path] = state + (since,)
+            self.detected.setdefault(path, time.monotonic())
+
+    # 写入完成的文件：重新检查状态，保持 settle 秒不变的文件移出待定列表
+    def _ready(self):
+        ready = []
+        now = time.monotonic()
+        for path, (size, mtime_ns, since) in list(self.candidates.items()):
+            self._observe(path)
+            if path not in self.candidates:
+                continue
+            if self.candidates[path][:2] == (size, mtime_ns) and now - since >= self.settle:
+                del self.candidates[path]
+                ready.append((path, (size, mtime_ns)))
+        return ready
+
+    def _pool(self, calc_type):
+        if calc_type not in self.pools:
+            options = self.options[calc_type]
+            seeds = self.store.fitted_params(calc_type, dp.MODEL_VERSION) if options.get('warm_start') else []
+            self.pools[calc_type] = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                        initargs=(options, seeds))
+        return self.pools[calc_type]
+
+    # 由元数据索引（只读取文件头）确定格式与计算类型，结果库中有可复用结果时直接加入，否则提交拟合（强度数据在拟合进程中解码）
+    # 读取失败（如写入中断的文件）时不再重试，直至文件再次变化
+    def _dispatch(self, path, state):
+        self.seen[path] = state
+        sample_name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            header = self.index.header(path)
+            self.index.commit()
+            if header is None:
+                raise ValueError("无法识别格式或读取文件头")
+        except Exception as e:
+            self.detected.pop(path, None)
+            print(f"读取失败 {sample_name}: {type(e).__name__}: {e}")
+            return
+        file_type = header['reader']
+        calc_type = route(header, list(self.options))
+        if calc_type is None:
+            self.detected.pop(path, None)
+            print(f"跳过 {sample_name}: 扫描范围 {header['start']:.1f}°-{header['end']:.1f}° 与监视的计算类型均不匹配")
+            return
+        options = dict(self.options[calc_type], file_type=file_type)
+        content_hash = self.store.content_hash(path, calc_type)
+        stored = self.store.lookup(path, options, dp.MODEL_VERSION, content_hash)
+        if stored is not None:
+            self.detected.pop(path, None)
+            self._add(calc_type, stored)
+            return
+        future = self._pool(calc_type).submit(pipeline.process_samples, [path], options)
+        self.futures[future] = (calc_type, path, options, content_hash)
+
+    # 收集已完成的拟合：提交拟合图渲染，写入结果库
+    def _collect(self):
+        for future in [future for future in self.futures if future.done()]:
+            calc_type, path, options, content_hash = self.futures.pop(future)
+            elapsed = time.monotonic() - self.detected.pop(path, time.monotonic())
+            try:
+                result, = future.result()
+            except Exception as e:
+                # 子进程异常退出时进程池不可再用，关闭后在下次提交时重建；文件再次变化时重新处理
+                print(f"Failed to fit peaks for sample {os.path.basename(path)}: {type(e).__name__}: {e}")
+                pool = self.pools.pop(calc_type, None)
+                if pool is not None:
+                    pool.shutdown(wait=False)
+                continue
+            self.renderer.submit(result.pop('plot', None))
+            pipeline.report_result(result)
+            self.store.save(result, options, dp.MODEL_VERSION, content_hash, pipeline.summary_columns(options))
+            self.store.commit()
+            self._add(calc_type, result)
+            if result['status'] in ('ok', 'fallback'):
+                print(f"完成 {result['sample_name']}（{CALC_NAMES[calc_type]}，发现后 {elapsed:.1f} s）")
+
+    def _add(self, calc_type, result):
+        self.results[calc_type][os.path.abspath(result['file_path'])] = result
+        self.dirty.add(calc_type)
+
+    # 重写有新结果的工作簿（先写临时文件再替换，替换失败（如工作簿正被打开）时下次重试）
+    def _write_workbooks(self, force=False):
+        if not self.dirty or (self.futures and not force and time.monotonic() - self.last_write < WORKBOOK_INTERVAL):
+            return
+        for calc_type in sorted(self.dirty):
+            path = self.workbook_path(calc_type)
+            temp_path = f"{os.path.splitext(path)[0]}.tmp.xlsx"
+            pipeline.write_workbook(list(self.results[calc_type].values()), calc_type, temp_path, self.curve_format,
+                                    pipeline.summary_columns(self.options[calc_type]))
+            try:
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"工作簿写入失败 {path}: {e}")
+                continue
+            self.dirty.discard(calc_type)
+        self.last_write = time.monotonic()
+
+    # 主循环：once 为真时处理完目录中现有文件后返回
+    def run(self, once=False):
+        self.rescan()
+        last_scan = time.monotonic()
+        while True:
+            busy = self.candidates or self.futures
+            try:
+                self._observe(self.events.get(timeout=0.2 if busy else self.interval))
+                while True:
+                    self._observe(self.events.get_nowait())
+            except queue.Empty:
+                pass
+            if time.monotonic() - last_scan >= (RESCAN_INTERVAL if self.observer is not None else self.interval):
+                self.rescan()
+                last_scan = time.monotonic()
+            for path, state in self._ready():
+                self._dispatch(path, state)
+            self._collect()
+            self._write_workbooks()
+            if once and not self.candidates and not self.futures:
+                break
+
+    # 停止监视：等待拟合中的样品完成并写入工作簿
+    def close(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+        while self.futures:
+            time.sleep(0.2)
+            self._collect()
+        self._write_workbooks(force=True)
+        for pool in self.pools.values():
+            pool.shutdown()
+        self.renderer.close()
+        self.store.close()
+        self.index.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="监视目录：新文件写入完成后自动拟合，结果写入结果库与工作簿")
+    parser.add_argument('dirs', nargs='+', help="监视目录（含子目录）")
+    parser.add_argument('--calc', default='d002,oi',
+                        help="按扫描范围匹配的计算类型，逗号分隔，靠前者优先（默认 d002,oi；si 与 d002 区间重叠）")
+    cli.add_option_arguments(parser)
+    parser.add_argument('-o', '--output', default='xrd_watch', help="工作簿路径前缀（按计算类型写入 <前缀>_d002.xlsx 等）")
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help="轮询间隔（s）")
+    parser.add_argument('--settle', type=float, default=SETTLE_TIME, help="文件保持不变多久视为写入完成（s）")
+    parser.add_argument('--poll', action='store_true', help="不使用文件事件，仅轮询（如网络共享目录）")
+    parser.add_argument('--once', action='store_true', help="处理目录中现有文件后退出")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.calc.split(',') if name.strip()]
+    unknown = [name for name in names if name not in cli.CALC_TYPES]
+    if unknown or not names:
+        parser.error(f"无效的计算类型: {', '.join(unknown) or args.calc}")
+    options = {cli.CALC_TYPES[name]: cli.options_from_args(args, cli.CALC_TYPES[name]) for name in names}
+    watcher = FolderWatcher(args.dirs, options, args.workers, args.output,
+                            args.curve_format if args.peak_output else 'sheet', args.store or STORE_PATH,
+                            args.interval, args.settle, use_events=not args.poll, index_path=args.index or INDEX_PATH)
+    print(f"监视 {', '.join(watcher.roots)}（{'文件事件' if watcher.observer is not None else f'每 {args.interval:g} s 轮询'}），"
+          f"Ctrl+C 停止")
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
@@ -0,0 +1,61 @@
+import numpy as np
+import data_reader as dr
+
+
+MAX_HEADER_LINES = 5  # 数据前允许的表头行数（无法解析为数值的非注释行）
+COMMENTS = ('#', '!', "'", '//')
+
+
+# 解析一行数值：2 列（2θ、强度）或 3 列（另含误差），以空白或逗号分隔；含分号时以分号分隔、逗号为小数点
+def _parse_line(line):
+    line = line.strip()
+    if not line or line.startswith(COMMENTS):
+        return None
+    if ';' in line:
+        fields = [v.strip().replace(',', '.') for v in line.split(';')]
+    else:
+        fields = line.replace(',', ' ').split()
+    if not 2 <= len(fields) <= 3:
+        return None
+    try:
+        return [float(v) for v in fields]
+    except ValueError:
+        return None
+
+# 纯文本 2θ-强度数据读取插件（.xy / .xye / .csv），由 data_reader.DEFAULT_PLUGINS 默认加载
+# 每行 2θ 与强度（.xye 第 3 列为误差，不使用）；注释行与少量表头行跳过，
+# 列数不为 2–3 的表格（如拟合结果曲线 *_curves.csv）不识别为扫描数据
+@dr.register_reader
+class XYReader(dr.BaseReader):
+    name = 'xy'
+    extensions = ('.xy', '.xye', '.csv')
+
+    # 文本文件，前 MAX_HEADER_LINES 行内开始出现列数一致、2θ 递增的数值行
+    @staticmethod
+    def sniff(head):
+        if b'\0' in head:
+            return False
+        lines = head.decode('utf-8', errors='replace').splitlines()
+        if len(head) >= dr.SNIFF_BYTES:
+            lines = lines[:-1]  # 最后一行可能不完整
+        rows, header = [], 0
+        for line in lines:
+            row = _parse_line(line)
+            if row is not None:
+                rows.append(row)
+            elif line.strip() and not line.strip().startswith(COMMENTS):
+                if rows or header >= MAX_HEADER_LINES:
+                    return False
+                header += 1
+        return (len(rows) >= 3 and len({len(row) for row in rows}) == 1
+                and all(b[0] > a[0] for a, b in zip(rows, rows[1:])))
+
+    @staticmethod
+    def read_data(file_path):
+        """读取 .xy / .csv 文件，返回 (scan_x, scan_y)"""
+        with open(file_path, encoding='utf-8', errors='replace') as f:
+            rows = [row[:2] for row in map(_parse_line, f) if row is not None]
+        if len(rows) < 2:
+            return None, None
+        data = np.array(rows)
+        return data[:, 0], data[:, 1]